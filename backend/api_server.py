@@ -16,7 +16,10 @@ load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env")
 # 필요하면 프로젝트 루트의 backend/.env도 같이 시도
 load_dotenv(dotenv_path=Path(__file__).resolve().parent / "backend" / ".env")
 
+from struct_log import log, RequestLogMiddleware  # .env 의 LOG_* 설정을 읽도록 로드 뒤에 import
+
 app = FastAPI(title="JustGo API", version="1.0.0")
+app.add_middleware(RequestLogMiddleware)
 
 # --- CORS (Live Server / VSCode) ---
 app.add_middleware(
@@ -89,7 +92,7 @@ async def _run_gpt_blocking(
     has_pet: bool,
 ) -> dict:
     def _blocking() -> dict:
-        print("[GPT] blocking-start")
+        log.debug("gpt.start")
         # ── 의존 모듈 가져오기 (지연 import로 에러 메시지를 명확히)
         try:
             from gpt_client import generate_schedule_gpt
@@ -128,7 +131,7 @@ async def _run_gpt_blocking(
         try:
             sightseeing, restaurants = extract_places(gpt_text)
         except Exception as pe:
-            print("[GPT] parse-error:", pe)
+            log.warning("gpt.parse_error", error=str(pe))
             sightseeing, restaurants = [], []
 
         # 일정 1~3 분리
@@ -136,7 +139,7 @@ async def _run_gpt_blocking(
             "일정추천 1 생성에 실패했습니다. 다시 시도해주세요."
         ]
 
-        print("[GPT] blocking-end")
+        log.debug("gpt.end", itineraries=len(itineraries))
         return {
             "ok": True,
             "dummy_result": {
@@ -168,8 +171,8 @@ def health():
 @app.post("/api/plan")
 async def create_plan(req: PlanRequest, request: Request):
     ts = time.time()
-    print(f"[API] START /api/plan from {request.client.host} at {ts:.3f}")
-    print("[API] req:", req.model_dump())
+    log.info("plan.start", client=request.client.host if request.client else None,
+             destination=req.destination, start=req.start_date, end=req.end_date)
 
     # 기본값 보정
     destination = (req.destination or "").strip() or "부산"
@@ -187,11 +190,11 @@ async def create_plan(req: PlanRequest, request: Request):
             ),
             timeout=GPT_TIMEOUT_SEC,
         )
-        print(f"[API] END 200 in {(time.time()-ts):.3f}s")
+        log.info("plan.done", ms=round((time.time() - ts) * 1000, 1))
         return result
 
     except asyncio.TimeoutError:
-        print(f"[API] TIMEOUT in {(time.time()-ts):.3f}s")
+        log.warning("plan.timeout", ms=round((time.time() - ts) * 1000, 1), timeout_sec=GPT_TIMEOUT_SEC)
         return {
             "ok": False,
             "message": f"GPT 처리 타임아웃({GPT_TIMEOUT_SEC}s)",
@@ -209,7 +212,7 @@ async def create_plan(req: PlanRequest, request: Request):
             },
         }
     except Exception as e:
-        print(f"[API] ERROR {e} in {(time.time()-ts):.3f}s")
+        log.error("plan.error", exc=e, ms=round((time.time() - ts) * 1000, 1))
         return {
             "ok": False,
             "message": f"GPT 처리 실패: {e}",
@@ -0,0 +1,122 @@
+# backend/bench_prompt_variants.py
+"""
+full / compact 프롬프트 변형 비교 도구.
+
+    # 토큰 수만 비교(API 호출 없음)
+    python bench_prompt_variants.py --offline
+
+    # 실제 호출로 지연시간/토큰 비교(변형당 5회)
+    python bench_prompt_variants.py --runs 5 --location 부산 --days 3
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Dict, List
+
+import token_meter
+from prompts import build_prompt, build_prompt_compact
+
+try:
+    from gpt_client import SYSTEM_STRICT
+except Exception:
+    SYSTEM_STRICT = ""
+
+
+def _case(args) -> Dict:
+    return dict(
+        location=args.location,
+        days=args.days,
+        budget=args.budget,
+        companions=args.companions.split(",") if args.companions else [],
+        style=args.style,
+        selected_places=args.selected.split(",") if args.selected else [],
+        travel_date=args.date,
+        count=args.count,
+    )
+
+
+def _messages(prompt: str) -> List[Dict[str, str]]:
+    return [{"role": "system", "content": SYSTEM_STRICT}, {"role": "user", "content": prompt}]
+
+
+def _common_prefix_tokens(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return token_meter.count_tokens(a[:n])
+
+
+def run_offline(args) -> None:
+    case = _case(args)
+    other = dict(case, location=case["location"] + "X", travel_date="2030-01-01")
+    print(f"{'variant':<10}{'prompt_tok':>12}{'cacheable_prefix_tok':>24}")
+    for name, builder in (("full", build_prompt), ("compact", build_prompt_compact)):
+        p1, p2 = builder(**case), builder(**other)
+        total = token_meter.count_messages(_messages(p1))
+        # 입력이 다른 두 호출 사이에 공유되는 프리픽스(=캐시 가능 구간)
+        prefix = token_meter.count_tokens(SYSTEM_STRICT) + _common_prefix_tokens(p1, p2)
+        print(f"{name:<10}{total:>12}{prefix:>24}")
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+
+def run_live(args) -> None:
+    from gpt_client import client, generate_schedule_gpt
+    if client is None:
+        raise SystemExit("OPENAI_API_KEY(또는 OPENAI_BASE_URL 스탠드인)가 필요합니다. --offline 을 쓰세요.")
+
+    case = _case(args)
+    latencies: Dict[str, List[float]] = {"full": [], "compact": []}
+    token_meter.reset()
+    with token_meter.endpoint_scope("bench"):
+        for i in range(args.runs):
+            # 순서 편향을 줄이려고 번갈아 호출
+            order = ("full", "compact") if i % 2 == 0 else ("compact", "full")
+            for v in order:
+                t0 = time.perf_counter()
+                generate_schedule_gpt(variant=v, **case)
+                latencies[v].append(time.perf_counter() - t0)
+
+    stats = {r["stage"]: r for r in token_meter.snapshot()}
+    print(f"{'variant':<10}{'p50_ms':>10}{'p95_ms':>10}{'prompt_tok':>12}{'cached_tok':>12}{'compl_tok':>12}")
+    for v in ("full", "compact"):
+        s = stats.get(f"schedule:{v}", {})
+        calls = s.get("calls") or 1
+        print(f"{v:<10}"
+              f"{statistics.median(latencies[v]) * 1000:>10.0f}"
+              f"{_pct(latencies[v], 0.95) * 1000:>10.0f}"
+              f"{s.get('prompt_tokens', 0) / calls:>12.0f}"
+              f"{s.get('cached_tokens', 0) / calls:>12.0f}"
+              f"{s.get('completion_tokens', 0) / calls:>12.0f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="full vs compact 프롬프트 비교")
+    ap.add_argument("--offline", action="store_true", help="API 호출 없이 토큰 수만 비교")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--location", default="부산")
+    ap.add_argument("--days", type=int, default=3)
+    ap.add_argument("--budget", type=int, default=300000)
+    ap.add_argument("--companions", default="가족")
+    ap.add_argument("--style", default="자연")
+    ap.add_argument("--selected", default="")
+    ap.add_argument("--date", default="2025-08-18")
+    ap.add_argument("--count", type=int, default=3)
+    args = ap.parse_args()
+    if args.offline:
+        run_offline(args)
+    else:
+        run_live(args)
+
+
+if __name__ == "__main__":
+    main()
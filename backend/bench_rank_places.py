@@ -0,0 +1,62 @@
+# backend/bench_rank_places.py
+"""
+places.rank_places(파이썬 루프) vs rank_places_batch / PlaceArrays(NumPy) 비교.
+
+    python bench_rank_places.py                 # 1k / 10k / 100k
+    python bench_rank_places.py --sizes 5000 --k 50
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from places import PlaceArrays, rank_places, rank_places_batch
+
+ORIGIN = (35.1587, 129.1604)   # 해운대
+
+
+def _items(n: int, seed: int = 7) -> List[Dict]:
+    rnd = random.Random(seed)
+    return [{
+        "name": f"place{i}",
+        "lat": ORIGIN[0] + rnd.uniform(-0.06, 0.06),
+        "lng": ORIGIN[1] + rnd.uniform(-0.06, 0.06),
+        "rating": round(rnd.uniform(2.5, 5.0), 1),
+        "reviews": int(rnd.paretovariate(1.2) * 10),
+    } for i in range(n)]
+
+
+def _time(fn, runs: int) -> float:
+    xs = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        xs.append(time.perf_counter() - t0)
+    return statistics.median(xs) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="rank_places 루프 vs NumPy 배치")
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'n':>8}{'loop_ms':>12}{'batch_ms':>12}{'arrays_ms':>12}{'speedup':>10}  same_topk")
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        items = _items(n)
+        arr = PlaceArrays(items)
+        loop_ms = _time(lambda: rank_places([dict(it) for it in items], *ORIGIN)[:args.k], args.runs)
+        batch_ms = _time(lambda: rank_places_batch(items, *ORIGIN, k=args.k), args.runs)
+        arrays_ms = _time(lambda: arr.rank(*ORIGIN, k=args.k), args.runs)   # 배열 재사용(위치만 바뀌는 경우)
+
+        a = [(x["name"], x["score"], x["distance_km"]) for x in rank_places([dict(it) for it in items], *ORIGIN)[:args.k]]
+        b = [(x["name"], x["score"], x["distance_km"]) for x in rank_places_batch(items, *ORIGIN, k=args.k)]
+        print(f"{n:>8}{loop_ms:>12.1f}{batch_ms:>12.1f}{arrays_ms:>12.1f}{loop_ms / max(arrays_ms, 1e-6):>9.1f}x  {a == b}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# backend/bench_response_codec.py
+"""
+장소 목록 응답: 기존 경로(jsonable_encoder + JSONResponse, 비압축) vs FastJSONResponse + gzip/br.
+
+    python bench_response_codec.py                  # 20 / 100 / 500 개
+    python bench_response_codec.py --sizes 1000 --runs 20
+
+행 모양은 places_flex 결과(네이버 로컬 매핑 + mapx/mapy + 이미지/지도 링크)와 같게 만든다.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import urllib.parse
+from typing import Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from response_codec import FastJSONResponse, brotli, compress, orjson
+
+
+def _rows(n: int, seed: int = 7) -> List[Dict]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        name = f"부산 {rnd.choice(['해운대', '광안리', '서면', '남포동'])} 장소{i}"
+        addr = f"부산광역시 해운대구 해운대해변로 {rnd.randint(1, 400)}"
+        raw = {
+            "title": f"<b>{name}</b>", "link": f"https://example.com/place/{i}",
+            "category": "음식점>한식>육류,고기요리", "description": "", "telephone": "",
+            "address": addr.replace("해운대해변로", "우동"), "roadAddress": addr,
+            "mapx": str(1291600000 + rnd.randint(-99999, 99999)),
+            "mapy": str(351580000 + rnd.randint(-99999, 99999)),
+        }
+        out.append({
+            "name": name, "title": name, "address": addr, "category": raw["category"],
+            "telephone": "", "lat": round(35.158 + rnd.uniform(-0.05, 0.05), 7),
+            "lng": round(129.16 + rnd.uniform(-0.05, 0.05), 7),
+            "rating": round(rnd.uniform(3.0, 5.0), 1), "review_count": rnd.randint(0, 3000),
+            "map_link": "https://map.naver.com/v5/search/" + urllib.parse.quote(name),
+            "map_url": "https://map.naver.com/v5/search/" + urllib.parse.quote(name),
+            "image_url": f"https://search.pstatic.net/common/?src=https%3A%2F%2Fldb-phinf.pstatic.net%2F2024{i:04d}"
+                         f"%2FMjAyNDA1MTVfMjkg%2FMDAxNzE1NzQ4NjQ1MjY0.{rnd.getrandbits(64):x}.JPEG%2Fimage.jpg&type=f&size=340x180",
+            "source": "naver", "mapx": raw["mapx"], "mapy": raw["mapy"],
+        })
+    return out
+
+
+def _time(fn, runs: int) -> float:
+    xs = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        xs.append(time.perf_counter() - t0)
+    return statistics.median(xs) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="장소 목록 응답 직렬화/압축 비교")
+    ap.add_argument("--sizes", default="20,100,500")
+    ap.add_argument("--runs", type=int, default=15)
+    args = ap.parse_args()
+
+    print(f"encoder={'orjson' if orjson else 'json'}  brotli={'yes' if brotli else 'no'}")
+    print(f"{'n':>6}{'before_B':>11}{'gzip_B':>10}{'br_B':>10}{'before_ms':>11}{'after_ms':>10}{'gzip_ms':>9}{'br_ms':>8}")
+    for n in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        payload = {"total": n, "places": _rows(n), "next_cursor": None}
+        before = JSONResponse(jsonable_encoder(payload)).body
+        after = FastJSONResponse(payload).body
+        before_ms = _time(lambda: JSONResponse(jsonable_encoder(payload)), args.runs)
+        after_ms = _time(lambda: FastJSONResponse(payload), args.runs)
+        gz = compress(after, "gzip")
+        gzip_ms = _time(lambda: compress(after, "gzip"), args.runs)
+        br_b, br_ms = ("-", "-")
+        if brotli is not None:
+            br_b = str(len(compress(after, "br")))
+            br_ms = f"{_time(lambda: compress(after, 'br'), args.runs):.2f}"
+        print(f"{n:>6}{len(before):>11}{len(gz):>10}{br_b:>10}{before_ms:>11.2f}{after_ms:>10.2f}{gzip_ms:>9.2f}{br_ms:>8}")
+
+
+if __name__ == "__main__":
+    main()
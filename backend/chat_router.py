@@ -6,7 +6,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from openai import OpenAI
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# 자리표시 키는 스탠드인(OPENAI_BASE_URL)일 때만 — 키가 없으면 예전처럼 클라이언트 생성이 실패한다
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY") or ("sk-local" if _BASE_URL else None),
+                base_url=_BASE_URL)
 router = APIRouter(tags=["chat"])
 
 class ChatRequest(BaseModel):
@@ -0,0 +1,164 @@
+# backend/geo_index.py
+"""
+알려진 장소(카탈로그 + 라이브 검색 결과)의 격자 공간 색인.
+
+    near = nearby(35.158, 129.160, radius_km=2.0, k=20)      # [(거리km, 장소), ...] 가까운 순
+    rows = with_distance(rows, 35.158, 129.160, radius_km=3)  # distance_km 채우고 반경 밖 제거
+
+- 위경도를 CELL_DEG(≈1.1km) 격자로 나눠 버킷에 담고, 반경이 덮는 칸만 훑는다.
+- 거리 계산은 places.haversine_km 과 같다.
+"""
+from __future__ import annotations
+
+import math
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .places import haversine_km
+    from .place_key import row_key as _key
+except Exception:
+    from places import haversine_km  # type: ignore
+    from place_key import row_key as _key  # type: ignore
+
+CELL_DEG = 0.01            # 위도 0.01° ≈ 1.1km
+MAX_LIVE_POINTS = 20000    # 라이브 결과로 쌓는 점 개수 상한(오래된 것부터 버림)
+
+
+def _coords(it: Dict) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = float(it.get("lat")), float(it.get("lng"))
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+
+class GridIndex:
+    def __init__(self, cell_deg: float = CELL_DEG, max_points: int = 0):
+        self.cell = cell_deg
+        self.max_points = max_points
+        self._cells: Dict[Tuple[int, int], Dict[str, Dict]] = defaultdict(dict)
+        self._where: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell)), int(math.floor(lng / self.cell))
+
+    def add(self, it: Dict) -> bool:
+        ll = _coords(it)
+        key = _key(it)
+        if ll is None or not key:
+            return False
+        c = self._cell_of(*ll)
+        with self._lock:
+            old = self._where.pop(key, None)
+            if old is not None:
+                self._drop(old, key)
+            self._cells[c][key] = it
+            self._where[key] = c
+            if self.max_points and len(self._where) > self.max_points:
+                k0, c0 = self._where.popitem(last=False)
+                self._drop(c0, k0)
+        return True
+
+    def _drop(self, c: Tuple[int, int], key: str) -> None:
+        """빈 칸은 지운다(nearby 가 채워진 칸 수로 훑는 방식을 고르므로)."""
+        bucket = self._cells.get(c)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[c]
+
+    def add_many(self, items: Iterable[Dict]) -> int:
+        return sum(1 for it in items or [] if self.add(it))
+
+    def nearby(self, lat: float, lng: float, radius_km: float, k: Optional[int] = None) -> List[Tuple[float, Dict]]:
+        dlat = radius_km / 110.574
+        dlng = radius_km / (111.320 * max(0.01, math.cos(math.radians(lat))))
+        i0, j0 = self._cell_of(lat - dlat, lng - dlng)
+        i1, j1 = self._cell_of(lat + dlat, lng + dlng)
+        out: List[Tuple[float, Dict]] = []
+        with self._lock:
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):   # 상자가 채워진 칸보다 크면 채워진 칸만 훑는다
+                keys = [c for c in self._cells if i0 <= c[0] <= i1 and j0 <= c[1] <= j1]
+            else:
+                keys = [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) if (i, j) in self._cells]
+            buckets = [list(self._cells[c].values()) for c in keys]
+        for bucket in buckets:
+            for it in bucket:
+                plat, plng = _coords(it)
+                d = haversine_km(lat, lng, plat, plng)
+                if d <= radius_km:
+                    out.append((d, it))
+        out.sort(key=lambda x: x[0])
+        return out[:k] if k else out
+
+
+# ========= 전역 색인 =========
+_CATALOG = GridIndex()                              # 카탈로그(지연 적재)
+_LIVE = GridIndex(max_points=MAX_LIVE_POINTS)       # 라이브 검색으로 본 장소
+_CATALOG_LOADED = False
+_LOAD_LOCK = Lock()
+
+
+def _ensure_catalog() -> None:
+    global _CATALOG_LOADED
+    if _CATALOG_LOADED:
+        return
+    with _LOAD_LOCK:
+        if _CATALOG_LOADED:
+            return
+        try:
+            try:
+                from .place_catalog import iter_places
+            except Exception:
+                from place_catalog import iter_places  # type: ignore
+            _CATALOG.add_many(iter_places())
+        except Exception as e:
+            print("[geo_index] catalog load error:", e)
+        _CATALOG_LOADED = True
+
+
+def remember(items: Iterable[Dict]) -> None:
+    """라이브 검색 결과 중 좌표 있는 것을 색인에 추가."""
+    _LIVE.add_many(items)
+
+
+def nearby(lat: float, lng: float, radius_km: float = 3.0, k: Optional[int] = None) -> List[Tuple[float, Dict]]:
+    _ensure_catalog()
+    seen, out = set(), []
+    for d, it in sorted(_CATALOG.nearby(lat, lng, radius_km) + _LIVE.nearby(lat, lng, radius_km),
+                        key=lambda x: x[0]):
+        key = _key(it)
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append((d, it))
+    return out[:k] if k else out
+
+
+def with_distance(items: List[Dict], lat: Optional[float], lng: Optional[float],
+                  radius_km: Optional[float] = None) -> List[Dict]:
+    """
+    distance_km 를 채운 새 행 목록. radius_km 가 있으면 반경 밖/좌표 없는 행은 제거.
+    입력 행은 건드리지 않는다(nearby() 의 색인 행은 요청끼리 공유되므로 중심점마다 거리가 다르다).
+    """
+    if lat is None or lng is None:
+        return items
+    out = []
+    for it in items or []:
+        ll = _coords(it)
+        if ll is None:
+            if radius_km is None:
+                out.append(dict(it, distance_km=None))
+            continue
+        d = round(haversine_km(lat, lng, ll[0], ll[1]), 2)
+        if radius_km is None or d <= radius_km:
+            out.append(dict(it, distance_km=d))
+    return out
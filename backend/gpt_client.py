@@ -1,6 +1,7 @@
 # backend/gpt_client.py
 from __future__ import annotations
 import os
+import random
 from pathlib import Path
 from typing import List, Optional
 from openai import OpenAI
@@ -13,14 +14,20 @@ except Exception:
     pass
 
 # 단일 출처 프롬프트
-from prompts import build_prompt
+from prompts import build_prompt, build_prompt_compact
+from token_meter import chat_completion
+
+# OPENAI_BASE_URL 을 주면 OpenAI 호환 서버(로컬 스탠드인 등)로 보낸다.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
 def _make_client() -> Optional[OpenAI]:
     try:
         key = os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_APIKEY")
+        if not key and OPENAI_BASE_URL:
+            key = "sk-local"   # 스탠드인은 키를 검사하지 않음
         if not key:
             return None
-        return OpenAI(api_key=key)
+        return OpenAI(api_key=key, base_url=OPENAI_BASE_URL)
     except Exception:
         return None
 
@@ -39,6 +46,20 @@ SYSTEM_STRICT = """
 """
 
 
+# ========= 프롬프트 변형 A/B 스위치 =========
+# PROMPT_VARIANT=full(기본) | compact | ab  (ab: 호출마다 50:50, 비율은 PROMPT_AB_RATIO로 조정)
+PROMPT_VARIANTS = ("full", "compact")
+
+def pick_prompt_variant(variant: Optional[str] = None) -> str:
+    v = (variant or os.getenv("PROMPT_VARIANT") or "full").strip().lower()
+    if v == "ab":
+        try:
+            ratio = float(os.getenv("PROMPT_AB_RATIO") or 0.5)
+        except ValueError:
+            ratio = 0.5
+        return "compact" if random.random() < ratio else "full"
+    return v if v in PROMPT_VARIANTS else "full"
+
 def _strip_code_fence(s: str) -> str:
     if not s: return ""
     s = s.replace("\r\n", "\n").replace("\r", "\n").strip()
@@ -66,6 +87,7 @@ def generate_schedule_gpt(
     selected_places: List[str],
     travel_date: str,
     count: int = 1,
+    variant: Optional[str] = None,
 ) -> str:
     if client is None:
         return (
@@ -77,7 +99,9 @@ def generate_schedule_gpt(
             "---\n일정추천 2: 샘플\n---\n일정추천 3: 샘플"
         )
 
-    prompt = build_prompt(
+    variant = pick_prompt_variant(variant)
+    builder = build_prompt_compact if variant == "compact" else build_prompt
+    prompt = builder(
         location=location,
         days=days,
         budget=budget,
@@ -88,7 +112,9 @@ def generate_schedule_gpt(
         count=count,
     )
 
-    resp = client.chat.completions.create(
+    resp = chat_completion(
+        client,
+        stage=f"schedule:{variant}",
         model="gpt-4o-mini",
         temperature=0.2,
         max_tokens=4096,
@@ -18,11 +18,19 @@ try:
 except Exception:
     OpenAI = None  # type: ignore
 
+try:
+    from token_meter import chat_completion
+except Exception:
+    chat_completion = None  # type: ignore
+
 API_KEY = os.getenv("OPENAI_API_KEY")
+BASE_URL = os.getenv("OPENAI_BASE_URL") or None   # 로컬 스탠드인 등
+if not API_KEY and BASE_URL:
+    API_KEY = "sk-local"
 client = None
 if OpenAI and API_KEY:
     try:
-        client = OpenAI(api_key=API_KEY)
+        client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
     except Exception:
         client = None
 
@@ -46,7 +54,7 @@ def ask_gpt(prompt: str, destination: Optional[str] = None) -> str:
             f"3. {city} 식당 F - 가성비"
         )
 
-    resp = client.chat.completions.create(
+    kwargs = dict(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "당신은 한국어로 답하는 여행지/맛집 추천 전문가입니다."},
@@ -54,6 +62,10 @@ def ask_gpt(prompt: str, destination: Optional[str] = None) -> str:
         ],
         temperature=0.7,
     )
+    if chat_completion is not None:
+        resp = chat_completion(client, stage="recommend", **kwargs)
+    else:
+        resp = client.chat.completions.create(**kwargs)
     return (resp.choices[0].message.content or "").strip()
 
 
@@ -0,0 +1,438 @@
+# backend/image_proxy.py
+"""
+이미지 프록시 — 외부 이미지(블로그/핀터레스트 등)를 한 번만 받아 카드 크기 WebP 썸네일로 디스크에 둔다.
+
+    path = proxy_path("https://blogthumb.pstatic.net/....jpg")     # → "/img/<token>"
+    body, ctype, etag = get_thumbnail(token, width=320)             # 엔드포인트가 부름
+
+- 토큰 = base64url(원본 URL) + "." + HMAC 서명 → 서버가 고른 URL만 받는다.
+  IMG_PROXY_SECRET 이 없으면 공유 상태 백엔드(STATE_BACKEND)에 무작위 비밀값을 한 번 만들어 모든 워커가
+  같이 쓴다(memory 백엔드면 그 프로세스에서만 유효). 백엔드를 못 쓰는 동안에는 썸네일 경로를 내지 않는다.
+- 받기 전에 호스트를 풀어 루프백/사설/링크로컬 등 내부 주소면 거절한다. 리다이렉트는 자동으로 따르지 않고
+  한 홉씩 같은 검사를 거친다(IMG_MAX_REDIRECTS). 실제로 연결된 소켓의 상대 주소도 요청을 보내기 전에
+  다시 검사한다(검사와 연결 사이에 DNS 가 바뀌는 리바인딩 대비). 로컬 시험 때만 IMG_ALLOW_PRIVATE=1.
+- 한 이미지 받기(리다이렉트 홉 + 본문 읽기 전부)는 IMG_FETCH_BUDGET 초 안에 끝나야 한다.
+- 썸네일: 가로/세로 중 긴 쪽을 width 에 맞춰 줄이고 WebP(품질 IMG_WEBP_QUALITY)로 저장.
+  Pillow 가 없으면 원본 바이트를 그대로 캐시한다(한 번만 받기/캐시 헤더는 동일).
+- 디스크 캐시: IMG_CACHE_DIR, 총량 IMG_CACHE_MAX_MB 를 넘으면 오래 안 쓴 파일부터 지운다.
+- 같은 이미지를 동시에 여러 요청이 원하면 한 요청만 받아 오고 나머지는 그 결과를 기다린다.
+- 원본 실패는 IMG_FAIL_TTL 초 동안 기억해 깨진 링크를 반복해서 두드리지 않는다.
+
+로컬 시험: 아무 정적 서버로 충분하다(IMG_ALLOW_PRIVATE=1, python -m http.server 8765
+→ proxy_path("http://127.0.0.1:8765/a.jpg")).
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import io
+import ipaddress
+import os
+import secrets
+import socket
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from PIL import Image, ImageOps  # pip install pillow (선택)
+except Exception:
+    Image = None
+    ImageOps = None
+
+try:
+    from .struct_log import log
+    from .shared_state import get_backend
+except Exception:
+    from struct_log import log  # type: ignore
+    from shared_state import get_backend  # type: ignore
+
+_SECRET_ENV = os.getenv("IMG_PROXY_SECRET") or ""
+IMG_PROXY_SECRET: Optional[bytes] = _SECRET_ENV.encode("utf-8") if _SECRET_ENV else None
+SECRET_RETRY_SEC = 30.0                # 공유 백엔드에서 비밀값을 못 받았을 때 다시 시도하는 간격
+IMG_ALLOW_PRIVATE = os.getenv("IMG_ALLOW_PRIVATE", "0").lower() in ("1", "true", "yes", "on")
+IMG_MAX_REDIRECTS = int(os.getenv("IMG_MAX_REDIRECTS", "3"))
+IMG_CACHE_DIR = Path(os.getenv("IMG_CACHE_DIR") or Path(__file__).resolve().parent / "data" / "img_cache")
+IMG_CACHE_MAX_BYTES = int(float(os.getenv("IMG_CACHE_MAX_MB", "200")) * 1024 * 1024)
+IMG_MAX_SOURCE_BYTES = int(float(os.getenv("IMG_MAX_SOURCE_MB", "8")) * 1024 * 1024)
+IMG_FETCH_TIMEOUT = float(os.getenv("IMG_FETCH_TIMEOUT", "6"))
+IMG_FETCH_BUDGET = float(os.getenv("IMG_FETCH_BUDGET", str(IMG_FETCH_TIMEOUT * 2)))   # 모든 홉+본문 합계(초)
+IMG_WEBP_QUALITY = int(os.getenv("IMG_WEBP_QUALITY", "78"))
+IMG_FAIL_TTL = float(os.getenv("IMG_FAIL_TTL", "300"))
+WIDTHS = (160, 320, 640)
+DEFAULT_WIDTH = 320
+CACHE_CONTROL = "public, max-age=31536000, immutable"     # 토큰+폭이 같으면 내용도 같다
+
+_SIG_LEN = 16
+_UA = "Mozilla/5.0 (compatible; JustGoImageProxy/1.0)"
+
+_SECRET_LOCK = threading.Lock()
+_SECRET_FAILED_AT = 0.0
+
+
+class ImageProxyError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ========= 토큰 =========
+def _secret() -> Optional[bytes]:
+    """
+    서명 비밀값. 환경변수가 없으면 공유 상태 백엔드의 ("img", "secret") 을 update 로 한 번만 만든다
+    → 여러 워커와 공유 읽기 캐시에 실린 토큰이 어느 워커에서나 맞는다.
+    백엔드가 실패하면 None(SECRET_RETRY_SEC 뒤 다시 시도) — 이 워커만 아는 토큰은 만들지 않는다.
+    """
+    global IMG_PROXY_SECRET, _SECRET_FAILED_AT
+    if IMG_PROXY_SECRET is not None:
+        return IMG_PROXY_SECRET
+    with _SECRET_LOCK:
+        if IMG_PROXY_SECRET is None and time.time() - _SECRET_FAILED_AT >= SECRET_RETRY_SEC:
+            try:
+                val = get_backend().update("img", "secret", lambda cur: cur or secrets.token_hex(32))
+                IMG_PROXY_SECRET = bytes.fromhex(val)
+            except Exception as e:
+                _SECRET_FAILED_AT = time.time()
+                log.warning("image_proxy.secret_unavailable", error=str(e))
+        return IMG_PROXY_SECRET
+
+
+def _sign(url: str, secret: bytes) -> str:
+    return hmac.new(secret, url.encode("utf-8"), hashlib.sha256).hexdigest()[:_SIG_LEN]
+
+
+def make_token(url: str) -> Optional[str]:
+    secret = _secret()
+    if secret is None:
+        return None
+    raw = base64.urlsafe_b64encode(url.encode("utf-8")).decode("ascii").rstrip("=")
+    return f"{raw}.{_sign(url, secret)}"
+
+
+def read_token(token: str) -> Optional[str]:
+    raw, _, sig = (token or "").rpartition(".")
+    if not raw or len(sig) != _SIG_LEN:
+        return None
+    secret = _secret()
+    if secret is None:
+        return None
+    try:
+        url = base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)).decode("utf-8")
+    except Exception:
+        return None
+    if not hmac.compare_digest(sig, _sign(url, secret)):
+        return None
+    return url
+
+
+def proxy_path(url: Optional[str], width: Optional[int] = None) -> Optional[str]:
+    """http(s) 이미지 URL → '/img/<token>'. 프록시할 수 없거나 서명 비밀값이 없으면 None."""
+    if not url or not url.startswith(("http://", "https://")):
+        return None
+    token = make_token(url)
+    if token is None:
+        return None
+    path = f"/img/{token}"
+    return path if not width or width == DEFAULT_WIDTH else f"{path}?w={pick_width(width)}"
+
+
+def pick_width(w: Optional[int]) -> int:
+    """요청 폭 → 허용 폭 중 그 이상인 가장 작은 값(캐시 변형 수를 묶어 둠)."""
+    if not w:
+        return DEFAULT_WIDTH
+    for x in WIDTHS:
+        if w <= x:
+            return x
+    return WIDTHS[-1]
+
+
+# ========= 디스크 캐시 =========
+class _DiskCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _scan(self) -> int:
+        total = 0
+        if self.root.exists():
+            for p in self.root.glob("*/*"):
+                try:
+                    total += p.stat().st_size
+                except OSError:
+                    pass
+        return total
+
+    def get(self, key: str) -> Optional[bytes]:
+        p = self.path(key)
+        try:
+            data = p.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(p, None)                      # 최근 사용 표시(mtime 기준 LRU)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        p = self.path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)                          # 읽는 쪽은 반쯤 쓴 파일을 보지 않는다
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan()
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict(keep=p)
+
+    def _evict(self, keep: Optional[Path] = None) -> None:
+        """총량의 90% 아래가 될 때까지 mtime 이 오래된 파일부터 지운다(방금 쓴 keep 은 남김, 잠금 안에서 호출)."""
+        files = []
+        for p in self.root.glob("*/*"):
+            if p.name.startswith(".") or p == keep:
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(f[1] for f in files) + (keep.stat().st_size if keep is not None and keep.exists() else 0)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in files:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total = total
+
+
+_CACHE = _DiskCache(IMG_CACHE_DIR, IMG_CACHE_MAX_BYTES)
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+_FAILED: Dict[str, Tuple[float, int]] = {}          # 원본 URL 해시 → (실패 시각, 상태)
+
+
+# ========= 받기/줄이기 =========
+def sniff_type(data: bytes) -> str:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _blocked_ip(ip: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+            or ip.is_multicast or ip.is_unspecified)
+
+
+def check_target(url: str) -> None:
+    """http(s) 이고, 호스트가 푸는 모든 주소가 공인 주소여야 한다. 아니면 ImageProxyError(403)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ImageProxyError(403, "unsupported image url")
+    if IMG_ALLOW_PRIVATE:
+        return
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+                                   type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise ImageProxyError(502, "upstream host does not resolve")
+    for info in infos:
+        if _blocked_ip(ipaddress.ip_address(info[4][0].split("%")[0])):
+            raise ImageProxyError(403, "upstream host resolves to an internal address")
+
+
+def _check_peer(sock: socket.socket) -> None:
+    if IMG_ALLOW_PRIVATE:
+        return
+    try:
+        ip = ipaddress.ip_address(sock.getpeername()[0].split("%")[0])
+    except (OSError, ValueError):
+        ip = None
+    if ip is None or _blocked_ip(ip):
+        sock.close()
+        raise ImageProxyError(403, "upstream host resolves to an internal address")
+
+
+class _PeerCheckedHTTPConnection(HTTPConnection):
+    def _new_conn(self) -> socket.socket:
+        sock = super()._new_conn()
+        _check_peer(sock)
+        return sock
+
+
+class _PeerCheckedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self) -> socket.socket:
+        sock = super()._new_conn()
+        _check_peer(sock)                    # TLS 핸드셰이크 전
+        return sock
+
+
+class _PeerCheckedHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _PeerCheckedHTTPConnection
+
+
+class _PeerCheckedHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _PeerCheckedHTTPSConnection
+
+
+class _PeerCheckedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _PeerCheckedHTTPPool, "https": _PeerCheckedHTTPSPool}
+
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    """연결마다 상대 주소를 검사하는 공유 세션."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            s.mount("http://", _PeerCheckedAdapter(pool_connections=8, pool_maxsize=16))
+            s.mount("https://", _PeerCheckedAdapter(pool_connections=8, pool_maxsize=16))
+            _SESSION = s
+        return _SESSION
+
+
+def _remaining(deadline: float) -> float:
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise ImageProxyError(504, "upstream fetch exceeded time budget")
+    return left
+
+
+def _fetch(url: str) -> bytes:
+    headers = {"User-Agent": _UA, "Accept": "image/avif,image/webp,image/*;q=0.8"}
+    deadline = time.monotonic() + IMG_FETCH_BUDGET
+    try:
+        for _ in range(IMG_MAX_REDIRECTS + 1):
+            check_target(url)
+            r = _session().get(url, headers=headers, timeout=min(IMG_FETCH_TIMEOUT, _remaining(deadline)),
+                               stream=True, allow_redirects=False)
+            if not r.is_redirect:
+                break
+            url = urljoin(url, r.headers.get("Location") or "")      # 다음 홉도 같은 검사를 거친다
+            r.close()
+        else:
+            raise ImageProxyError(502, "too many upstream redirects")
+        with r:
+            if r.status_code >= 400:
+                raise ImageProxyError(502, f"upstream status {r.status_code}")
+            ctype = (r.headers.get("Content-Type") or "").lower()
+            if ctype and not ctype.startswith("image/") and "octet-stream" not in ctype:
+                raise ImageProxyError(502, f"upstream is not an image ({ctype})")
+            buf = bytearray()
+            for chunk in r.iter_content(16 * 1024):      # 조금씩 흘려 보내는 원본도 예산에서 끊긴다
+                _remaining(deadline)
+                buf.extend(chunk)
+                if len(buf) > IMG_MAX_SOURCE_BYTES:
+                    raise ImageProxyError(502, "upstream image too large")
+            return bytes(buf)
+    except requests.RequestException as e:
+        raise ImageProxyError(504 if isinstance(e, requests.Timeout) else 502, f"upstream error: {e}")
+
+
+def thumbnail(data: bytes, width: int) -> bytes:
+    """원본 → 긴 변 width 이하 WebP. Pillow 가 없거나 못 읽는 형식이면 원본 그대로(이미지로 보일 때만)."""
+    if Image is None:
+        if sniff_type(data).startswith("image/"):
+            return data
+        raise ImageProxyError(502, "upstream bytes are not a recognized image")
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "P") else "RGB")
+            im.thumbnail((width, width), Image.LANCZOS)
+            out = io.BytesIO()
+            im.save(out, "WEBP", quality=IMG_WEBP_QUALITY, method=4)
+            return out.getvalue()
+    except Exception:
+        if sniff_type(data).startswith("image/"):
+            return data
+        raise ImageProxyError(502, "upstream bytes are not a readable image")
+
+
+def _cache_key(url: str, width: int) -> str:
+    return f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:32]}-{width}"
+
+
+def _build(url: str, key: str, width: int) -> bytes:
+    src = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    failed = _FAILED.get(src)
+    if failed and time.time() - failed[0] < IMG_FAIL_TTL:
+        raise ImageProxyError(failed[1], "upstream failed recently")
+    try:
+        body = thumbnail(_fetch(url), width)
+    except ImageProxyError as e:
+        if len(_FAILED) > 10000:
+            _FAILED.clear()
+        _FAILED[src] = (time.time(), e.status)
+        raise
+    _CACHE.put(key, body)
+    return body
+
+
+def get_thumbnail(token: str, width: Optional[int] = None) -> Tuple[bytes, str, str]:
+    """토큰 → (본문, Content-Type, ETag). 잘못된 토큰은 404, 원본 실패는 502/504(ImageProxyError)."""
+    url = read_token(token)
+    if url is None:
+        raise ImageProxyError(404, "invalid image token")
+    w = pick_width(width)
+    key = _cache_key(url, w)
+    etag = f'"{key}"'
+    body = _CACHE.get(key)
+    if body is None:
+        with _INFLIGHT_LOCK:
+            fut = _INFLIGHT.get(key)
+            leader = fut is None
+            if leader:
+                fut = _INFLIGHT[key] = Future()
+        if leader:
+            try:
+                body = _CACHE.get(key) or _build(url, key, w)     # 기다리는 사이 다른 워커가 채웠을 수도
+                fut.set_result(body)
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            finally:
+                with _INFLIGHT_LOCK:
+                    _INFLIGHT.pop(key, None)
+        else:
+            try:
+                body = fut.result(timeout=IMG_FETCH_BUDGET + IMG_FETCH_TIMEOUT)   # 받기 예산 + 줄이기 여유
+            except FutureTimeout:
+                raise ImageProxyError(504, "timed out waiting for in-flight fetch")
+    return body, sniff_type(body), etag
@@ -0,0 +1,108 @@
+# backend/itinerary_store.py
+"""
+서버 쪽 일정 세션(버전 관리) — /api/chat 이 전체 본문 대신 (세션, 인덱스, 버전)만 주고받게.
+
+    sid = create([("일정추천 1", "일정추천 1\\n---\\n2025-08-13 (Day1)\\n..."), ...])
+    doc = load(sid, 0)                         # {"title", "text", "version", "etag"}
+    doc = commit(sid, 0, new_text, expected=doc["version"])   # 버전이 다르면 VersionConflict
+
+- 상태 백엔드(shared_state)의 "itinerary" 네임스페이스에 세션 하나 = 값 하나 → 워커 여러 개여도 동작.
+- TTL 은 마지막 저장 기준(ITINERARY_TTL_SEC, 기본 24시간).
+- ETag 는 세션/인덱스/버전/본문 해시로 만든 강한 태그.
+- 버전 비교-저장은 백엔드의 update(원자적 읽기-수정-쓰기) 안에서 한다 → 워커가 여러 개여도
+  같은 버전으로 두 번 저장되면 하나만 이기고 다른 쪽은 VersionConflict.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .shared_state import get_backend
+except Exception:
+    from shared_state import get_backend  # type: ignore
+
+NS = "itinerary"
+ITINERARY_TTL_SEC = float(os.getenv("ITINERARY_TTL_SEC", str(24 * 3600)))
+
+
+class NotFound(KeyError):
+    pass
+
+
+class VersionConflict(Exception):
+    def __init__(self, current: Dict):
+        super().__init__(f"version conflict (current v{current.get('version')})")
+        self.current = current
+
+
+def etag_for(sid: str, index: int, version: int, text: str) -> str:
+    h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+    return f'"{sid[:8]}-{index}-v{version}-{h}"'
+
+
+def _doc(sid: str, index: int, item: Dict) -> Dict:
+    return {"session": sid, "index": index, "title": item["title"], "text": item["text"],
+            "version": item["version"], "etag": etag_for(sid, index, item["version"], item["text"])}
+
+
+def create(items: List[Tuple[str, str]]) -> str:
+    """[(제목, 본문)] → 새 세션 id. 모든 일정은 버전 1에서 시작."""
+    sid = uuid.uuid4().hex
+    get_backend().set(NS, sid, [{"title": t, "text": x, "version": 1} for t, x in items], ITINERARY_TTL_SEC)
+    return sid
+
+
+def _items(sid: str) -> List[Dict]:
+    items = get_backend().get(NS, sid) if sid else None
+    if not items:
+        raise NotFound(sid)
+    return items
+
+
+def load(sid: str, index: int) -> Dict:
+    items = _items(sid)
+    if not 0 <= index < len(items):
+        raise NotFound(f"{sid}/{index}")
+    return _doc(sid, index, items[index])
+
+
+def commit(sid: str, index: int, text: str, expected: Optional[int] = None) -> Dict:
+    """본문 저장 + 버전 1 증가. expected 가 현재 버전과 다르면 VersionConflict(현재 문서 포함)."""
+    def bump(items: Optional[List[Dict]]) -> List[Dict]:
+        if not items:
+            raise NotFound(sid)
+        if not 0 <= index < len(items):
+            raise NotFound(f"{sid}/{index}")
+        cur = items[index]
+        if expected is not None and int(expected) != cur["version"]:
+            raise VersionConflict(_doc(sid, index, cur))
+        if text == cur["text"]:
+            return items
+        items = list(items)                  # memory 백엔드는 객체를 그대로 두므로 복사해서 고친다
+        items[index] = {"title": cur["title"], "text": text, "version": cur["version"] + 1}
+        return items
+
+    if not sid:
+        raise NotFound(sid)
+    items = get_backend().update(NS, sid, bump, ITINERARY_TTL_SEC)
+    if not items:
+        raise NotFound(sid)
+    return _doc(sid, index, items[index])
+
+
+def version_from_etag(sid: str, index: int, etag: Optional[str]) -> Optional[int]:
+    """If-Match 값에서 버전을 꺼낸다(이 세션/인덱스의 태그가 아니면 None)."""
+    tag = (etag or "").strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    prefix = f"{sid[:8]}-{index}-v"
+    if not tag.startswith(prefix):
+        return None
+    try:
+        return int(tag[len(prefix):].split("-", 1)[0])
+    except ValueError:
+        return None
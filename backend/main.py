@@ -11,17 +11,25 @@ except Exception:
 
 # ========= 표준/써드파티 =========
 import re
+import math
 import json
 import urllib.parse
-import traceback
 import time
 import random
+import difflib
+import base64
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from datetime import date, datetime, timedelta
-from typing import List, Optional, Tuple, Dict, Any, Set
+from threading import Lock
+from typing import List, Optional, Tuple, Dict, Any
 
-from fastapi import FastAPI, HTTPException, Request, Body
+from fastapi import FastAPI, HTTPException, Request, Response, Body, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, computed_field
 
 # ========= 내부 모듈(상대/절대 모두 허용) =========
 try:
@@ -45,14 +53,113 @@ except Exception:
 
 try:
     from .naver_api import search_place, search_and_rank_places, search_image as _search_image, naver_map_link
+    from .naver_api import search_candidates, enrich_place, sort_places
 except Exception:
     try:
         from naver_api import search_place, search_and_rank_places, search_image as _search_image, naver_map_link  # type: ignore
+        from naver_api import search_candidates, enrich_place, sort_places  # type: ignore
     except Exception:
         _search_image = None  # 이미지 검색이 없더라도 서버가 떠야 함
         def search_place(q: str) -> Dict[str, Any]: return {}
         def search_and_rank_places(query: str, limit: int = 20, sort: str = "review_desc", **kw): return []
         def naver_map_link(name: str) -> str: return ""
+        def search_candidates(query: str, limit: int = 20) -> List[Dict[str, Any]]: return []
+        def enrich_place(it: Dict[str, Any]) -> Dict[str, Any]: return it
+        def sort_places(items: List[Dict[str, Any]], sort: str = "review_desc") -> List[Dict[str, Any]]: return items
+
+try:
+    from .place_key import name_key, row_key
+except Exception:
+    from place_key import name_key, row_key  # type: ignore
+
+try:
+    from .shared_state import get_backend as get_state_backend, shared_map
+    from .selection_store import ANON, make_selection_store, norm_session
+except Exception:
+    from shared_state import get_backend as get_state_backend, shared_map  # type: ignore
+    from selection_store import ANON, make_selection_store, norm_session  # type: ignore
+
+try:
+    from . import itinerary_store
+except Exception:
+    import itinerary_store  # type: ignore
+
+try:
+    from .multi_search import search_topk
+except Exception:
+    try:
+        from multi_search import search_topk  # type: ignore
+    except Exception:
+        def search_topk(queries, k: int, sort: str = "review_desc", **kw): return []
+
+try:
+    from .place_index import search_local
+except Exception:
+    try:
+        from place_index import search_local  # type: ignore
+    except Exception:
+        def search_local(city: str, text: str, k: int = 10, kind=None, offset: int = 0): return []
+
+try:
+    from .geo_index import nearby as geo_nearby, with_distance
+except Exception:
+    try:
+        from geo_index import nearby as geo_nearby, with_distance  # type: ignore
+    except Exception:
+        def geo_nearby(lat: float, lng: float, radius_km: float = 3.0, k=None): return []
+        def with_distance(items, lat, lng, radius_km=None): return items
+
+try:
+    from .places import google_enabled, google_nearby_restaurants, merge_google_rows, haversine_km
+except Exception:
+    try:
+        from places import google_enabled, google_nearby_restaurants, merge_google_rows, haversine_km  # type: ignore
+    except Exception:
+        def google_enabled() -> bool: return False
+        def google_nearby_restaurants(*a, **kw): return []
+        def merge_google_rows(rows, google_items, match_km: float = 0.3): return rows
+        def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+            dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+            a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1))*math.cos(math.radians(lat2))*math.sin(dlon/2)**2
+            return 2 * 6371.0 * math.asin(min(1, math.sqrt(a)))
+
+try:
+    from .image_proxy import CACHE_CONTROL as IMG_CACHE_CONTROL, ImageProxyError, get_thumbnail, proxy_path
+except Exception:
+    from image_proxy import CACHE_CONTROL as IMG_CACHE_CONTROL, ImageProxyError, get_thumbnail, proxy_path  # type: ignore
+
+try:
+    from .place_record import FIELDS as PLACE_FIELDS, parse_fields as parse_place_fields, to_records as to_place_records
+except Exception:
+    from place_record import FIELDS as PLACE_FIELDS, parse_fields as parse_place_fields, to_records as to_place_records  # type: ignore
+
+try:
+    from .query_hints import COMP_HINTS_G, STYLE_HINTS_G, cuisine_query as _cuisine_query
+except Exception:
+    from query_hints import COMP_HINTS_G, STYLE_HINTS_G, cuisine_query as _cuisine_query  # type: ignore
+
+try:
+    from .read_cache import cached_json, canonical_params
+except Exception:
+    from read_cache import cached_json, canonical_params  # type: ignore
+
+try:
+    from .response_codec import CompressionMiddleware, FastJSONResponse, encoded_etag, etag_matches, response_coding
+except Exception:
+    from response_codec import (CompressionMiddleware, FastJSONResponse, encoded_etag,  # type: ignore
+                                etag_matches, response_coding)
+
+try:
+    from .struct_log import log, RequestLogMiddleware
+except Exception:
+    from struct_log import log, RequestLogMiddleware  # type: ignore
+
+try:
+    from .token_meter import (chat_completion, stream_chat_completion, endpoint_scope, with_context,
+                              snapshot as token_snapshot)
+except Exception:
+    from token_meter import (chat_completion, stream_chat_completion, endpoint_scope, with_context,  # type: ignore
+                             snapshot as token_snapshot)
 
 # ========= FastAPI =========
 app = FastAPI(title="JustGo API (Unified)")
@@ -70,25 +177,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 간단 요청 로깅
+# 큰 JSON(장소 목록 등) 응답 압축: Accept-Encoding 협상(br > gzip), SSE 는 제외
+app.add_middleware(CompressionMiddleware)
+
+# 요청 로깅: 요청마다 req_id + JSON access 레코드(쓰기는 백그라운드 스레드). 설정은 struct_log 참고
+app.add_middleware(RequestLogMiddleware)
+
+# LLM 토큰 사용량을 엔드포인트(경로) 단위로 집계
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    try:
-        body_bytes = await request.body()
-        body_text = body_bytes.decode("utf-8", errors="ignore")
-        print("\n========== [REQ] ==========")
-        print(f"{request.method} {request.url}")
-        if body_text:
-            print(f"[BODY] {body_text[:800]}")
-    except Exception:
-        pass
-    resp = await call_next(request)
-    try:
-        print(f"[RES] status={resp.status_code}")
-        print("===========================\n")
-    except Exception:
-        pass
-    return resp
+async def meter_tokens(request: Request, call_next):
+    with endpoint_scope(request.url.path):
+        return await call_next(request)
+
+@app.get("/api/metrics/tokens")
+def token_metrics():
+    return {"stats": token_snapshot()}
+
+@app.post("/api/metrics/tokens/reset")
+def token_metrics_reset():
+    """집계를 비운다. 비우기 직전 값을 돌려준다(읽기와 비우기 사이의 호출도 빠지지 않음)."""
+    return {"stats": token_snapshot(reset=True)}
 
 # ========= 유틸 =========
 
@@ -238,7 +346,7 @@ def dedupe_time_and_place(detail: str) -> str:
         if _TIME_RE.search(ln):
             _, core = _place_core_from_line(ln)
             if core:
-                key = core.lower()
+                key = name_key(core)
                 if key in seen:
                     # 중복 발견 → 해당 라인 제거(건너뛰기)
                     continue
@@ -292,42 +400,26 @@ def _norm_place(p: str) -> str:
     return re.sub(r"\s+", " ", (p or "").strip())
 
 
-
-# 전역 힌트(랜덤 후보 풀 생성 시 사용)
-STYLE_HINTS_G = {
-    "SNS": ["핫플", "포토스팟", "인스타", "뷰맛집", "전망대"],
-    "핫플": ["핫플", "포토스팟", "인스타"],
-    "자연": ["자연", "호수", "숲길", "해변", "산책"],
-    "힐링": ["힐링", "온천", "스파", "정원", "산책"],
-    "역사": ["유적지", "박물관", "고궁", "전시"],
-    "체험": ["체험", "공방", "액티비티"],
-    "맛집": ["맛집", "현지 맛집"],
-}
-COMP_HINTS_G = {
-    "가족": ["아이와", "키즈", "체험", "박물관"],
-    "아이": ["아이와", "키즈"],
-    "친구": ["포토스팟", "핫플"],
-    "연인": ["야경", "전망대", "산책"],
-    "부모님": ["사찰", "정원", "유적지", "한옥"],
-}
-
 # ========= NAVER 호출 안전 래퍼/캐시 =========
-_NAVER_CACHE: dict[str, dict] = {}
-_NAVER_RATE_LIMIT_UNTIL = 0.0  # epoch seconds
+# 캐시/쿨다운 시각은 상태 백엔드(STATE_BACKEND)에 둔다 → 워커 여러 개가 같이 씀
+_NAVER_CACHE = shared_map("naver_place", ttl=6 * 3600)
 _NAVER_COOLDOWN_SEC = 60       # 429 맞으면 60초 쉬기
 _NAVER_POLITE_DELAY = 0.12     # 호출 간 딜레이
 
+def _naver_rate_limit_until() -> float:
+    return get_state_backend().get("rate", "naver_until") or 0.0
+
 def _naver_ok() -> bool:
-    return time.time() >= _NAVER_RATE_LIMIT_UNTIL
+    return time.time() >= _naver_rate_limit_until()
 
 def _search_place_safe(q: str) -> dict:
     """캐시 + 429 쿨다운 + 소량 딜레이."""
-    global _NAVER_RATE_LIMIT_UNTIL
     now = time.time()
-    if now < _NAVER_RATE_LIMIT_UNTIL:
+    if now < _naver_rate_limit_until():
         return {}
-    if q in _NAVER_CACHE:
-        return _NAVER_CACHE[q]
+    hit = _NAVER_CACHE.get(q)
+    if hit is not None:
+        return hit
     try:
         res = search_place(q) or {}
         _NAVER_CACHE[q] = res
@@ -336,12 +428,52 @@ def _search_place_safe(q: str) -> dict:
     except RuntimeError as e:
         msg = str(e)
         if "429" in msg or "Rate limit" in msg:
-            _NAVER_RATE_LIMIT_UNTIL = now + _NAVER_COOLDOWN_SEC
-            print(f"[NAVER] rate-limited. cooling down {_NAVER_COOLDOWN_SEC}s")
+            get_state_backend().set("rate", "naver_until", now + _NAVER_COOLDOWN_SEC, ttl=_NAVER_COOLDOWN_SEC)
+            log.warning("naver.rate_limited", cooldown_sec=_NAVER_COOLDOWN_SEC)
         return {}
     except Exception:
         return {}
 
+# ========= 병렬 보강(fan-out) =========
+ENRICH_MAX_WORKERS = 6       # 동시에 도는 장소 보강 작업 수
+ENRICH_BATCH_TIMEOUT = 12.0  # fan_out 한 번(항목 전부의 검색+이미지)에 허용하는 시간(초)
+
+def fan_out(items: list, fn, max_workers: int = ENRICH_MAX_WORKERS,
+            timeout: float = ENRICH_BATCH_TIMEOUT) -> list:
+    """
+    items 각각에 fn을 동시에 적용하고, 원래 순서대로 결과를 돌려준다.
+    - 동시 실행 수 제한(max_workers)
+    - 배치 전체 마감: 호출부터 timeout 초 안에 끝나지 않은 항목은 버림(대기열에 남은 것은 취소)
+    - 예외/None/타임아웃 항목은 건너뜀(나머지는 계속 진행)
+    """
+    items = list(items or [])
+    if not items:
+        return []
+
+    @with_context
+    def _run(x):
+        return fn(x)
+
+    ex = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    try:
+        futs = {ex.submit(_run, x): i for i, x in enumerate(items)}
+        wait(futs, timeout=timeout)             # 늦은 항목은 포기(실행 중인 스레드는 알아서 끝남)
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    out = []
+    for f, i in sorted(futs.items(), key=lambda x: x[1]):
+        if not f.done() or f.cancelled():
+            continue
+        try:
+            r = f.result()
+        except Exception as e:
+            log.warning("fan_out.item_error", item=i, error=str(e))
+            continue
+        if r is not None:
+            out.append(r)
+    return out
+
 # ========= 패턴들 =========
 PLACEHOLDER_PAT = re.compile(r"(주요명소|명소|관광|관광지|체험|산책|카페|휴식|식당|맛집|점심|저녁|아침)", re.I)
 _ADDR_PAT = re.compile(r"\((?:[^()]*?(?:로|길|구|시|도|동|읍|면)[^()]*)\)")
@@ -485,13 +617,115 @@ def ensure_all_days(detail: str, full_dates: list[str], city: str) -> str:
         body += "\n".join(_day_template(d, city)) + "\n"
     return body.strip()
 
+# ========= 누락 날짜만 재생성(병렬) =========
+_DATE_TOKEN_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_REPAIR_TOKENS_PER_DAY = 320
+
+def missing_dates(block_text: str, full_dates: list[str], short_dates: list[str]) -> list[tuple[str, str]]:
+    """expected_date_strings 기준으로 본문에 없는 (full, short) 날짜 목록."""
+    return [(fd, sd) for fd, sd in zip(full_dates, short_dates)
+            if (fd not in block_text) and (sd not in block_text)]
+
+def _split_day_blocks(text: str) -> tuple[list[str], list[tuple[str, list[str]]]]:
+    """본문 → (첫 날짜 헤더 이전 줄들, [(YYYY-MM-DD, 블록 줄들), ...])"""
+    lines = (text or "").splitlines()
+    blocks = _iter_day_blocks(lines)
+    if not blocks:
+        return lines, []
+    pre = lines[:blocks[0][1]]
+    out: list[tuple[str, list[str]]] = []
+    for _, start, end in blocks:
+        m = _DATE_TOKEN_RE.search(lines[start])
+        out.append((m.group(0) if m else "", lines[start:end]))
+    return pre, out
+
+def splice_day_blocks(detail: str, patch: str, short_dates: list[str]) -> str:
+    """
+    patch 안의 날짜 블록 중 detail에 없는 날짜만 골라 끼워 넣고,
+    전체 날짜 블록을 short_dates 순서로 정렬한다(모르는 날짜는 원래 순서대로 뒤에).
+    """
+    pre, blocks = _split_day_blocks(detail)
+    have = {d for d, _ in blocks if d}
+    _, new_blocks = _split_day_blocks(patch)
+    for d, bl in new_blocks:
+        if d and d in short_dates and d not in have:
+            while bl and not bl[-1].strip():
+                bl = bl[:-1]
+            blocks.append((d, bl + [""]))
+            have.add(d)
+    order = {d: i for i, d in enumerate(short_dates)}
+    blocks = [b for _, b in sorted(enumerate(blocks),
+                                   key=lambda x: (order.get(x[1][0], len(order)), x[0]))]
+    lines = list(pre)
+    for _, bl in blocks:
+        lines += bl
+    return "\n".join(lines).strip()
+
+def _used_place_names(detail: str) -> list[str]:
+    out: list[str] = []
+    for ln in (detail or "").splitlines():
+        if _TIME_RE.search(ln):
+            nm = _place_name_from_line(ln)
+            if nm:
+                out.append(nm)
+    return list(dict.fromkeys(out))
+
+def _request_missing_days(city: str, budget: Optional[int], style: str,
+                          detail: str, missing: list[tuple[str, str]]) -> str:
+    """누락된 날짜 블록만 요청한다(기존 블록 전체를 다시 쓰게 하지 않음)."""
+    used = _used_place_names(detail)
+    messages = [
+        {"role": "system", "content": (
+            "너는 여행 일정 전문가야. 요청한 날짜 블록만 출력한다(제목/총비용/설명 금지). "
+            "각 블록은 'YYYY-MM-DD (DayN)' 헤더 다음에 정확히 5줄: "
+            "08:00 ~ 09:30 아침: / 09:30 ~ 12:00 / 12:00 ~ 13:30 점심: / 14:00 ~ 18:00 / 19:00 ~ 20:30 저녁: , "
+            "각 줄은 '실제 상호명 (도로명 주소) (약 xx,xxx원)' 형식."
+        )},
+    ]
+    user = [f"[여행지] {city}", f"[여행 스타일] {style or '자유 여행'}"]
+    if budget is not None:
+        user.append(f"[총 예산] {budget:,}원")
+    user += ["[작성할 날짜 헤더]", *[fd for fd, _ in missing], "",
+             "[이미 사용한 장소(중복 금지)]", ", ".join(used) if used else "없음"]
+    messages.append({"role": "user", "content": "\n".join(user)})
+    resp = chat_completion(
+        client, stage="repair_days",
+        model="gpt-4o-mini", messages=messages, temperature=0.3,
+        max_tokens=_REPAIR_TOKENS_PER_DAY * len(missing) + 64,
+    )
+    return _normalize_gpt_text(resp.choices[0].message.content or "")
+
+def repair_missing_days(bodies: list[str], city: str, budget: Optional[int], style: str,
+                        full_dates: list[str], short_dates: list[str]) -> list[str]:
+    """
+    섹션별 누락 날짜만 동시에 재생성해서 제자리에 끼워 넣는다.
+    실패한 섹션은 원문 유지(뒤에서 ensure_all_days가 템플릿으로 채움).
+    """
+    jobs = {i: missing_dates(b, full_dates, short_dates) for i, b in enumerate(bodies)}
+    jobs = {i: m for i, m in jobs.items() if m}
+    if not jobs or client is None:
+        return bodies
+    out = list(bodies)
+    with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+        futs = {ex.submit(with_context(_request_missing_days), city, budget, style, bodies[i], m): i
+                for i, m in jobs.items()}
+        for fut in as_completed(futs):
+            i = futs[fut]
+            try:
+                patch = fut.result()
+                if patch:
+                    out[i] = splice_day_blocks(bodies[i], patch, short_dates)
+            except Exception as e:
+                log.warning("plan.repair_days_error", section=i, error=str(e))
+    return out
+
 # ========= 후보/선택 주입 =========
 def _unique_list(seq: list[str]) -> list[str]:
     seen = set()
     out = []
     for s in seq or []:
         p = _norm_place(s)
-        k = p.lower()
+        k = name_key(p)
         if p and k not in seen:
             seen.add(k)
             out.append(p)
@@ -505,18 +739,32 @@ def _addr_for(city: str, name: str) -> str:
         return ""
 
 def _collect_names(rows: list[dict]) -> list[str]:
+    # 검색 결과는 이름+주소 키로 중복 제거(체인점은 지점까지 구분). 같은 문자열 이름은 한 번만.
     out, seen = [], set()
     for it in rows or []:
         name = _clean_html(it.get("name") or it.get("title") or it.get("place_name") or "")
-        addr = (it.get("address") or it.get("road_address") or it.get("addr") or "").strip()
-        k = f"{name}|{addr}"
-        if name and k not in seen:
+        k = row_key(it)
+        if name and k not in seen and name not in out:
             seen.add(k)
             out.append(name)
     return out
 
+_POOL_MEMO: dict[tuple, tuple[float, list[str], list[str], dict]] = {}
+_POOL_MEMO_LOCK = Lock()
+_POOL_MEMO_TTL = 600.0      # 같은 계획 요청 안에서 주입/예산 단계가 후보 풀을 다시 쓰도록
+
 def _build_candidate_pools(city: str, styles: list[str], companions: list[str],
-                           budget: Optional[int], limit: int = 25) -> tuple[list[str], list[str]]:
+                           budget: Optional[int], limit: int = 25,
+                           rows: Optional[dict] = None) -> tuple[list[str], list[str]]:
+    """rows 에 dict 를 넘기면 후보 검색 행을 name_key → 행 으로 채워 준다(좌표/카테고리/가격용)."""
+    memo_key = (city, tuple(styles or []), tuple(companions or []), budget, limit)
+    with _POOL_MEMO_LOCK:
+        hit = _POOL_MEMO.get(memo_key)
+    if hit and time.time() - hit[0] < _POOL_MEMO_TTL:
+        if rows is not None:
+            rows.update(hit[3])
+        return list(hit[1]), list(hit[2])
+
     q_atr = [f"{city} 관광지"]
     q_rst = [f"{city} 맛집"]
     for s in styles or []:
@@ -534,18 +782,154 @@ def _build_candidate_pools(city: str, styles: list[str], companions: list[str],
         q_rst += [f"{city} 분식", f"{city} 가성비 맛집"]
 
     atr_names, rst_names = [], []
+    meta: dict = {}
     try:
-        for q in dict.fromkeys(q_atr).keys():
-            rows = search_and_rank_places(query=q, limit=limit, sort="review_desc") or []
-            atr_names += _collect_names(rows)
-            if len(atr_names) >= limit: break
-        for q in dict.fromkeys(q_rst).keys():
-            rows = search_and_rank_places(query=q, limit=limit, sort="review_desc") or []
-            rst_names += _collect_names(rows)
-            if len(rst_names) >= limit: break
+        # 이름만 쓰므로 이미지 보강은 생략
+        atr_rows = search_topk(q_atr, k=limit, per_query=limit, images=False)
+        rst_rows = search_topk(q_rst, k=limit, per_query=limit, images=False)
+        atr_names, rst_names = _collect_names(atr_rows), _collect_names(rst_rows)
+        for kind, group in (("attraction", atr_rows), ("restaurant", rst_rows)):
+            for it in group or []:
+                k = name_key(_clean_html(it.get("name") or it.get("title") or ""))
+                if k and k not in meta:
+                    meta[k] = dict(it, kind=kind)
     except Exception:
         pass
-    return _unique_list(atr_names), _unique_list(rst_names)
+    if atr_names or rst_names:
+        with _POOL_MEMO_LOCK:
+            now = time.time()
+            for k in [k for k, v in _POOL_MEMO.items() if now - v[0] >= _POOL_MEMO_TTL]:
+                _POOL_MEMO.pop(k, None)
+            _POOL_MEMO[memo_key] = (now, atr_names, rst_names, meta)
+    if rows is not None:
+        rows.update(meta)
+    return list(atr_names), list(rst_names)
+
+# ========= 날짜별 지역 묶기(3일 이상) =========
+GEO_CLUSTER_MIN_DAYS = 3     # 이 일수부터 날짜별로 지역을 나눠 채움
+_DAY_ATR_SLOTS = 2           # 날짜당 관광 슬롯(오전/오후)
+_DAY_RST_SLOTS = 3           # 날짜당 식사 슬롯(아침/점심/저녁)
+
+def _row_point(it: dict) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = float(it.get("lat")), float(it.get("lng"))
+    except (TypeError, ValueError):
+        return None
+    if not lat or not lng or lat != lat or lng != lng:
+        return None
+    return lat, lng
+
+def _place_point(city: str, name: str) -> Optional[Tuple[float, float]]:
+    """장소 이름 → 좌표. _addr_for 와 같은 질의라 대개 캐시에서 나온다."""
+    if not name:
+        return None
+    return _row_point(_search_place_safe(f"{city} {name}") or {})
+
+def _flat_xy(p: Tuple[float, float]) -> Tuple[float, float]:
+    # 도시 규모에서는 등거리 투영으로 충분(km 단위)
+    return p[0] * 110.574, p[1] * 111.320 * math.cos(math.radians(p[0]))
+
+def _kmeans(points: list[Tuple[float, float]], k: int, iters: int = 20) -> list[Tuple[float, float]]:
+    """
+    위경도 점들의 k-means 중심(위경도). k-means++ 초기화(random 은 호출부에서 시드 고정).
+    빈 군집은 현재 중심에서 가장 먼 점으로 다시 심는다.
+    """
+    xy = [_flat_xy(p) for p in points]
+    if not xy:
+        return []
+    k = max(1, min(k, len(xy)))
+
+    def _d2(a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
+
+    cents = [xy[random.randrange(len(xy))]]
+    while len(cents) < k:
+        w = [min(_d2(p, c) for c in cents) for p in xy]
+        tot = sum(w)
+        if tot <= 0:
+            break
+        r, acc = random.random() * tot, 0.0
+        for p, wi in zip(xy, w):
+            acc += wi
+            if acc >= r:
+                cents.append(p)
+                break
+    assign = [-1] * len(xy)
+    for _ in range(iters):
+        new = [min(range(len(cents)), key=lambda c: _d2(p, cents[c])) for p in xy]
+        if new == assign:
+            break
+        assign = new
+        for c in range(len(cents)):
+            mem = [xy[i] for i in range(len(xy)) if assign[i] == c]
+            if mem:
+                cents[c] = (sum(m[0] for m in mem) / len(mem), sum(m[1] for m in mem) / len(mem))
+            else:
+                cents[c] = max(xy, key=lambda p: min(_d2(p, q) for q in cents))
+    # km 평면 → 위경도
+    out = []
+    for x, y in cents:
+        lat = x / 110.574
+        out.append((lat, y / (111.320 * max(0.01, math.cos(math.radians(lat))))))
+    return out
+
+def _assign_capacity(names: list[str], pts: dict, cents: list, cap: int) -> list[list[str]]:
+    """
+    좌표 있는 이름을 가까운 중심(날짜)에 배정하되 날짜당 cap 개까지.
+    가까운 것부터 배정하고, 넘치면 다음으로 가까운 날짜로. 모든 날짜가 차면 가장 가까운 날짜에 붙인다.
+    좌표 없는 이름은 배정하지 않는다(호출부가 전역 풀로 처리).
+    """
+    buckets: list[list[str]] = [[] for _ in cents]
+    ranked = []
+    for n in names:
+        p = pts.get(name_key(n))
+        if p is None:
+            continue
+        ds = sorted((haversine_km(p[0], p[1], c[0], c[1]), ci) for ci, c in enumerate(cents))
+        ranked.append((ds[0][0], n, [ci for _, ci in ds]))
+    for _, n, prefs in sorted(ranked, key=lambda x: x[0]):
+        ci = next((c for c in prefs if len(buckets[c]) < cap), prefs[0])
+        buckets[ci].append(n)
+    return buckets
+
+def _geo_day_pools(city: str, n_days: int, sel_atr: list[str], sel_rst: list[str],
+                   cand_atr: list[str], cand_rst: list[str], cand_pts: dict) -> Optional[list[tuple]]:
+    """
+    날짜 수(k)만큼 관광지 좌표를 k-means 로 묶고, 날짜마다 (선택 관광, 후보 관광, 선택 맛집, 후보 맛집) 풀을 만든다.
+    - 선택 장소는 용량(날짜당 슬롯 수) 제한 배정 → 한 날짜에 몰리지 않음
+    - 후보는 그 날짜 중심에서 가까운 순(좌표 없는 후보는 뒤에 원래 순서로)
+    좌표가 모자라 묶을 수 없으면 None(호출부는 기존 전역 풀 사용).
+    """
+    if n_days < GEO_CLUSTER_MIN_DAYS:
+        return None
+    pts = dict(cand_pts)
+    for n in [*sel_atr, *sel_rst]:
+        k = name_key(n)
+        if k not in pts:
+            p = _place_point(city, n)
+            if p:
+                pts[k] = p
+    atr_pts = [pts[name_key(n)] for n in [*sel_atr, *cand_atr] if name_key(n) in pts]
+    if len(atr_pts) < n_days:
+        return None
+    cents = _kmeans(atr_pts, n_days)
+    if len(cents) < n_days:
+        return None
+    # 날짜 순서는 중심을 서→동으로 훑는 순(연속한 날끼리 가깝게)
+    cents.sort(key=lambda c: (c[1], c[0]))
+
+    sel_a = _assign_capacity(sel_atr, pts, cents, _DAY_ATR_SLOTS)
+    sel_r = _assign_capacity(sel_rst, pts, cents, _DAY_RST_SLOTS)
+    no_pt_sel_a = [n for n in sel_atr if name_key(n) not in pts]
+    no_pt_sel_r = [n for n in sel_rst if name_key(n) not in pts]
+
+    def _near(names: list[str], c) -> list[str]:
+        with_pt = [n for n in names if name_key(n) in pts]
+        with_pt.sort(key=lambda n: haversine_km(c[0], c[1], *pts[name_key(n)]))
+        return with_pt + [n for n in names if name_key(n) not in pts]
+
+    return [(sel_a[d] + no_pt_sel_a, _near(cand_atr, c), sel_r[d] + no_pt_sel_r, _near(cand_rst, c))
+            for d, c in enumerate(cents)]
 
 def inject_selected_once_and_fill(detail: str, city: str,
                                   styles: list[str], companions: list[str], budget: Optional[int],
@@ -554,13 +938,16 @@ def inject_selected_once_and_fill(detail: str, city: str,
     - selected_* 는 일정 전체에서 각 1회만 사용
     - 나머지 슬롯은 스타일/동반자/예산 기반 후보에서 랜덤으로 채움
     - 오전/오후 슬롯은 날짜당 최대 한 번만 치환
+    - 3일 이상이면 날짜마다 한 지역(k-means 군집)의 장소로 채움
     """
     text = (detail or "").strip()
     if not text:
         return text
 
     random.seed(hash((city, "|".join(styles or []), "|".join(companions or []), budget, len(text))) & 0xFFFFFFFF)
-    cand_atr, cand_rst = _build_candidate_pools(city, styles, companions, budget)
+    cand_rows: dict = {}
+    cand_atr, cand_rst = _build_candidate_pools(city, styles, companions, budget, rows=cand_rows)
+    cand_pts = {k: _row_point(r) for k, r in cand_rows.items() if _row_point(r)}
 
     sel_atr = _unique_list(selected_attractions)
     sel_rst = _unique_list(selected_restaurants)
@@ -597,10 +984,25 @@ def inject_selected_once_and_fill(detail: str, city: str,
                 idx = len(block)-1
         return idx
 
+    day_pools = None
+    try:
+        day_pools = _geo_day_pools(city, len(date_idx), sel_atr, sel_rst, cand_atr, cand_rst, cand_pts)
+    except Exception as e:
+        log.warning("plan.geo_cluster_error", error=str(e))
+
+    shift = 0   # 앞 블록에서 끼워 넣은 줄 수만큼 뒤 블록 위치가 밀린다
     for k in range(len(date_idx)):
-        start = date_idx[k]
-        end   = date_idx[k+1] if k+1 < len(date_idx) else len(lines)
+        start = date_idx[k] + shift
+        end   = date_idx[k+1] + shift if k+1 < len(date_idx) else len(lines)
         block = lines[start:end]
+        if day_pools:
+            # 그날 지역 풀 우선, 모자라면 전역 풀(used_all 로 중복은 걸러짐)
+            d_sel_atr, d_cand_atr, d_sel_rst, d_cand_rst = day_pools[k]
+            pick_atr = lambda: _pick(d_sel_atr) or _pick(d_cand_atr) or _pick(sel_atr) or _pick(cand_atr)
+            pick_rst = lambda: _pick(d_sel_rst) or _pick(d_cand_rst) or _pick(sel_rst) or _pick(cand_rst)
+        else:
+            pick_atr = lambda: _pick(sel_atr) or _pick(cand_atr)
+            pick_rst = lambda: _pick(sel_rst) or _pick(cand_rst)
 
         # 필수 식사 라인 확보
         idx_breakfast = _ensure_meal(block, "아침",  "08:00 ~ 09:30")
@@ -617,19 +1019,19 @@ def inject_selected_once_and_fill(detail: str, city: str,
 
         # (1) 오전 슬롯 치환 (블록 스캔이 끝난 후 '한 번만' 수행)
         if idx_0912 is not None and (line_looks_like_placeholder(block[idx_0912]) or not line_has_address(block[idx_0912])):
-            picked = _pick(sel_atr) or _pick(cand_atr)
+            picked = pick_atr()
             if picked:
                 addr = _addr_for(city, picked)
                 block[idx_0912] = f"09:30 ~ 12:00 {picked}" + (f" ({addr})" if addr else "")
 
         # (2) 오후 14~18 관광지 (없으면 추가, 있으면 치환)
         if idx_1418 is not None and (line_looks_like_placeholder(block[idx_1418]) or not line_has_address(block[idx_1418])):
-            picked = _pick(sel_atr) or _pick(cand_atr)
+            picked = pick_atr()
             if picked:
                 addr = _addr_for(city, picked)
                 block[idx_1418] = f"14:00 ~ 18:00 {picked}" + (f" ({addr})" if addr else "")
         elif idx_1418 is None:
-            picked = _pick(sel_atr) or _pick(cand_atr)
+            picked = pick_atr()
             if picked:
                 addr = _addr_for(city, picked)
                 ins_at = idx_dinner if idx_dinner is not None else len(block)
@@ -645,16 +1047,134 @@ def inject_selected_once_and_fill(detail: str, city: str,
                 continue
             line = block[idx_meal]
             if line_looks_like_placeholder(line) or not line_has_address(line):
-                picked = _pick(sel_rst) or _pick(cand_rst)
+                picked = pick_rst()
                 if picked:
                     span = _extract_time_span(line) or default_span
                     addr = _addr_for(city, picked)
                     block[idx_meal] = f"{span} {label}: {picked}" + (f" ({addr})" if addr else "")
 
         lines[start:end] = block  # 날짜 블록 반영
+        shift += len(block) - (end - start)
 
     return "\n".join(lines).strip()
 
+# ========= 동선 최적화 =========
+# 식사 외에도 자리를 옮기면 안 되는 줄(숙소/이동 등)
+_ROUTE_FIXED_PAT = re.compile(r"(체크인|체크아웃|숙소|호텔|공항|터미널|출발|도착|귀가|이동)")
+
+def _line_point(city: str, line: str) -> Optional[Tuple[float, float]]:
+    """시간 라인의 장소 좌표."""
+    nm = _place_name_from_line(line)
+    if not nm or PLACEHOLDER_PAT.fullmatch(nm):
+        return None
+    return _place_point(city, nm)
+
+def _route_km(points: list) -> float:
+    """좌표 있는 지점끼리 순서대로 이은 거리 합(좌표 없는 줄은 건너뜀)."""
+    total, prev = 0.0, None
+    for p in points:
+        if p is None:
+            continue
+        if prev is not None:
+            total += haversine_km(prev[0], prev[1], p[0], p[1])
+        prev = p
+    return total
+
+def _plan_route(points: list, free: list[int]) -> list[int]:
+    """
+    points[i]: i번째 시간 라인 좌표(None 가능), free: 자리를 바꿀 수 있는 위치(나머지는 고정 앵커).
+    반환 order: order[i] = i번째 자리에 올 원래 라인 위치.
+    최근접 이웃으로 시작해 free 자리끼리 2-opt(구간 뒤집기)로 다듬고, 원래 순서보다 나쁘면 원래 순서.
+    """
+    n = len(points)
+    order = list(range(n))
+    if len(free) < 2:
+        return order
+
+    def _length(o: list[int]) -> float:
+        return _route_km([points[i] for i in o])
+
+    # 1) 최근접 이웃: 앞에서부터 free 자리마다 직전 지점(없으면 다음 앵커)에 가장 가까운 장소
+    free_set = set(free)
+    left = list(free)
+    nn = list(order)
+    prev = None
+    for pos in range(n):
+        if pos not in free_set:
+            if points[pos] is not None:
+                prev = points[pos]
+            continue
+        ref = prev
+        if ref is None:
+            ref = next((points[q] for q in range(pos + 1, n) if q not in free_set and points[q] is not None), None)
+        if ref is None:
+            pick = left[0]
+        else:
+            pick = min(left, key=lambda q: haversine_km(ref[0], ref[1], points[q][0], points[q][1]))
+        left.remove(pick)
+        nn[pos] = pick
+        prev = points[pick]
+
+    # 2) 2-opt: free 자리에 놓인 장소 구간을 뒤집어 보고 줄면 채택(앵커는 제자리)
+    best, best_len = nn, _length(nn)
+    improved = True
+    while improved:
+        improved = False
+        for a in range(len(free) - 1):
+            for b in range(a + 1, len(free)):
+                cand = list(best)
+                seg = [cand[free[t]] for t in range(a, b + 1)][::-1]
+                for t, q in zip(range(a, b + 1), seg):
+                    cand[free[t]] = q
+                cl = _length(cand)
+                if cl < best_len - 1e-9:
+                    best, best_len, improved = cand, cl, True
+    return best if best_len < _length(order) - 1e-9 else order
+
+def optimize_day_routes(detail: str, city: str) -> str:
+    """
+    날짜 블록마다 관광 슬롯 장소를 동선 순으로 재배치한다.
+    - 시간대(span)는 제자리, 그 뒤 내용만 옮긴다.
+    - 식사/숙소·이동 줄과 좌표를 못 찾은 줄은 고정 앵커.
+    """
+    lines = (detail or "").splitlines()
+    date_idx = [i for i, ln in enumerate(lines) if _DATE_HDR_RE.match(ln.strip())]
+    for k, start in enumerate(date_idx):
+        end = date_idx[k + 1] if k + 1 < len(date_idx) else len(lines)
+        rows = []   # (라인 위치, span, 내용, 좌표, 이동 가능)
+        for j in range(start + 1, end):
+            m = _TS_RE.match(lines[j])
+            if not m:
+                continue
+            span, rest = m.groups()
+            core = rest.split("(")[0]
+            pt = _line_point(city, lines[j])
+            movable = pt is not None and not _MEAL_PAT.search(core) and not _ROUTE_FIXED_PAT.search(core)
+            rows.append((j, span, rest, pt, movable))
+
+        points = [r[3] for r in rows]
+        order = _plan_route(points, [i for i, r in enumerate(rows) if r[4]])
+        for pos, src in enumerate(order):
+            if src != pos:
+                j, span = rows[pos][0], rows[pos][1]
+                indent = lines[j][:len(lines[j]) - len(lines[j].lstrip())]
+                lines[j] = f"{indent}{span} {rows[src][2]}"
+    return "\n".join(lines)
+
+def day_route_km(detail: str, city: str) -> list[Optional[float]]:
+    """
+    날짜별 이동 거리(km, 시간 줄 순서대로) — 좌표 있는 지점이 2개 미만이면 None.
+    슬롯을 바꾸는 마지막 단계 뒤에 계산해야 본문과 맞는다.
+    """
+    lines = (detail or "").splitlines()
+    date_idx = [i for i, ln in enumerate(lines) if _DATE_HDR_RE.match(ln.strip())]
+    day_km: list[Optional[float]] = []
+    for k, start in enumerate(date_idx):
+        end = date_idx[k + 1] if k + 1 < len(date_idx) else len(lines)
+        points = [_line_point(city, lines[j]) for j in range(start + 1, end) if _TS_RE.match(lines[j])]
+        day_km.append(round(_route_km(points), 1) if sum(p is not None for p in points) >= 2 else None)
+    return day_km
+
 def _replace_line_with_real_place(line: str, city: str) -> str:
     try:
         m = re.match(r"(\s*\d{2}:\d{2}\s*~\s*\d{2}:\d{2})\s+(.+)", line)
@@ -734,7 +1254,7 @@ def dedupe_places(detail: str, city: str,
     def _take_from_pool(pool: list[str]) -> Optional[str]:
         while pool:
             cand = pool.pop(0)
-            ck = _strip_meal_prefix(cand).lower()
+            ck = name_key(cand)
             if ck and ck not in used:
                 return cand
         return None
@@ -745,8 +1265,7 @@ def dedupe_places(detail: str, city: str,
             out.append(line); continue
         span, rest = m.groups()
         core_raw = rest.split("(")[0].strip()
-        core = _strip_meal_prefix(core_raw)
-        key = re.sub(r"\s+", " ", core.lower())
+        key = name_key(core_raw)
         meal_label = None
         if re.search(r"(아침|브런치)", rest): meal_label = "아침"
         elif re.search(r"(점심|런치)", rest):  meal_label = "점심"
@@ -758,7 +1277,7 @@ def dedupe_places(detail: str, city: str,
                 addr = _addr_for(city, picked)
                 prefix = (meal_label + ": ") if meal_label else ""
                 out.append(f"{span} {prefix}{picked}" + (f" ({addr})" if addr else ""))
-                used.add(_strip_meal_prefix(picked).lower())
+                used.add(name_key(picked))
             else:
                 out.append(line)
         else:
@@ -775,9 +1294,7 @@ def dedupe_time_and_place(detail: str) -> str:
     seen: set[Tuple[str, str]] = set()
 
     def normalize_name(rest: str) -> str:
-        core = rest.split("(")[0]
-        core = _strip_meal_prefix(core)
-        return re.sub(r"\s+", " ", core).strip().lower()
+        return name_key(rest.split("(")[0])
 
     def reset_day():
         seen.clear()
@@ -886,7 +1403,7 @@ def _place_core_from_line(line: str) -> tuple[Optional[str], Optional[str]]:
     core = _strip_meal_prefix(rest.split("(")[0].strip())
     return span, (core or None)
 
-_PRICE_CACHE: dict[str, int] = {}
+_PRICE_CACHE = shared_map("price", ttl=24 * 3600)
 
 def ensure_costs_per_line(detail: str, city: str, budget: Optional[int] = None) -> str:
     """각 활동 라인 끝에 (약 xx,xxx원)을 실제 데이터 기반으로 부착. 없으면 합리적 기본값."""
@@ -902,10 +1419,9 @@ def ensure_costs_per_line(detail: str, city: str, budget: Optional[int] = None)
         _, core = _place_core_from_line(ln)
         price: Optional[int] = None
         if core:
-            key = f"{city}|{core}".lower()
-            if key in _PRICE_CACHE:
-                price = _PRICE_CACHE[key]
-            else:
+            key = f"{city}|{name_key(core)}"
+            price = _PRICE_CACHE.get(key)
+            if price is None:
                 info = _best_place(city, core)
                 price = _price_from_info(info)
                 if price is None and _naver_ok():
@@ -930,57 +1446,126 @@ def ensure_costs_per_line(detail: str, city: str, budget: Optional[int] = None)
         lines[i] = ln.rstrip() + f" (약 {price:,}원)"
     return "\n".join(lines).strip()
 
+# ========= 예산 맞추기(슬롯 교체) =========
+BUDGET_BAND = 0.15           # build_prompt 규칙: 총액은 예산의 ±15%
+_LINE_COST_RE = re.compile(r"\s*\(약\s*(\d{1,3}(?:,\d{3})+|\d+)\s*원\)\s*$")
+
+def _candidate_price(city: str, row: dict, label: str) -> int:
+    """후보 가격: 가격 캐시 → 검색 행의 가격 정보 → 라인 규칙 기본값(식사 라벨/카테고리)."""
+    name = _clean_html(row.get("name") or row.get("title") or "")
+    cached = _PRICE_CACHE.get(f"{city}|{name_key(name)}")
+    if cached is not None:
+        return cached
+    price = _price_from_info(row)
+    if price is None:
+        # 시간대 추정은 관광 슬롯(09:30~)을 아침으로 읽으므로 식사 라벨만 넘긴다
+        price = _fallback_price(f"{label} {name} {row.get('category') or ''}")
+    return price
+
+def _line_costs_total(text: str) -> int:
+    """시간 줄 끝의 '(약 N원)' 만 합산 — LLM 의 '총 예상 비용' 문구 등은 세지 않는다."""
+    total = 0
+    for ln in (text or "").splitlines():
+        m = _LINE_COST_RE.search(ln)
+        if m and _TS_RE.match(ln):
+            total += int(m.group(1).replace(",", ""))
+    return total
+
+def fit_budget(detail: str, city: str, budget: Optional[int], rows: dict,
+               fixed: Optional[list[str]] = None, band: float = BUDGET_BAND) -> str:
+    """
+    라인별 비용 합이 예산 ±band 를 벗어나면 슬롯 장소를 후보(rows: name_key → 검색 행)로 바꿔 범위 안으로 넣는다.
+    greedy-with-repair:
+      - 매 단계 '범위까지 남은 차이'를 가장 많이 줄이는 교체 1건(같은 종류 슬롯↔후보)을 적용
+      - 차이가 같으면 예산 중앙에 가까운 쪽, 그다음 원래 장소와 가까운 쪽
+      - 범위에 들어가거나 더 줄일 교체가 없으면 멈춤
+    선택 장소(fixed), 숙소/이동 줄, 비용 표기가 없는 줄은 건드리지 않는다.
+    총액은 시간 줄의 비용만 센다(아직 지우기 전인 '총 예상 비용' 줄을 더하면 두 배가 됨).
+
+    이미 예산 안이면 그대로:
+    >>> d = "2025-05-01 (목)\\n10:00 ~ 12:00 해운대 (약 40,000원)\\n12:00 ~ 13:30 점심: 밀면집 (약 60,000원)\\n총 예상 비용은 약 100,000원"
+    >>> fit_budget(d, "부산", 100000, {"x": {"name": "싼집", "kind": "restaurant"}}) == d
+    True
+    """
+    if not detail or not budget or budget <= 0 or not rows:
+        return detail
+    lo, hi = budget * (1 - band), budget * (1 + band)
+    lines = detail.splitlines()
+    total = _line_costs_total(detail)
+
+    def _dev(t: float) -> float:
+        return max(0.0, lo - t, t - hi)
+
+    if _dev(total) == 0:
+        return detail
+
+    fixed_keys = {name_key(n) for n in fixed or []}
+    used = {name_key(_place_name_from_line(ln)) for ln in lines if _TIME_RE.search(ln)}
+    slots = []   # [라인 위치, span, 식사 라벨, 현재 가격, 좌표]
+    for i, ln in enumerate(lines):
+        m_cost = _LINE_COST_RE.search(ln)
+        m = _TS_RE.match(ln)
+        if not (m_cost and m):
+            continue
+        span, rest = m.groups()
+        core = rest.split("(")[0]
+        nm = _place_name_from_line(ln)
+        if not nm or name_key(nm) in fixed_keys or _ROUTE_FIXED_PAT.search(core):
+            continue
+        meal = _MEAL_PAT.search(core)
+        slots.append([i, span, meal.group(1) if meal else "", int(m_cost.group(1).replace(",", "")),
+                      _place_point(city, nm)])
+
+    options = {"restaurant": [], "attraction": []}
+    for k, r in rows.items():
+        if k not in used:
+            options["restaurant" if r.get("kind") == "restaurant" else "attraction"].append((k, r))
+
+    while _dev(total) > 0:
+        best = None
+        for si, (i, span, label, cur, pt) in enumerate(slots):
+            for k, r in options["restaurant" if label else "attraction"]:
+                if k in used:
+                    continue
+                price = _candidate_price(city, r, label)
+                t2 = total - cur + price
+                if _dev(t2) >= _dev(total):
+                    continue
+                rp = _row_point(r)
+                km = haversine_km(pt[0], pt[1], rp[0], rp[1]) if (pt and rp) else 9e9
+                score = (_dev(t2), abs(t2 - budget), km)
+                if best is None or score < best[0]:
+                    best = (score, si, k, r, price)
+        if best is None:
+            break
+        _, si, k, r, price = best
+        i, span, label, cur, _ = slots[si]
+        name = _clean_html(r.get("name") or r.get("title") or "")
+        addr = (r.get("address") or r.get("roadAddress") or "").strip()
+        head = f"{span} {label}: {name}" if label else f"{span} {name}"
+        lines[i] = head + (f" ({addr})" if addr else "") + f" (약 {price:,}원)"
+        used.add(k)
+        total += price - cur
+        slots[si] = [i, span, label, price, _row_point(r)]
+    return "\n".join(lines).strip()
+
 # ========= 설문에서 고른 장소 임시 저장소 =========
-from threading import Lock
-_SELECTIONS: dict[str, dict[str, list[str]]] = {}
-_SEL_LOCK = Lock()
-
-def _norm_dest_key(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"\s+", "", s)
-    s = re.sub(r"(특별자치도|특별자치시|광역시|특별시|자치구|도|시|군|구)$", "", s)
-    return s or "_"
-
-def _extend_unique(dst_list: list[str], items: list[str]) -> None:
-    seen = {x.lower() for x in dst_list}
-    for p in items or []:
-        pn = re.sub(r"\s+", " ", (p or "").strip())
-        if pn and pn.lower() not in seen:
-            dst_list.append(pn)
-            seen.add(pn.lower())
-
-def _remember_selected(destination: str, places: list[str], category: Optional[str] = None) -> None:
-    dest_key = _norm_dest_key(destination)
-    cat = (category or "mixed").lower()
-    if cat not in ("attraction", "restaurant", "mixed"):
-        cat = "mixed"
-    with _SEL_LOCK:
-        bucket = _SELECTIONS.setdefault(dest_key, {"attraction": [], "restaurant": [], "mixed": []})
-        _extend_unique(bucket[cat], places)
-
-def _get_selected(destination: str, categories: Optional[list[str]] = None) -> list[str]:
-    dest_key = _norm_dest_key(destination)
-    cats = categories or ["attraction", "restaurant", "mixed"]
-    with _SEL_LOCK:
-        buckets = []
-        if dest_key in _SELECTIONS:
-            buckets.append(_SELECTIONS[dest_key])
-        for k, b in _SELECTIONS.items():
-            if k == dest_key:
-                continue
-            if k in dest_key or dest_key in k:
-                buckets.append(b)
-        out: list[str] = []
-        seen: set[str] = set()
-        for b in buckets:
-            for c in cats:
-                for p in b.get(c, []) or []:
-                    pn = re.sub(r"\s+", " ", (p or "").strip())
-                    key = pn.lower()
-                    if pn and key not in seen:
-                        out.append(pn)
-                        seen.add(key)
-        return out
+# 세션별 칸 + TTL + 샤드 잠금(selection_store.py). 세션 id 는 X-Session-Id 헤더 또는 본문 session_id,
+# 둘 다 없으면 새로 만들어 응답(session_id)으로 돌려준다 → 익명 공용 칸에 남의 선택이 섞이지 않는다.
+# STATE_BACKEND 가 sqlite/redis 면 워커끼리 공유(저장과 /api/plan 이 다른 워커로 가도 됨).
+_SELECTIONS = make_selection_store()
+
+def _session_of(header_sid: Optional[str], body_sid: Optional[str] = None) -> str:
+    sid = norm_session(header_sid or body_sid)
+    return uuid.uuid4().hex if sid == ANON else sid
+
+def _remember_selected(destination: str, places: list[str], category: Optional[str] = None,
+                       session: Optional[str] = None) -> None:
+    _SELECTIONS.remember(session, destination, places, category)
+
+def _get_selected(destination: str, categories: Optional[list[str]] = None,
+                  session: Optional[str] = None) -> list[str]:
+    return _SELECTIONS.get(session, destination, categories)
 
 # ========= 스키마 =========
 class ScheduleRequest(BaseModel):
@@ -992,15 +1577,20 @@ class ScheduleRequest(BaseModel):
     selected_places: List[str] = []
     travel_date: str
     count: int = 1
+    session_id: Optional[str] = None  # X-Session-Id 헤더가 없을 때
 
 class ScheduleItem(BaseModel):
     title: str
     detail: str
+    day_km: Optional[List[Optional[float]]] = None   # 날짜별 이동 거리(km)
+    version: Optional[int] = None                    # 서버 일정 세션 버전(/api/chat 델타 편집용)
+    etag: Optional[str] = None
 
 class ScheduleResponse(BaseModel):
     schedules: List[ScheduleItem]
     base_point: Optional[Tuple[float, float]] = None
     items: Optional[List[ScheduleItem]] = None
+    itinerary_session: Optional[str] = None          # /api/chat 에 본문 대신 넘길 세션 id
 
 class RecommendRequest(BaseModel):
     destination: str
@@ -1031,6 +1621,12 @@ class Place(BaseModel):
     score: Optional[float] = None
     reviews: List[Review] = Field(default_factory=list)
 
+    @computed_field
+    @property
+    def thumb_url(self) -> Optional[str]:
+        """카드용 썸네일(/img/<token>, 이 서버 기준 경로). 원본이 없으면 None."""
+        return proxy_path(self.image_url)
+
 class RecommendResponse(BaseModel):
     places: List[Place]
 
@@ -1043,6 +1639,7 @@ class SelectedPlacesRequest(BaseModel):
     destination: str
     places: List[str] = Field(default_factory=list)
     category: Optional[str] = None  # "attraction" | "restaurant" | None(혼합)
+    session_id: Optional[str] = None  # X-Session-Id 헤더가 없을 때
 
 class SelectedPlacesResponse(BaseModel):
     ok: bool = True
@@ -1050,6 +1647,7 @@ class SelectedPlacesResponse(BaseModel):
     saved_count: int
     places: List[str]
     gpt_note: Optional[str] = None
+    session_id: Optional[str] = None
 
 class FoodRequest(BaseModel):
     destination: str
@@ -1059,8 +1657,9 @@ class FoodRequest(BaseModel):
     companions: List[str] = []
     styles: List[str] = []
     hasPet: bool = False
-    center_lat: Optional[float] = None
-    center_lng: Optional[float] = None
+    center_lat: Optional[float] = Field(None, ge=-90, le=90)
+    center_lng: Optional[float] = Field(None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(None, gt=0, le=50)   # center 기준 반경(없으면 거리만 계산)
 
 # 데모 일정 목록
 mock_schedules = [
@@ -1122,10 +1721,11 @@ def _ensure_three(sections: list[tuple[str, str]], req: "ScheduleRequest") -> li
 
 # ========= /api/plan =========
 @app.post("/api/plan", response_model=ScheduleResponse)
-def create_plan(req: ScheduleRequest):
+def create_plan(req: ScheduleRequest, x_session_id: Optional[str] = Header(None)):
+    sid = _session_of(x_session_id, req.session_id)
     try:
         try:
-            stored_selected = _get_selected(req.location)
+            stored_selected = _get_selected(req.location, session=sid)
         except Exception:
             stored_selected = []
         # ✅ 항상 초기화
@@ -1143,7 +1743,7 @@ def create_plan(req: ScheduleRequest):
                 count=req.count,
             ) or ""
         except Exception as e:
-            print("[/api/plan] generate_schedule_gpt ERROR:", e)
+            log.error("plan.generate_error", exc=e)
             raw = ""
 
         raw = _normalize_gpt_text(raw)
@@ -1156,43 +1756,26 @@ def create_plan(req: ScheduleRequest):
         base_point: Optional[Tuple[float, float]] = None
         first_point_locked = False
 
-        for i, (title, body) in enumerate(sections):
-            detail = (body or "").strip()
+        # (0) 누락 날짜만 섹션 간 병렬로 재생성 → 제자리에 끼워 넣기
+        bodies = [(body or "").strip() for _, body in sections]
+        try:
+            bodies = repair_missing_days(bodies, req.location, req.budget, req.style,
+                                         full_dates, short_dates)
+        except Exception as e:
+            log.error("plan.repair_days_error", exc=e)
 
-            # (0) 날짜 강제 보강
-            detail = ensure_all_days(detail, full_dates, req.location)
+        for i, (title, _) in enumerate(sections):
+            detail = bodies[i]
 
-            # (1) 날짜 누락 보정 시도(선택)
-            if not block_has_all_dates(detail, full_dates, short_dates) and client is not None:
-                try:
-                    messages = [
-                        {"role": "system", "content": (
-                            "너는 여행 일정 전문가야. 모든 날짜(아침/점심/저녁 포함)를 작성하고, "
-                            "실제 존재하는 상호명과 도로명 주소를 포함하며, 총 예상비용은 마지막에만 1회 작성한다."
-                        )},
-                        {"role": "user", "content": (
-                            "아래 일정 블록에서 일부 날짜가 누락되었습니다. 누락된 날짜를 포함해 동일한 형식으로 보완하세요.\n\n"
-                            f"[누락된 날짜]: {', '.join([sd for fd, sd in zip(full_dates, short_dates) if (fd not in detail) and (sd not in detail)])}\n\n"
-                            f"[기존 블록]\n{detail}"
-                        )},
-                    ]
-                    resp = client.chat.completions.create(
-                        model="gpt-4o-mini", messages=messages, temperature=0.3,
-                    )
-                    patched = (resp.choices[0].message.content or "").strip()
-                    if patched:
-                        detail = _normalize_gpt_text(patched)
-                except Exception:
-                    pass
-
-            # (1.5) 보정 실패 대비 재보강
+            # (1) 재생성 실패 대비 템플릿 보강
             detail = ensure_all_days(detail, full_dates, req.location)
             detail = fix_header_order(detail)  
 
             # (2) 선택 장소 1회 주입 + 랜덤 보강
+            styles_list, attractions_for_inject, restaurants_for_inject = [], [], []
             try:
-                saved_attractions = _get_selected(req.location, ["attraction", "mixed"]) or []
-                saved_restaurants = _get_selected(req.location, ["restaurant"]) or []
+                saved_attractions = _get_selected(req.location, ["attraction", "mixed"], session=sid) or []
+                saved_restaurants = _get_selected(req.location, ["restaurant"], session=sid) or []
                 attractions_for_inject = list(dict.fromkeys([*(req.selected_places or []), *saved_attractions]))
                 restaurants_for_inject = list(dict.fromkeys(saved_restaurants))
 
@@ -1211,7 +1794,7 @@ def create_plan(req: ScheduleRequest):
                     selected_restaurants=restaurants_for_inject,
                 )
             except Exception as _e:
-                print("[inject once+fill error]", _e)
+                log.error("plan.inject_error", exc=_e)
 
                         # (3) 플레이스홀더 줄 실제 상호/주소로 치환 + 품질 보강
             if _naver_ok():
@@ -1235,12 +1818,34 @@ def create_plan(req: ScheduleRequest):
             # (6) 각 활동 라인 끝에 (약 xx,xxx원) 보강
             detail = ensure_costs_per_line(detail, req.location, req.budget)
 
+            # (6.5) 총액이 예산 ±15% 밖이면 후보 풀에서 슬롯 장소 교체(선택 장소는 유지)
+            try:
+                pool_rows: dict = {}
+                _build_candidate_pools(req.location, styles_list, req.companions or [], req.budget, rows=pool_rows)
+                detail = fit_budget(detail, req.location, req.budget, pool_rows,
+                                    fixed=[*attractions_for_inject, *restaurants_for_inject])
+            except Exception as e:
+                log.error("plan.fit_budget_error", exc=e)
+
+            # (6.6) 날짜별 동선 최적화(식사 시간은 고정)
+            try:
+                detail = optimize_day_routes(detail, req.location)
+            except Exception as e:
+                log.error("plan.route_error", exc=e)
+
             # (7) 총비용 문구 제거 → 재계산 후 1회만 표기
             detail = re.sub(r"(?m)^\s*총 예상 비용[^\n]*\n?", "", detail)
             cost = parse_total_cost(detail)
             detail += f"\n\n총 예상 비용은 약 {cost:,}원으로, 입력 예산인 {req.budget:,}원 내에서 잘 계획되었어요."
 
-            schedules.append(ScheduleItem(title=title, detail=detail))
+            # (7.5) 하루 이동 거리 — 슬롯을 바꾸는 단계가 모두 끝난 본문 기준
+            day_km = None
+            try:
+                day_km = day_route_km(detail, req.location)
+            except Exception as e:
+                log.error("plan.route_km_error", exc=e)
+
+            schedules.append(ScheduleItem(title=title, detail=detail, day_km=day_km))
 
             # (8) base_point 추출(첫 일정 첫 장소의 좌표)
             if (not first_point_locked) and i == 0:
@@ -1258,12 +1863,13 @@ def create_plan(req: ScheduleRequest):
                         pass
                     break
 
-        print(f"[/api/plan] schedules={len(schedules)}")
-        return ScheduleResponse(schedules=schedules, base_point=base_point, items=schedules)
+        log.info("plan.done", city=req.location, days=req.days, schedules=len(schedules))
+        itin_sid = _open_itinerary_session(schedules)
+        return ScheduleResponse(schedules=schedules, base_point=base_point, items=schedules,
+                                itinerary_session=itin_sid)
 
     except Exception as e:
-        print("[/api/plan][FATAL]", e)
-        traceback.print_exc()
+        log.error("plan.fatal", exc=e)
         fallback: List[ScheduleItem] = []
         for i in range(max(1, req.count or 1)):
             title = f"일정추천 {i+1}: {req.location} {req.days}일 샘플"
@@ -1271,7 +1877,7 @@ def create_plan(req: ScheduleRequest):
             cost = parse_total_cost(body)
             body += f"\n\n총 예상 비용은 약 {cost:,}원으로, 입력 예산인 {req.budget:,}원 내에서 잘 계획되었어요."
             fallback.append(ScheduleItem(title=title, detail=body))
-        print(f"[/api/plan] Fallback used, schedules={len(fallback)}")
+        log.warning("plan.fallback", schedules=len(fallback))
         return ScheduleResponse(schedules=fallback, base_point=None, items=fallback)
 
 # ========= 끼니 슬롯 보강(옵션) =========
@@ -1302,11 +1908,42 @@ def ensure_meal_slots(detail: str) -> str:
             lines[start:end] = block
     return "\n".join(lines)
 
+# ========= GPT 추천 라인 → Place 보강 =========
+def _place_from_gpt_line(raw: str, destination: str, kind: str,
+                         wanted: Optional[list[str]] = None) -> Optional["Place"]:
+    """
+    '1. 장소명 - 설명' 한 줄을 네이버 검색/이미지로 보강해 Place로 만든다.
+    kind: "attraction" | "restaurant"
+    """
+    cleaned = re.sub(r"^\d+\.\s*", "", raw or "")
+    name = (cleaned.split("-")[0] if cleaned else "").strip()
+    if not name:
+        return None
+    info = search_place(name) or {}
+    addr = info.get("address")
+    if kind == "restaurant" and not _want_category(name, info.get("category") or "", wanted or []):
+        return None
+    url = generate_naver_map_url(name, destination, addr)
+    iq = f"{name} {destination} 관광지" if kind == "attraction" else f"{name} {destination}"
+    if addr:
+        iq += f" {addr.split()[0]}"
+    img = _safe_search_image(iq, prefer_food=(kind == "restaurant"), strict=True)
+    return Place(
+        name=name, category="관광지" if kind == "attraction" else "음식점", address=addr,
+        rating=info.get("rating"), review_count=info.get("review_count"),
+        naver_url=url, image_url=img, reviews=[]
+    )
+
+def _enrich_gpt_places(jobs: list[tuple[str, str]], destination: str,
+                       wanted: Optional[list[str]] = None) -> List["Place"]:
+    """[(raw_line, kind), ...] → 병렬 보강된 Place 목록(입력 순서 유지, 실패 항목 제외)."""
+    return fan_out(jobs, lambda job: _place_from_gpt_line(job[0], destination, job[1], wanted))
+
 # ========= 관광지 추천 =========
-@app.post("/api/recommend/attractions", response_model=RecommendResponse)
+@app.post("/api/recommend/attractions", response_model=RecommendResponse, response_class=FastJSONResponse)
 def recommend_attractions(req: RecommendRequest):
     try:
-        print("\n[REQ] /api/recommend/attractions", _model_to_dict(req))
+        log.debug("recommend.attractions.request", destination=req.destination)
         try:
             prompt = generate_schedule_gpt(
                 location=req.destination,
@@ -1319,51 +1956,31 @@ def recommend_attractions(req: RecommendRequest):
                 count=1,
             )
         except Exception as e:
-            print("[ERROR] generate_schedule_gpt:", e); traceback.print_exc()
+            log.error("recommend.prompt_error", exc=e)
             return RecommendResponse(places=[])
 
         try:
             gpt_text = ask_gpt_safe(prompt, req.destination)
         except Exception as e:
-            print("[ERROR] ask_gpt:", e); traceback.print_exc()
+            log.error("recommend.gpt_error", exc=e)
             return RecommendResponse(places=[])
 
         try:
             sightseeing, _ = extract_places(gpt_text or "")
         except Exception as e:
-            print("[ERROR] extract_places:", e); traceback.print_exc()
+            log.error("recommend.extract_error", exc=e)
             return RecommendResponse(places=[])
 
-        places: List[Place] = []
-        for raw in sightseeing:
-            try:
-                cleaned = re.sub(r"^\d+\.\s*", "", raw or "")
-                name = (cleaned.split("-")[0] if cleaned else "").strip()
-                if not name:
-                    continue
-                info = search_place(name) or {}
-                addr = info.get("address")
-                url = generate_naver_map_url(name, req.destination, addr)
-                iq = f"{name} {req.destination} 관광지"
-                if addr:
-                    iq += f" {addr.split()[0]}"
-                img = _safe_search_image(iq, prefer_food=False, strict=True)
-                places.append(Place(
-                    name=name, category="관광지", address=addr,
-                    rating=info.get("rating"), review_count=info.get("review_count"),
-                    naver_url=url, image_url=img, reviews=[]
-                ))
-            except Exception as loop_e:
-                print("[WARN] attractions loop:", loop_e); traceback.print_exc()
-                continue
+        places = _enrich_gpt_places([(raw, "attraction") for raw in sightseeing], req.destination)
         return RecommendResponse(places=places)
     except Exception as e:
-        print("[FATAL] attractions:", e); traceback.print_exc()
+        log.error("recommend.attractions.fatal", exc=e)
         return RecommendResponse(places=[])
 
 # ========= 선택 저장 =========
 @app.post("/api/selection/places", response_model=SelectedPlacesResponse)
-def save_selected_places(req: SelectedPlacesRequest):
+def save_selected_places(req: SelectedPlacesRequest, x_session_id: Optional[str] = Header(None)):
+    sid = _session_of(x_session_id, req.session_id)
     uniq: list[str] = []
     seen = set()
     for p in (req.places or []):
@@ -1374,14 +1991,15 @@ def save_selected_places(req: SelectedPlacesRequest):
         if key not in seen:
             seen.add(key)
             uniq.append(name)
-    _remember_selected(req.destination, uniq, req.category)
-    current_all = _get_selected(req.destination)
+    _remember_selected(req.destination, uniq, req.category, session=sid)
+    current_all = _get_selected(req.destination, session=sid)
     return SelectedPlacesResponse(
         ok=True,
         destination=req.destination,
         saved_count=len(uniq),
         places=current_all,
         gpt_note=None,
+        session_id=sid,
     )
 
 # ========= 음식점 추천 (GPT 추출 기반) =========
@@ -1392,10 +2010,10 @@ def _want_category(name: str, cat_str: str, wanted: list[str]) -> bool:
     base = f"{name} {cat_str}".lower()
     return any(w.lower() in base for w in wanted)
 
-@app.post("/api/recommend/restaurants", response_model=RecommendResponse)
+@app.post("/api/recommend/restaurants", response_model=RecommendResponse, response_class=FastJSONResponse)
 def recommend_restaurants(req: RecommendRequest):
     try:
-        print("\n[REQ] /api/recommend/restaurants", _model_to_dict(req))
+        log.debug("recommend.restaurants.request", destination=req.destination)
         try:
             prompt = generate_schedule_gpt(
                 location=req.destination,
@@ -1408,54 +2026,30 @@ def recommend_restaurants(req: RecommendRequest):
                 count=1,
             )
         except Exception as e:
-            print("[ERROR] generate_schedule_gpt:", e); traceback.print_exc()
+            log.error("recommend.prompt_error", exc=e)
             return RecommendResponse(places=[])
 
         try:
             gpt_text = ask_gpt_safe(prompt, req.destination)
         except Exception as e:
-            print("[ERROR] ask_gpt:", e); traceback.print_exc()
+            log.error("recommend.gpt_error", exc=e)
             return RecommendResponse(places=[])
 
         try:
             _, restaurants = extract_places(gpt_text or "")
         except Exception as e:
-            print("[ERROR] extract_places:", e); traceback.print_exc()
+            log.error("recommend.extract_error", exc=e)
             return RecommendResponse(places=[])
 
         wanted = list(dict.fromkeys(req.food_categories or []))
-        places: List[Place] = []
-        for raw in restaurants:
-            try:
-                cleaned = re.sub(r"^\d+\.\s*", "", raw or "")
-                name = (cleaned.split("-")[0] if cleaned else "").strip()
-                if not name:
-                    continue
-                info = search_place(name) or {}
-                addr = info.get("address")
-                cat_str = info.get("category") or ""
-                if not _want_category(name, cat_str, wanted):
-                    continue
-                url = generate_naver_map_url(name, req.destination, addr)
-                iq = f"{name} {req.destination}"
-                if addr:
-                    iq += f" {addr.split()[0]}"
-                img = _safe_search_image(iq, prefer_food=True, strict=True)
-                places.append(Place(
-                    name=name, category="음식점", address=addr,
-                    rating=info.get("rating"), review_count=info.get("review_count"),
-                    naver_url=url, image_url=img, reviews=[]
-                ))
-            except Exception as loop_e:
-                print("[WARN] restaurants loop:", loop_e); traceback.print_exc()
-                continue
+        places = _enrich_gpt_places([(raw, "restaurant") for raw in restaurants], req.destination, wanted)
         return RecommendResponse(places=places)
     except Exception as e:
-        print("[FATAL] restaurants:", e); traceback.print_exc()
+        log.error("recommend.restaurants.fatal", exc=e)
         return RecommendResponse(places=[])
 
 # ========= (호환) 통합 장소 추천 =========
-@app.post("/api/recommend/places", response_model=RecommendResponse)
+@app.post("/api/recommend/places", response_model=RecommendResponse, response_class=FastJSONResponse)
 def recommend_places(req: RecommendRequest):
     try:
         sort_map = {
@@ -1478,50 +2072,10 @@ def recommend_places(req: RecommendRequest):
         gpt_text = ask_gpt_safe(prompt, req.destination)
         sightseeing, restaurants = extract_places(gpt_text or "")
 
-        places: List[Place] = []
-        for raw in sightseeing:
-            try:
-                cleaned = re.sub(r"^\d+\.\s*", "", raw or "")
-                name = (cleaned.split("-")[0] if cleaned else "").strip()
-                if not name:
-                    continue
-                info = search_place(name) or {}
-                addr = info.get("address")
-                url = generate_naver_map_url(name, req.destination, addr)
-                iq = f"{name} {req.destination} 관광지"
-                if addr:
-                    iq += f" {addr.split()[0]}"
-                img = _safe_search_image(iq, prefer_food=False, strict=True)
-                places.append(Place(
-                    name=name, category="관광지", address=addr,
-                    rating=info.get("rating"), review_count=info.get("review_count"),
-                    naver_url=url, image_url=img, reviews=[]
-                ))
-            except Exception:
-                traceback.print_exc()
-                continue
-
-        for raw in restaurants:
-            try:
-                cleaned = re.sub(r"^\d+\.\s*", "", raw or "")
-                name = (cleaned.split("-")[0] if cleaned else "").strip()
-                if not name:
-                    continue
-                info = search_place(name) or {}
-                addr = info.get("address")
-                url = generate_naver_map_url(name, req.destination, addr)
-                iq = f"{name} {req.destination}"
-                if addr:
-                    iq += f" {addr.split()[0]}"
-                img = _safe_search_image(iq, prefer_food=True, strict=True)
-                places.append(Place(
-                    name=name, category="음식점", address=addr,
-                    rating=info.get("rating"), review_count=info.get("review_count"),
-                    naver_url=url, image_url=img, reviews=[]
-                ))
-            except Exception:
-                traceback.print_exc()
-                continue
+        places = _enrich_gpt_places(
+            [(raw, "attraction") for raw in sightseeing] + [(raw, "restaurant") for raw in restaurants],
+            req.destination,
+        )
 
         if not places:
             try:
@@ -1551,7 +2105,7 @@ def recommend_places(req: RecommendRequest):
                 pass
         return RecommendResponse(places=places)
     except Exception as e:
-        print("[FATAL] places:", e); traceback.print_exc()
+        log.error("recommend.places.fatal", exc=e)
         return RecommendResponse(places=[])
 
 # ========= 채팅 편집(JSON 강제 + 룰기반 백업) =========
@@ -1560,10 +2114,126 @@ class ChatRequest(BaseModel):
     itineraryIndex: int
     itineraryText: Optional[str] = None
     context: Optional[Dict] = None  # {"budget": 300000} 등
+    # 서버 일정 세션 모드: itineraryText 대신 (세션, 인덱스, 버전)만 보낸다
+    itinerary_session: Optional[str] = None
+    version: Optional[int] = None           # 없으면 If-Match 헤더의 ETag 로 확인
+    full_text: bool = False                 # True 면 델타와 함께 전체 본문도 돌려줌
+
+class DayPatch(BaseModel):
+    pos: int                                # 날짜 블록 위치(0부터)
+    text: str
+
+class ItineraryDelta(BaseModel):
+    """바뀐 부분만. 받는 쪽은 본문을 (머리말, 날짜 블록들, 꼬리말)로 나눈 뒤 덮어쓴다."""
+    day_count: int
+    days: List[DayPatch] = Field(default_factory=list)
+    head: Optional[str] = None              # 첫 날짜 헤더 앞(제목/구분선). 바뀐 경우만
+    footer: Optional[str] = None            # 마지막 블록 끝의 빈 줄/총 예상 비용 줄. 바뀐 경우만
 
 class ChatResponse(BaseModel):
     reply: str
     updatedItinerary: Optional[str] = None
+    itinerary_session: Optional[str] = None
+    version: Optional[int] = None
+    etag: Optional[str] = None
+    delta: Optional[ItineraryDelta] = None
+
+# ========= 서버 일정 세션(버전 + 델타) =========
+def _itinerary_parts(text: str) -> tuple[list[str], list[list[str]], list[str]]:
+    """본문 → (첫 날짜 헤더 앞 줄들, 날짜 블록 줄들, 마지막 블록 끝의 빈 줄/총액 줄). 이어 붙이면 원문."""
+    lines = (text or "").strip().splitlines()
+    blocks = _iter_day_blocks(lines)
+    if not blocks:
+        return lines, [], []
+    head = lines[:blocks[0][1]]
+    days = [lines[start:end] for _, start, end in blocks]
+    last = days[-1]
+    cut = len(last)
+    while cut > 1 and (not last[cut - 1].strip() or _TOTAL_LINE_RE.match(last[cut - 1])):
+        cut -= 1
+    days[-1], footer = last[:cut], last[cut:]
+    return head, days, footer
+
+def _canon_itinerary(text: str) -> str:
+    head, days, footer = _itinerary_parts(text)
+    return "\n".join(head + [ln for d in days for ln in d] + footer)
+
+def _itinerary_delta(before: str, after: str) -> ItineraryDelta:
+    h0, d0, f0 = _itinerary_parts(before)
+    h1, d1, f1 = _itinerary_parts(after)
+    return ItineraryDelta(
+        day_count=len(d1),
+        days=[DayPatch(pos=i, text="\n".join(d)) for i, d in enumerate(d1) if i >= len(d0) or d0[i] != d],
+        head="\n".join(h1) if h1 != h0 else None,
+        footer="\n".join(f1) if f1 != f0 else None,
+    )
+
+def _open_itinerary_session(schedules: List[ScheduleItem]) -> Optional[str]:
+    """/api/plan 결과를 세션으로 저장(프론트와 같은 '제목\\n---\\n본문' 형식). 실패해도 응답은 그대로."""
+    try:
+        texts = []
+        for s in schedules:
+            title = (s.title or "일정추천").split("\n")[0].strip()
+            texts.append((title, _canon_itinerary(f"{title}\n---\n{(s.detail or '').strip()}")))
+        sid = itinerary_store.create(texts)
+        for i, s in enumerate(schedules):
+            s.version = 1
+            s.etag = itinerary_store.etag_for(sid, i, 1, texts[i][1])
+        return sid
+    except Exception as e:
+        log.error("plan.itinerary_session_error", exc=e)
+        return None
+
+def _conflict(doc: dict) -> HTTPException:
+    return HTTPException(status_code=409, detail={
+        "message": "일정이 다른 요청으로 먼저 바뀌었어요. 최신 본문을 다시 받아 주세요.",
+        "version": doc["version"], "etag": doc["etag"]})
+
+def _chat_session_open(req: "ChatRequest", if_match: Optional[str]) -> Optional[dict]:
+    """세션 모드면 서버 본문을 req.itineraryText 로 채우고 현재 문서를 돌려준다(버전이 다르면 409)."""
+    sid = (req.itinerary_session or "").strip()
+    if not sid:
+        return None
+    try:
+        doc = itinerary_store.load(sid, req.itineraryIndex)
+    except itinerary_store.NotFound:
+        raise HTTPException(status_code=404, detail="itinerary session not found or expired")
+    expected = req.version if req.version is not None else itinerary_store.version_from_etag(sid, req.itineraryIndex, if_match)
+    if expected is not None and expected != doc["version"]:
+        raise _conflict(doc)
+    req.itineraryText = doc["text"]
+    return doc
+
+def _chat_session_close(req: "ChatRequest", doc: Optional[dict], resp: "ChatResponse") -> "ChatResponse":
+    """편집 결과를 새 버전으로 저장하고 응답을 델타로 바꾼다."""
+    if doc is None:
+        return resp
+    new_text = _canon_itinerary(resp.updatedItinerary or doc["text"])
+    try:
+        new = itinerary_store.commit(doc["session"], doc["index"], new_text, expected=doc["version"])
+    except itinerary_store.VersionConflict as e:
+        raise _conflict(e.current)
+    resp.itinerary_session, resp.version, resp.etag = doc["session"], new["version"], new["etag"]
+    resp.delta = _itinerary_delta(doc["text"], new["text"])
+    resp.updatedItinerary = new["text"] if req.full_text else None
+    return resp
+
+@app.get("/api/itinerary/{session}/{index}")
+def get_itinerary(session: str, index: int, if_none_match: Optional[str] = Header(None),
+                  accept_encoding: Optional[str] = Header(None)):
+    """세션 일정 전체 본문(409 뒤 다시 맞출 때). If-None-Match 가 같으면 304."""
+    try:
+        doc = itinerary_store.load(session, index)
+    except itinerary_store.NotFound:
+        raise HTTPException(status_code=404, detail="itinerary session not found or expired")
+    resp = FastJSONResponse({"itinerary_session": session, "index": index, "title": doc["title"],
+                             "text": doc["text"], "version": doc["version"], "etag": doc["etag"]},
+                            headers={"ETag": doc["etag"], "Cache-Control": "private, no-cache"})
+    if etag_matches(if_none_match, doc["etag"]):
+        coding = response_coding(accept_encoding or "", len(resp.body))
+        return Response(status_code=304, headers={"ETag": encoded_etag(doc["etag"], coding),
+                                                  "Cache-Control": "private, no-cache"})
+    return resp
 
 SYSTEM_EDIT = """
 너는 여행 일정 '편집자'다. 반드시 아래 규칙을 지켜라.
@@ -1581,6 +2251,22 @@ SYSTEM_EDIT = """
 - 예산 관련 요청은 해당 라인의 '약 xx,xxx원' 숫자도 일관되게 조정.
 - 수정이 없으면 updated_itinerary에 원문을 그대로 넣는다.
 """
+
+SYSTEM_EDIT_DAY = """
+너는 여행 일정 '편집자'다. 입력은 일정 중 '하루치 날짜 블록' 하나뿐이다.
+출력 형식: 오직 JSON 한 줄만! (코드블록/설명/마크다운 금지)
+{
+  "reply": "<간단한 한국어 답변 한 문장>",
+  "updated_block": "<수정이 반영된 그 날짜 블록(첫 줄 날짜 헤더 포함)>"
+}
+편집 원칙:
+- 받은 블록만 기계적으로 수정한다(다른 날짜/제목/총 예상 비용 줄은 쓰지 말 것).
+- 날짜 헤더, 시간 포맷, 라인 순서는 그대로 유지.
+- '시간을 X시에' → 해당 구간 시작 시간을 X시로 바꾸고 기존 소요시간을 유지.
+- '가볍게' → 해당 끼니를 가벼운 식사로 바꾸고 비용을 6,000~10,000원대로 낮춘다.
+- 장소를 바꾸면 [다른 날 장소] 목록과 겹치지 않는 실제 상호명 + 도로명 주소를 쓴다.
+- 수정이 없으면 updated_block에 원문 블록을 그대로 넣는다.
+"""
 # === 일정 수정 이후 품질 보정 + 비용 재계산 ===
 def _postprocess_itinerary(text: str, fallback_city: Optional[str], budget: Optional[int]) -> str:
     t = (text or "").strip()
@@ -1811,8 +2497,113 @@ def _edit_itinerary_rules(text: str, message: str) -> tuple[str, str]:
 
     return reply, "\n".join(lines)
 
-@app.post("/api/chat", response_model=ChatResponse)
-def chat_edit(req: "ChatRequest"):
+# ========= 날짜 블록 단위 편집 =========
+_TOTAL_LINE_RE = re.compile(r"^\s*총 예상 비용")
+_HEADING_LINE_RE = re.compile(r"^\s*일정\s*추천\s*\d+")
+
+def _day_scope(text: str, message: str) -> Optional[tuple[int, int, int]]:
+    """
+    메시지에 'n일차/Day n'이 있고 그 날짜 블록이 있으면 (day_no, start, end).
+    end는 꼬리의 빈 줄/총 예상 비용 줄을 뺀 위치.
+    """
+    want_day = _extract_day_from_msg(message)
+    if want_day is None:
+        return None
+    lines = (text or "").splitlines()
+    for day_no, start, end in _iter_day_blocks(lines):
+        if day_no != want_day:
+            continue
+        while end > start + 1 and (not lines[end - 1].strip() or _TOTAL_LINE_RE.match(lines[end - 1])):
+            end -= 1
+        return day_no, start, end
+    return None
+
+def _splice_day_block(text: str, scope: tuple[int, int, int], new_block: str) -> str:
+    _, start, end = scope
+    lines = (text or "").splitlines()
+    new_lines = [ln for ln in (new_block or "").strip().splitlines()
+                 if not _TOTAL_LINE_RE.match(ln) and not _HEADING_LINE_RE.match(ln)]
+    if not new_lines:
+        return text
+    # 헤더가 빠져 왔으면 원래 헤더 유지
+    if not _DATE_HDR_RE.match(new_lines[0].strip()):
+        new_lines = [lines[start], *[ln for ln in new_lines if not _DATE_HDR_RE.match(ln.strip())]]
+    return "\n".join(lines[:start] + new_lines + lines[end:])
+
+def _changed_line_indexes(before: str, after: str) -> list[int]:
+    """after 기준으로 새로 생기거나 바뀐 줄 인덱스."""
+    a, b = (before or "").splitlines(), (after or "").splitlines()
+    out: list[int] = []
+    for tag, _, _, j1, j2 in difflib.SequenceMatcher(a=a, b=b, autojunk=False).get_opcodes():
+        if tag in ("replace", "insert"):
+            out.extend(range(j1, j2))
+    return out
+
+def _postprocess_changed_lines(before: str, after: str, city: str, budget: Optional[int]) -> str:
+    """
+    _postprocess_itinerary의 부분 버전: 바뀐 줄에만 중복 교체/비용 보강을 하고
+    총액 문구만 전체 기준으로 다시 쓴다. 후보 풀은 실제 중복이 있을 때만 만든다.
+    """
+    t = (after or "").strip()
+    try:
+        t = fix_header_time_swaps(t)
+    except Exception:
+        pass
+    lines = t.splitlines()
+    changed = [i for i in _changed_line_indexes(before, t) if _TS_RE.match(lines[i])]
+
+    def _key(ln: str) -> str:
+        _, core = _place_core_from_line(ln)
+        return name_key(core or "")
+
+    if city and changed:
+        changed_set = set(changed)
+        others = {_key(ln) for i, ln in enumerate(lines) if i not in changed_set and _TS_RE.match(ln)}
+        pools: Optional[tuple[list[str], list[str]]] = None
+        for i in changed:
+            k = _key(lines[i])
+            if k and k in others:
+                if pools is None:
+                    pools = _build_candidate_pools(city, [], [], None, limit=30)
+                meal = _guess_meal_from_line(lines[i])
+                pool = pools[1] if meal else pools[0]
+                while pool:
+                    cand = pool.pop(0)
+                    ck = name_key(cand)
+                    if ck and ck not in others:
+                        span = _extract_time_span(lines[i]) or ""
+                        label = {"breakfast": "아침", "lunch": "점심", "dinner": "저녁"}.get(meal or "")
+                        addr = _addr_for(city, cand)
+                        lines[i] = f"{span} {label + ': ' if label else ''}{cand}" + (f" ({addr})" if addr else "")
+                        k = ck
+                        break
+            others.add(k)
+        for i in changed:
+            try:
+                lines[i] = ensure_costs_per_line(lines[i], city, budget)
+            except Exception:
+                pass
+    t = "\n".join(lines)
+    try:
+        t = dedupe_time_and_place(t)
+    except Exception:
+        pass
+
+    t = re.sub(r"(?m)^\s*총 예상 비용[^\n]*\n?", "", t).strip()
+    total = parse_total_cost(t)
+    if budget is not None:
+        t += f"\n\n총 예상 비용은 약 {total:,}원으로, 입력 예산인 {budget:,}원 기준으로 조정했어요."
+    else:
+        t += f"\n\n총 예상 비용은 약 {total:,}원으로 조정했어요."
+    return t
+
+def _other_day_places(text: str, scope: tuple[int, int, int]) -> list[str]:
+    _, start, end = scope
+    lines = (text or "").splitlines()
+    return _used_place_names("\n".join(lines[:start] + lines[end:]))
+
+def _plan_chat_edit(req: "ChatRequest") -> dict:
+    """규칙 기반 결과/후처리 범위/LLM 메시지를 미리 준비한다(일반·스트리밍 공용)."""
     original = (req.itineraryText or "").strip()
     # 예산(있으면 int로)
     try:
@@ -1839,47 +2630,201 @@ def chat_edit(req: "ChatRequest"):
         except Exception:
             rule_reply, rule_text = "요청을 반영했습니다.", original
 
+    # 'n일차' 요청이면 그 날짜 블록만 모델에 보내고, 바뀐 줄만 후처리
+    scope = None if _extract_replace_intent(req.message) else _day_scope(original, req.message)
+    budget_txt = (req.context or {}).get('budget', '알 수 없음')
+    if scope is not None:
+        day_no, start, end = scope
+        block = "\n".join(original.splitlines()[start:end])
+        others = _other_day_places(original, scope)
+        stage, system = "chat_edit_day", SYSTEM_EDIT_DAY
+        user = (f"[현재 날짜 블록] ({day_no}일차)\n{block}\n\n"
+                f"[다른 날 장소]\n{', '.join(others) if others else '없음'}\n\n"
+                f"[사용자 요청]\n{req.message}\n\n"
+                f"[예산]\n{budget_txt}")
+    else:
+        stage, system = "chat_edit", SYSTEM_EDIT
+        user = (f"[선택 인덱스] {req.itineraryIndex}\n\n"
+                f"[현재 일정]\n{original}\n\n"
+                f"[사용자 요청]\n{req.message}\n\n"
+                f"[예산]\n{budget_txt}")
+    return {
+        "original": original, "budget": budget_val,
+        "rule_reply": rule_reply, "rule_text": rule_text,
+        "city": _guess_city_from_itinerary(original), "scope": scope,
+        "stage": stage,
+        "messages": [{"role": "system", "content": system}, {"role": "user", "content": user}],
+    }
+
+def _post_chat_edit(plan: dict, text: str) -> str:
+    if plan["scope"] is not None:
+        return _postprocess_changed_lines(plan["original"], text, plan["city"], plan["budget"])
+    return _postprocess_itinerary(text, plan["city"], plan["budget"])
+
+def _fallback_chat_edit(plan: dict, err: Optional[Exception] = None) -> "ChatResponse":
+    reply = plan["rule_reply"] or "수정했습니다."
+    if err is not None:
+        reply = f"{reply} (모델 오류: {err})"
+    return ChatResponse(reply=reply, updatedItinerary=_post_chat_edit(plan, plan["rule_text"] or plan["original"]))
+
+def _finish_chat_edit(plan: dict, content: str) -> "ChatResponse":
+    """LLM JSON 응답 → 본문 반영 + 후처리. JSON이 깨졌으면 예외."""
+    data = json.loads((content or "").strip())
+    llm_reply = (data.get("reply") or "").strip() or (plan["rule_reply"] or "수정했습니다.")
+    if plan["scope"] is not None:
+        updated = (data.get("updated_block") or "").strip()
+        final_text = _splice_day_block(plan["original"], plan["scope"], updated) if updated else None
+    else:
+        final_text = (data.get("updated_itinerary") or "").strip() or None
+    # LLM이 수정 못했으면 규칙 결과 사용
+    final_text = final_text or plan["rule_text"] or plan["original"]
+    # 후처리(형식 보존 + 비용/총액 재계산)
+    return ChatResponse(reply=llm_reply, updatedItinerary=_post_chat_edit(plan, final_text))
+
+@app.post("/api/chat", response_model=ChatResponse, response_model_exclude_none=True)
+def chat_edit(req: "ChatRequest", response: Response, if_match: Optional[str] = Header(None)):
+    doc = _chat_session_open(req, if_match)
+    plan = _plan_chat_edit(req)
+
     # LLM이 아예 없으면 규칙 결과 + 후처리로 반환
     if client is None:
-        post = _postprocess_itinerary(rule_text or original, _guess_city_from_itinerary(original), budget_val)
-        return ChatResponse(reply=rule_reply or "수정했습니다.", updatedItinerary=post)
-
-    # 3) LLM 시도 (JSON 강제) — 실패 시 규칙 결과 사용
-    try:
-        out = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_EDIT},
-                {"role": "user", "content":
-                    f"[선택 인덱스] {req.itineraryIndex}\n\n"
-                    f"[현재 일정]\n{original}\n\n"
-                    f"[사용자 요청]\n{req.message}\n\n"
-                    f"[예산]\n{(req.context or {}).get('budget', '알 수 없음')}"
-                },
-            ],
-            temperature=0.3,
-            response_format={"type": "json_object"},
-        )
-        content = (out.choices[0].message.content or "").strip()
-        data = json.loads(content)
-        llm_reply = (data.get("reply") or "").strip() or (rule_reply or "수정했습니다.")
-        updated = (data.get("updated_itinerary") or "").strip()
+        resp = _fallback_chat_edit(plan)
+    else:
+        # 3) LLM 시도 (JSON 강제) — 실패 시 규칙 결과 사용
+        try:
+            out = chat_completion(
+                client, stage=plan["stage"],
+                model="gpt-4o-mini",
+                messages=plan["messages"],
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+            resp = _finish_chat_edit(plan, out.choices[0].message.content or "")
+        except Exception as e:
+            # LLM 에러 시 규칙 결과 후처리
+            resp = _fallback_chat_edit(plan, e)
+    resp = _chat_session_close(req, doc, resp)
+    if resp.etag:
+        response.headers["ETag"] = resp.etag
+    return resp
 
-        # LLM이 수정 못했으면 규칙 결과 사용
-        final_text = updated if updated else (rule_text or original)
+# ========= SSE 스트리밍 =========
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class _JsonFieldReader:
+    """스트리밍 중인 JSON 텍스트에서 특정 문자열 필드 값을 조각 단위로 꺼낸다."""
+    _ESC = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self, field: str):
+        self._key_re = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buf = ""
+        self._pos: Optional[int] = None
+        self._done = False
+        self.text = ""
+
+    def feed(self, piece: str) -> str:
+        if self._done:
+            return ""
+        self._buf += piece
+        if self._pos is None:
+            m = self._key_re.search(self._buf)
+            if not m:
+                return ""
+            self._pos = m.end()
+        b, i, out = self._buf, self._pos, []
+        while i < len(b):
+            c = b[i]
+            if c == '"':
+                self._done = True
+                i += 1
+                break
+            if c != "\\":
+                out.append(c)
+                i += 1
+                continue
+            if i + 1 >= len(b):
+                break                       # 이스케이프가 다음 조각에 걸침
+            e = b[i + 1]
+            if e != "u":
+                out.append(self._ESC.get(e, e))
+                i += 2
+                continue
+            if i + 6 > len(b):
+                break
+            code = int(b[i + 2:i + 6], 16)
+            if 0xD800 <= code < 0xDC00:     # 서로게이트 쌍은 함께 디코드
+                if i + 12 > len(b):
+                    break
+                low = int(b[i + 8:i + 12], 16)
+                out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                i += 12
+                continue
+            out.append(chr(code))
+            i += 6
+        self._pos = i
+        s = "".join(out)
+        self.text += s
+        return s
+
+@app.post("/api/chat/stream")
+def chat_edit_stream(req: "ChatRequest", if_match: Optional[str] = Header(None)):
+    """
+    /api/chat 의 SSE 버전.
+    - event: token  {"delta": "..."}  reply 문장을 도착하는 대로 전달
+    - event: done   {"reply", "updatedItinerary"}  후처리까지 끝난 최종 결과
+                    (세션 모드면 {"reply", "itinerary_session", "version", "etag", "delta"})
+    - event: error  {"status": 409, ...}  세션 모드에서 저장 직전 버전이 바뀐 경우
+    """
+    doc = _chat_session_open(req, if_match)
+    plan = _plan_chat_edit(req)
 
-        # 후처리(형식 보존 + 비용/총액 재계산)
-        final_text = _postprocess_itinerary(final_text, _guess_city_from_itinerary(original), budget_val)
-        return ChatResponse(reply=llm_reply, updatedItinerary=final_text)
+    def _events():
+        reader = _JsonFieldReader("reply")
+        if client is None:
+            resp = _fallback_chat_edit(plan)
+        else:
+            parts: list[str] = []
+            try:
+                for piece in stream_chat_completion(
+                    client, stage=plan["stage"], endpoint="/api/chat/stream",
+                    model="gpt-4o-mini",
+                    messages=plan["messages"],
+                    temperature=0.3,
+                    response_format={"type": "json_object"},
+                ):
+                    parts.append(piece)
+                    delta = reader.feed(piece)
+                    if delta:
+                        yield _sse("token", {"delta": delta})
+                resp = _finish_chat_edit(plan, "".join(parts))
+            except Exception as e:
+                resp = _fallback_chat_edit(plan, e)
+        if not reader.text:
+            yield _sse("token", {"delta": resp.reply})
+        try:
+            resp = _chat_session_close(req, doc, resp)
+        except HTTPException as e:
+            yield _sse("error", {"status": e.status_code, **(e.detail if isinstance(e.detail, dict) else {"message": e.detail})})
+            return
+        out = {k: v for k, v in _model_to_dict(resp).items() if v is not None}
+        if out.get("delta"):
+            out["delta"] = {k: v for k, v in out["delta"].items() if v is not None}
+        yield _sse("done", out)
 
-    except Exception as e:
-        # LLM 에러 시 규칙 결과 후처리
-        post = _postprocess_itinerary(rule_text or original, _guess_city_from_itinerary(original), budget_val)
-        return ChatResponse(reply=f"{rule_reply or '수정했습니다.'} (모델 오류: {e})", updatedItinerary=post)
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 # ========= 유연 입력용(프론트 호환) =========
-@app.post("/api/recommend/places_flex")
-def recommend_places_flex(req: dict = Body(...)):
+FLEX_CANDIDATES_PER_QUERY = 30   # 질의 하나에서 가져오는 후보 수(로컬 검색만, 보강 X)
+FLEX_MAX_QUERIES = 10            # 질의 계획 길이 상한
+FLEX_MAX_QUERY_LEN = 100         # 질의 하나의 글자 수 상한
+FLEX_MAX_LIMIT = 50              # 페이지 크기 상한
+FLEX_MAX_OFFSET = 1000           # 커서 오프셋 상한
+
+def _flex_plan(req: dict) -> dict:
+    """요청 조건 → 커서 초기 상태(질의 계획 + 정렬/페이지 크기)."""
     def _s(x):
         return str(x).strip() if x is not None else ""
     def _as_list(x):
@@ -1913,6 +2858,7 @@ def recommend_places_flex(req: dict = Body(...)):
         limit = int(req.get("limit") or 20)
     except Exception:
         limit = 20
+    limit = max(1, min(limit, FLEX_MAX_LIMIT))
 
     STYLE_HINTS = {
         "SNS": ["핫플", "포토스팟", "인스타", "뷰맛집", "전망대"],
@@ -1963,63 +2909,215 @@ def recommend_places_flex(req: dict = Body(...)):
     seen_q = set()
     qlist = []
     for q in queries:
-        q = " ".join([t for t in (q or "").split() if t])
+        q = " ".join([t for t in (q or "").split() if t])[:FLEX_MAX_QUERY_LEN]
         if q and q not in seen_q:
             seen_q.add(q)
             qlist.append(q)
-        if len(qlist) >= 10:
+        if len(qlist) >= FLEX_MAX_QUERIES:
             break
+    return {"v": 1, "q": qlist, "i": 0, "o": 0, "s": sort, "n": limit, "seen": [], "c": location}
 
-    results = []
-    name_addr_seen = set()
-    def _key(p: dict) -> str:
-        n = (p.get("name") or p.get("title") or p.get("place_name") or "").strip()
-        a = (p.get("address") or p.get("road_address") or p.get("addr") or "").strip()
-        return f"{n}|{a}"
+def _encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
 
+def _decode_cursor(cursor: str) -> Optional[dict]:
     try:
-        for q in qlist:
-            items = search_and_rank_places(query=q, limit=limit, sort=sort) or []
-            for it in items:
-                k = _key(it)
-                if not k or k in name_addr_seen:
-                    continue
-                name_addr_seen.add(k)
-                results.append(it)
-            if len(results) >= limit * 2:
-                break
+        s = str(cursor).strip()
+        raw = base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+        state = json.loads(raw.decode("utf-8"))
+        if isinstance(state, dict) and state.get("v") == 1 and isinstance(state.get("q"), list):
+            return _check_cursor(state)
+    except Exception:
+        pass
+    return None
+
+def _check_cursor(state: dict) -> Optional[dict]:
+    """
+    커서는 클라이언트가 그대로 돌려보내는 값이라 서명이 없다 → 질의 수/길이, 페이지 크기,
+    오프셋, 중복 키 목록을 _flex_plan 이 만들 수 있는 범위로 제한한다(벗어나면 None).
+    """
+    q = state["q"]
+    if not q or len(q) > FLEX_MAX_QUERIES:
+        return None
+    if not all(isinstance(x, str) and 0 < len(x) <= FLEX_MAX_QUERY_LEN for x in q):
+        return None
+    i, o = state.get("i", 0), state.get("o", 0)
+    if not (isinstance(i, int) and isinstance(o, int) and 0 <= i <= len(q) and 0 <= o <= FLEX_MAX_OFFSET):
+        return None
+    seen = state.get("seen") or []
+    if not isinstance(seen, list) or len(seen) > FLEX_MAX_QUERIES * FLEX_CANDIDATES_PER_QUERY:
+        return None
+    if state.get("s") not in (None, "review_desc", "rating_desc", "distance_asc"):
+        return None
+    if state.get("src") not in (None, "idx") or not isinstance(state.get("c") or "", str):
+        return None
+    try:
+        n = int(state.get("n") or 20)
+    except (TypeError, ValueError):
+        return None
+    return dict(state, n=max(1, min(n, FLEX_MAX_LIMIT)))
+
+def _flex_key(p: dict) -> str:
+    """정규화 장소 키 → 짧은 해시(커서에 실어 나르는 중복 제거 키)."""
+    k = row_key(p)
+    if not k:
+        return ""
+    return hashlib.sha1(k.encode("utf-8")).hexdigest()[:10]
+
+def _enrich_place_safe(it: dict) -> dict:
+    try:
+        return enrich_place(it)
     except Exception as e:
-        print("[/api/recommend/places_flex] error:", e)
+        log.warning("places_flex.enrich_error", error=str(e))
+        return it
 
-    if len(results) == 0 and location:
+def _flex_page(state: dict) -> Tuple[list, Optional[str]]:
+    """
+    커서 상태에서 한 페이지(n개)를 뽑는다.
+    - 후보 수집은 로컬 검색(캐시)만 사용 → 질의 계획 순서대로, 이미 본 장소는 건너뜀
+    - 블로그 수/이미지 보강은 이번 페이지 행에만 병렬로 수행
+    - 정렬은 보강이 끝난 페이지 안에서 적용
+    """
+    qlist = state["q"]
+    limit = max(1, min(int(state.get("n") or 20), FLEX_MAX_LIMIT))
+    if state.get("src") == "idx":
+        # 로컬 색인: 질의 계획 전체를 한 번에 순위 검색(보강은 카탈로그에 이미 있음)
+        off = int(state.get("o") or 0)
+        rows = search_local(state.get("c") or "", " ".join(qlist), k=limit + 1, kind="attraction", offset=off)
+        more = len(rows) > limit
+        rows = sort_places(rows[:limit], state.get("s") or "review_desc")
+        return rows, (_encode_cursor(dict(state, o=off + limit)) if more else None)
+    seen = set(state.get("seen") or [])
+    qi, off = int(state.get("i") or 0), int(state.get("o") or 0)
+    rows: list = []
+    while qi < len(qlist) and len(rows) < limit:
         try:
-            items = search_and_rank_places(query=f"{location} 관광지", limit=limit, sort=sort) or []
-            for it in items:
-                k = _key(it)
-                if k and k not in name_addr_seen:
-                    name_addr_seen.add(k)
-                    results.append(it)
-        except Exception:
-            pass
+            cands = search_candidates(qlist[qi], limit=FLEX_CANDIDATES_PER_QUERY) or []
+        except Exception as e:
+            log.warning("places_flex.search_error", error=str(e))
+            cands = []
+        while off < len(cands) and len(rows) < limit:
+            it = cands[off]
+            off += 1
+            k = _flex_key(it)
+            if not k or k in seen:
+                continue
+            seen.add(k)
+            rows.append(it)
+        if off >= len(cands):
+            qi, off = qi + 1, 0
+
+    rows = sort_places(fan_out(rows, _enrich_place_safe), state.get("s") or "review_desc")
+    if qi >= len(qlist):
+        return rows, None
+    nxt = dict(state, i=qi, o=off, seen=sorted(seen))
+    return rows, _encode_cursor(nxt)
+
+# 다음 페이지 선계산(prefetch): next_cursor → Future
+FLEX_PREFETCH_TTL = 120.0
+FLEX_PREFETCH_MAX = 64
+_FLEX_PREFETCH: dict[str, tuple[float, Any]] = {}
+_FLEX_PREFETCH_LOCK = Lock()
+_FLEX_PREFETCH_POOL = ThreadPoolExecutor(max_workers=2)
+
+def _prefetch_flex(cursor: str) -> None:
+    state = _decode_cursor(cursor)
+    if state is None:
+        return
+    now = time.time()
+    with _FLEX_PREFETCH_LOCK:
+        for k in [k for k, (ts, _) in _FLEX_PREFETCH.items() if now - ts > FLEX_PREFETCH_TTL]:
+            _FLEX_PREFETCH.pop(k, None)
+        if cursor in _FLEX_PREFETCH:
+            return
+        while len(_FLEX_PREFETCH) >= FLEX_PREFETCH_MAX:
+            _FLEX_PREFETCH.pop(next(iter(_FLEX_PREFETCH)), None)
+        _FLEX_PREFETCH[cursor] = (now, _FLEX_PREFETCH_POOL.submit(with_context(_flex_page), state))
+
+def _take_prefetched(cursor: str):
+    with _FLEX_PREFETCH_LOCK:
+        hit = _FLEX_PREFETCH.pop(cursor, None)
+    if not hit or time.time() - hit[0] > FLEX_PREFETCH_TTL:
+        return None
+    try:
+        return hit[1].result(timeout=ENRICH_BATCH_TIMEOUT * 2)
+    except Exception as e:
+        log.warning("places_flex.prefetch_error", error=str(e))
+        return None
 
-    results = results[:limit]
-    return {"total": len(results), "places": results}
+@app.post("/api/recommend/places_flex", response_class=FastJSONResponse)
+def recommend_places_flex(req: dict = Body(...)):
+    """
+    커서 기반 페이지네이션.
+    - 첫 요청: 조건(location/styles/...)으로 질의 계획을 세우고 첫 페이지 반환
+    - 다음 요청: {"cursor": next_cursor} 만 보내면 이어서 반환(질의 계획/중복 상태는 커서 안에)
+    - prefetch(기본 true): 다음 페이지를 백그라운드에서 미리 계산
+    """
+    results, next_cursor = _places_flex(req)
+    return FastJSONResponse({"total": len(results), "places": results, "next_cursor": next_cursor})
+
+def _places_flex(req: dict) -> Tuple[list, Optional[str]]:
+    cursor = req.get("cursor")
+    if cursor:
+        state = _decode_cursor(cursor)
+        if state is None:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        page = _take_prefetched(str(cursor))
+    else:
+        state = _flex_plan(req)
+        page = None
+        if state.get("c"):
+            # 카탈로그 색인에 이 도시가 있으면 라이브 검색 없이 응답
+            idx_state = dict(state, src="idx")
+            idx_page = _flex_page(idx_state)
+            if idx_page[0]:
+                state, page = idx_state, idx_page
+
+    if page is None:
+        page = _flex_page(state)
+    results, next_cursor = page
+
+    if next_cursor and req.get("prefetch", True) is not False:
+        _prefetch_flex(next_cursor)
+    # 페이지 행은 선반입/캐시와 공유되므로 복사본에 썸네일 경로를 붙인다
+    results = [dict(r, thumb_url=proxy_path(r.get("image_url") or r.get("image"))) if isinstance(r, dict) else r
+               for r in results]
+    return results, next_cursor
 
 # ========= 네이버 지도 기반 음식점 추천 =========
-def _cuisine_query(cuisine: str) -> str:
-    m = {
-        "한식": "한식",
-        "양식": "양식 서양식 이탈리안 스테이크 파스타",
-        "중식": "중식 중국집 마라탕 마라샹궈 딤섬",
-        "일식": "일식 스시 라멘 우동 돈카츠",
-        "카페": "카페 디저트 베이커리 커피",
-        "패스트푸드": "패스트푸드 분식 치킨 피자 버거 샌드위치",
-    }
-    key = (cuisine or "").strip()
-    return m.get(key, key)
-
-@app.post("/api/food/recommend")
+def _with_google_food(rows: list[dict], req: "FoodRequest",
+                      center: Optional[Tuple[float, float]]) -> list[dict]:
+    """
+    Google Places 음식점(평점/후기수/좌표 보유)을 합친다. 키가 없으면 그대로.
+    중심점: 요청 center → 없으면 네이버 결과 좌표의 평균.
+    """
+    if not google_enabled():
+        return rows
+    if center is None:
+        pts = [(float(r["lat"]), float(r["lng"])) for r in rows if r.get("lat") is not None and r.get("lng") is not None]
+        if not pts:
+            return rows
+        center = (sum(p[0] for p in pts) / len(pts), sum(p[1] for p in pts) / len(pts))
+    cuisine = (req.cuisine or "").strip()
+    try:
+        g = google_nearby_restaurants(center[0], center[1], radius_m=int((req.radius_km or 3.0) * 1000),
+                                      keyword=None if cuisine in ("", "맛집") else cuisine,
+                                      limit=req.limit)     # 보통 한 페이지 — 다음 페이지는 2초씩 기다림
+    except Exception as e:
+        log.warning("food.google_error", error=str(e))
+        return rows
+    merged = merge_google_rows(rows, g)
+    if req.center_lat is not None and req.center_lng is not None:
+        merged = with_distance(merged, req.center_lat, req.center_lng, req.radius_km)
+    return merged
+
+@app.post("/api/food/recommend", response_class=FastJSONResponse)
 def api_food_recommend(req: FoodRequest):
+    items = _food_items(req)
+    return FastJSONResponse({"count": len(items), "items": items})
+
+def _food_items(req: FoodRequest) -> list[dict]:
     sort_key = {
         "review": "review_desc",
         "rating": "rating_desc",
@@ -2030,48 +3128,31 @@ def api_food_recommend(req: FoodRequest):
     if not terms:
         terms = [req.cuisine or "맛집"]
 
-    collected: list[dict] = []
-    seen: Set[Tuple[str, str]] = set()
-
-    def add_rows(rows: list[dict]):
-        for it in rows or []:
-            name = (it.get("name") or it.get("title") or it.get("place_name") or "").strip()
-            addr = (it.get("address") or it.get("road_address") or it.get("addr") or "").strip()
-            if not name:
-                continue
-            key = (name, addr)
-            if key in seen:
-                continue
-            seen.add(key)
-            collected.append(it)
-
-    for t in terms:
-        q = f"{req.destination} {t} 맛집"
-        try:
-            rows = search_and_rank_places(
-                query=q,
-                limit=max(10, req.limit),
-                sort=sort_key,
-                center_lat=req.center_lat,
-                center_lng=req.center_lng,
-                kind="restaurant",
-            ) or []
-        except TypeError:
-            rows = search_and_rank_places(query=q, limit=max(10, req.limit), sort=sort_key) or []
-        add_rows(rows)
-        if len(collected) >= req.limit * 2:
-            break
-
+    center = (req.center_lat, req.center_lng) if req.center_lat is not None and req.center_lng is not None else None
+    if center:
+        # 반경 안의 알려진 음식점(카탈로그/최근 검색) 중 종류가 맞는 것 + 색인 결과를 거리로 거름
+        near = [it for _, it in geo_nearby(center[0], center[1], req.radius_km or 3.0)
+                if _want_category(it.get("name") or "", it.get("category") or "", terms)
+                and re.search(r"(음식점|카페|디저트|베이커리|술집)", it.get("category") or "")]
+        local = search_local(req.destination, " ".join(terms) + " 맛집", k=req.limit * 4, kind="restaurant")
+        seen_na = set()
+        collected = []
+        for it in near + local:
+            na = row_key(it)
+            if na and na not in seen_na:
+                seen_na.add(na)
+                collected.append(it)
+        collected = with_distance(collected, center[0], center[1], req.radius_km)
+    else:
+        collected = search_local(req.destination, " ".join(terms) + " 맛집", k=req.limit, kind="restaurant")
     if not collected:
-        try:
-            rows = search_and_rank_places(
-                query=f"{req.destination} 맛집",
-                limit=max(20, req.limit),
-                sort=sort_key,
-            ) or []
-            add_rows(rows)
-        except Exception:
-            pass
+        collected = search_topk([f"{req.destination} {t} 맛집" for t in terms],
+                                k=req.limit, sort=sort_key, per_query=max(10, req.limit),
+                                center=center, radius_km=req.radius_km)
+    if not collected:
+        collected = search_topk([f"{req.destination} 맛집"], k=req.limit, sort=sort_key,
+                                per_query=max(20, req.limit), center=center, radius_km=req.radius_km)
+    collected = _with_google_food(collected, req, center)
 
     def _normalize(p: Dict) -> Dict:
         name = p.get("name") or p.get("title") or ""
@@ -2089,10 +3170,13 @@ def api_food_recommend(req: FoodRequest):
             "review_count": reviews,
             "address": addr,
             "image_url": img,
+            "thumb_url": proxy_path(img),
             "phone": phone,
             "map_url": link,
             "category": cat,
-            "distance_km": dist
+            "distance_km": dist,
+            "lat": p.get("lat"),
+            "lng": p.get("lng"),
         }
 
     items = [_normalize(p) for p in collected]
@@ -2104,7 +3188,203 @@ def api_food_recommend(req: FoodRequest):
     else:
         items.sort(key=lambda x: (x["review_count"] or 0, x["rating"] or 0), reverse=True)
 
-    return {"count": len(items[:req.limit]), "items": items[:req.limit]}
+    return items[:req.limit]
+
+# ========= /v2: 가벼운 응답(중복 목록/원본 raw 없음, fields= 로 필드 고르기) =========
+_V2_SCHEDULE_FIELDS = ("title", "detail", "day_km", "version", "etag")
+
+def _v2_fields(spec: Optional[str], allowed: Tuple[str, ...] = PLACE_FIELDS) -> Optional[Tuple[str, ...]]:
+    try:
+        return parse_place_fields(spec, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _v2_places(rows, fields: Optional[Tuple[str, ...]]) -> list[dict]:
+    return [r.to_dict(fields) for r in to_place_records(rows)]
+
+@app.post("/v2/plan", response_class=FastJSONResponse)
+def create_plan_v2(req: ScheduleRequest, fields: Optional[str] = None,
+                   x_session_id: Optional[str] = Header(None)):
+    """/api/plan 과 같은 일정. schedules 한 벌만, 값이 없는 필드는 생략."""
+    sel = _v2_fields(fields, _V2_SCHEDULE_FIELDS)
+    res = create_plan(req, x_session_id)
+    out: Dict[str, Any] = {"schedules": [
+        {f: v for f in (sel or _V2_SCHEDULE_FIELDS) if (v := getattr(s, f, None)) is not None}
+        for s in res.schedules
+    ]}
+    if res.itinerary_session:
+        out["itinerary_session"] = res.itinerary_session
+    if res.base_point:
+        out["base_point"] = list(res.base_point)
+    return FastJSONResponse(out)
+
+@app.post("/v2/recommend/places_flex", response_class=FastJSONResponse)
+def recommend_places_flex_v2(req: dict = Body(...), fields: Optional[str] = None):
+    sel = _v2_fields(fields)
+    results, next_cursor = _places_flex(req)
+    return FastJSONResponse({"places": _v2_places(results, sel), "next_cursor": next_cursor})
+
+@app.post("/v2/food/recommend", response_class=FastJSONResponse)
+def api_food_recommend_v2(req: FoodRequest, fields: Optional[str] = None):
+    sel = _v2_fields(fields)
+    return FastJSONResponse({"places": _v2_places(_food_items(req), sel)})
+
+_RECOMMEND_HANDLERS = {"attractions": recommend_attractions, "restaurants": recommend_restaurants,
+                       "places": recommend_places}
+
+@app.post("/v2/recommend/{kind}", response_class=FastJSONResponse)
+def recommend_v2(kind: str, req: RecommendRequest, fields: Optional[str] = None):
+    """kind: attractions | restaurants | places (v1 과 같은 추천, 레코드만 가볍게)."""
+    handler = _RECOMMEND_HANDLERS.get(kind)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"unknown kind: {kind}")
+    sel = _v2_fields(fields)
+    return FastJSONResponse({"places": _v2_places(handler(req).places, sel)})
+
+# ========= 추천 조회 GET(브라우저/프록시 캐시용) =========
+# POST 와 같은 결과를 GET 으로. 질의는 결과에 영향을 주는 값만 남겨 정규화(read_cache)하고,
+# 본문 해시 ETag + Cache-Control(stale-while-revalidate) + 304 로 반복 조회를 서버 계산 없이 끝낸다.
+_SORT_ALIASES = {"review": "review_desc", "rating": "rating_desc", "distance": "distance_asc"}
+
+_FLEX_PARAMS = {
+    "location": ("str", ""), "styles": ("list", None), "companions": ("list", None),
+    "has_pet": ("bool", False), "budget": ("int", None), "start_date": ("str", ""),
+    "sort": ("str", "review_desc"), "limit": ("int", 20), "cursor": ("str", ""),
+}
+_FLEX_ALIASES = {"destination": "location", "hasPet": "has_pet", "startDate": "start_date"}
+_FOOD_PARAMS = {
+    "destination": ("str", ""), "cuisine": ("str", ""), "sort": ("str", "review"), "limit": ("int", 12),
+    "center_lat": ("float", None), "center_lng": ("float", None), "radius_km": ("float", None),
+}
+_RECOMMEND_PARAMS = {
+    "destination": ("str", ""), "dates": ("list", None), "companions": ("list", None),
+    "styles": ("list", None), "hasPet": ("bool", False), "budget": ("int", None),
+    "selected_places": ("list", None), "sort": ("str", "review_desc"), "query": ("str", ""),
+    "food_categories": ("list", None),
+}
+_V2_FIELDS_PARAM = {"fields": ("list", None)}
+
+def _flex_params(request: Request, extra: Optional[dict] = None) -> dict:
+    """질의 계획(_flex_plan)이 실제로 쓰는 만큼으로 줄인다: 시작일은 월까지, 예산은 10만원 이하 여부만."""
+    p = canonical_params(request.query_params, dict(_FLEX_PARAMS, **(extra or {})), _FLEX_ALIASES)
+    if p.get("cursor"):                     # 다음 페이지: 커서에 조건이 다 들어 있음
+        return {k: v for k, v in p.items() if k in ("cursor", "fields")}
+    sort = _SORT_ALIASES.get(p.get("sort", ""), p.get("sort"))
+    if sort and sort != "review_desc":
+        p["sort"] = sort
+    else:
+        p.pop("sort", None)
+    if p.get("start_date"):
+        p["start_date"] = p["start_date"][:7]
+    if p.get("budget") is not None:
+        if p["budget"] <= 100000:
+            p["budget"] = 100000
+        else:
+            p.pop("budget")
+    if "limit" in p:
+        p["limit"] = max(1, min(p["limit"], 50))
+    return p
+
+def _food_params(request: Request, extra: Optional[dict] = None) -> dict:
+    """_food_items 가 쓰는 값만(동행/스타일/반려동물은 결과에 영향 없음)."""
+    p = canonical_params(request.query_params, dict(_FOOD_PARAMS, **(extra or {})))
+    if p.get("sort"):
+        p["sort"] = p["sort"].lower()
+    if "limit" in p:
+        p["limit"] = max(1, min(p["limit"], 50))
+    if "destination" not in p:
+        raise HTTPException(status_code=422, detail="destination is required")
+    try:                                    # 범위 밖 좌표/반경은 캐시 compute 안이 아니라 여기서 422
+        _food_req(p)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    return p
+
+def _recommend_params(request: Request, extra: Optional[dict] = None) -> dict:
+    p = canonical_params(request.query_params, dict(_RECOMMEND_PARAMS, **(extra or {})))
+    if "destination" not in p:
+        raise HTTPException(status_code=422, detail="destination is required")
+    return p
+
+def _get_fields(p: dict) -> Optional[Tuple[str, ...]]:
+    return _v2_fields(",".join(p.get("fields") or []))
+
+def _food_req(p: dict) -> FoodRequest:
+    return FoodRequest(**{"cuisine": "", **{k: v for k, v in p.items() if k != "fields"}})
+
+def _recommend_req(p: dict) -> RecommendRequest:
+    return RecommendRequest(**{k: v for k, v in p.items() if k != "fields"})
+
+def _has_places(res) -> bool:
+    """GPT/검색 실패(네이버 429 쿨다운 등)로 빈 결과면 캐시에 두지 않는다(다음 요청에서 다시 시도)."""
+    if isinstance(res, dict):
+        return bool(res.get("places") or res.get("items"))
+    return bool(getattr(res, "places", None))
+
+@app.get("/api/recommend/places_flex", response_class=FastJSONResponse)
+def recommend_places_flex_get(request: Request):
+    def compute(p):
+        results, next_cursor = _places_flex(dict(p))
+        return {"total": len(results), "places": results, "next_cursor": next_cursor}
+    return cached_json(request, "flex", _flex_params(request), compute, keep=_has_places)
+
+@app.get("/api/food/recommend", response_class=FastJSONResponse)
+def api_food_recommend_get(request: Request):
+    def compute(p):
+        items = _food_items(_food_req(p))
+        return {"count": len(items), "items": items}
+    return cached_json(request, "food", _food_params(request), compute, keep=_has_places)
+
+@app.get("/api/recommend/{kind}", response_model=RecommendResponse, response_class=FastJSONResponse)
+def recommend_get(kind: str, request: Request):
+    """kind: attractions | restaurants | places"""
+    handler = _RECOMMEND_HANDLERS.get(kind)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"unknown kind: {kind}")
+    return cached_json(request, f"rec.{kind}", _recommend_params(request),
+                       lambda p: handler(_recommend_req(p)), keep=_has_places)
+
+@app.get("/v2/recommend/places_flex", response_class=FastJSONResponse)
+def recommend_places_flex_v2_get(request: Request):
+    p = _flex_params(request, _V2_FIELDS_PARAM)
+    sel = _get_fields(p)
+    def compute(p):
+        results, next_cursor = _places_flex({k: v for k, v in p.items() if k != "fields"})
+        return {"places": _v2_places(results, sel), "next_cursor": next_cursor}
+    return cached_json(request, "v2.flex", p, compute, keep=_has_places)
+
+@app.get("/v2/food/recommend", response_class=FastJSONResponse)
+def api_food_recommend_v2_get(request: Request):
+    p = _food_params(request, _V2_FIELDS_PARAM)
+    sel = _get_fields(p)
+    return cached_json(request, "v2.food", p, lambda p: {"places": _v2_places(_food_items(_food_req(p)), sel)},
+                       keep=_has_places)
+
+@app.get("/v2/recommend/{kind}", response_class=FastJSONResponse)
+def recommend_v2_get(kind: str, request: Request):
+    handler = _RECOMMEND_HANDLERS.get(kind)
+    if handler is None:
+        raise HTTPException(status_code=404, detail=f"unknown kind: {kind}")
+    p = _recommend_params(request, _V2_FIELDS_PARAM)
+    sel = _get_fields(p)
+    return cached_json(request, f"v2.rec.{kind}", p,
+                       lambda p: {"places": _v2_places(handler(_recommend_req(p)).places, sel)}, keep=_has_places)
+
+# ========= 이미지 프록시(카드 썸네일) =========
+@app.get("/img/{token}")
+def image_thumb(token: str, w: Optional[int] = None, if_none_match: Optional[str] = Header(None)):
+    """
+    응답 행의 thumb_url. 원본은 한 번만 받아 WebP 썸네일로 디스크에 두고, 1년 immutable 로 내보낸다.
+    w: 160 | 320(기본) | 640 — 다른 값은 그 이상인 가장 가까운 폭으로.
+    """
+    try:
+        body, ctype, etag = get_thumbnail(token, w)
+    except ImageProxyError as e:
+        raise HTTPException(status_code=e.status, detail=str(e), headers={"Cache-Control": "no-store"})
+    headers = {"ETag": etag, "Cache-Control": IMG_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=ctype, headers=headers)
 
 # ========= 자유 대화(여행 추천 전용) =========
 class TalkMessage(BaseModel):
@@ -2176,16 +3456,6 @@ def _extract_limit(text: str, default_n: int) -> int:
             pass
     return default_n
 
-def _uniq_name_addr(rows: list[dict]) -> list[dict]:
-    seen = set(); out = []
-    for it in rows or []:
-        n = (it.get("name") or it.get("title") or it.get("place_name") or "").strip()
-        a = (it.get("address") or it.get("road_address") or it.get("addr") or "").strip()
-        k = f"{n}|{a}"
-        if n and k not in seen:
-            seen.add(k); out.append(it)
-    return out
-
 def _pick_keywords(text: str, mapping: dict) -> list[str]:
     found = []
     for k, v in mapping.items():
@@ -2193,17 +3463,8 @@ def _pick_keywords(text: str, mapping: dict) -> list[str]:
             found.append(v)
     return found[:3]  # 너무 많으면 과도 호출
 
-@app.post("/api/talk", response_model=TalkResponse)
-def api_talk(req: TalkRequest):
-    """
-    자유 대화: 지역별 관광지/맛집 추천 특화.
-    - intent/지역/키워드 추출 후 search_and_rank_places로 실제 상호 추천
-    - 그 외 일반 대화는 LLM로 답변
-    """
-    # 대화 텍스트 합치기(최근 사용자 발화 위주)
-    user_texts = [m.content for m in (req.messages or []) if m.role == "user" and (m.content or "").strip()]
-    last_user  = (user_texts[-1] if user_texts else "").strip()
-
+def _talk_travel_reply(req: TalkRequest, user_texts: list[str]) -> Optional[str]:
+    """여행 추천 의도면 실제 상호 기반 답변 문자열, 아니면(또는 실패 시) None."""
     # 의도/지역/개수 추출
     intent = _detect_intent(" ".join(user_texts))
     dest   = (req.destination or "").strip() or _infer_destination_from_text(" ".join(user_texts))
@@ -2212,30 +3473,19 @@ def api_talk(req: TalkRequest):
     # ---- 여행 추천 루트 ----
     if intent in ("restaurant", "attraction"):
         if not dest:
-            return TalkResponse(reply="어느 지역을 원하시는지 알려주세요! 예: “경주 물회 맛집 5곳 추천” 또는 “부산 관광지 추천”")
+            return "어느 지역을 원하시는지 알려주세요! 예: “경주 물회 맛집 5곳 추천” 또는 “부산 관광지 추천”"
 
         results: list[dict] = []
         try:
             if intent == "restaurant":
                 kws = _pick_keywords(" ".join(user_texts), CUISINE_MAP) or ["맛집"]
-                # 키워드별로 모아서 중복 제거
-                for kw in kws:
-                    try:
-                        rows = search_and_rank_places(
-                            query=f"{dest} {kw}",
-                            limit=max(10, limit),
-                            sort="review_desc",
-                            kind="restaurant",  # naver_api가 지원하면 사용
-                        ) or []
-                    except TypeError:
-                        rows = search_and_rank_places(query=f"{dest} {kw}", limit=max(10, limit), sort="review_desc") or []
-                    results += rows
-                results = _uniq_name_addr(results)[:limit]
+                # 키워드별 질의를 동시에 돌려 상위 limit개만(답변에 이미지는 안 씀)
+                results = search_local(dest, " ".join(kws), k=limit, kind="restaurant") or \
+                    search_topk([f"{dest} {kw}" for kw in kws], k=limit, per_query=max(10, limit), images=False)
 
                 if not results:
                     # 마지막 폴백
-                    rows = search_and_rank_places(query=f"{dest} 맛집", limit=max(10, limit), sort="review_desc") or []
-                    results = _uniq_name_addr(rows)[:limit]
+                    results = search_topk([f"{dest} 맛집"], k=limit, per_query=max(10, limit), images=False)
 
                 # 답안 구성
                 lines = []
@@ -2251,18 +3501,15 @@ def api_talk(req: TalkRequest):
                     meta_txt = (" · ".join(meta)) if meta else ""
                     lines.append(f"{i}. {name} – {addr}{(' · '+meta_txt) if meta_txt else ''}\n   {link}")
                 head = f"🍽 {dest} 맛집 추천 {len(lines)}곳"
-                return TalkResponse(reply=head + "\n" + "\n".join(lines))
+                return head + "\n" + "\n".join(lines)
 
             else:  # attraction
                 kws = _pick_keywords(" ".join(user_texts), SIGHT_MAP) or ["관광지", "명소"]
-                for kw in kws:
-                    rows = search_and_rank_places(query=f"{dest} {kw}", limit=max(10, limit), sort="review_desc") or []
-                    results += rows
-                results = _uniq_name_addr(results)[:limit]
+                results = search_local(dest, " ".join(kws), k=limit, kind="attraction") or \
+                    search_topk([f"{dest} {kw}" for kw in kws], k=limit, per_query=max(10, limit), images=False)
 
                 if not results:
-                    rows = search_and_rank_places(query=f"{dest} 관광지", limit=max(10, limit), sort="review_desc") or []
-                    results = _uniq_name_addr(rows)[:limit]
+                    results = search_topk([f"{dest} 관광지"], k=limit, per_query=max(10, limit), images=False)
 
                 lines = []
                 for i, it in enumerate(results, 1):
@@ -2277,13 +3524,15 @@ def api_talk(req: TalkRequest):
                     meta_txt = (" · ".join(meta)) if meta else ""
                     lines.append(f"{i}. {name} – {addr}{(' · '+meta_txt) if meta_txt else ''}\n   {link}")
                 head = f"📍 {dest} 관광지 추천 {len(lines)}곳"
-                return TalkResponse(reply=head + "\n" + "\n".join(lines))
+                return head + "\n" + "\n".join(lines)
 
         except Exception as e:
             # 추천 파이프라인 실패 → LLM 폴백
-            print("[/api/talk] travel route error:", e)
+            log.warning("talk.travel_route_error", error=str(e))
 
-    # ---- 일반 대화 루트(LLM) ----
+    return None
+
+def _talk_messages(req: TalkRequest) -> List[Dict[str, str]]:
     system_prompt = (
         req.system
         or "너는 한국어 여행 도우미다. 사용자가 지역·취향을 말하면 이에 맞춰 친절하고 실용적으로 답한다."
@@ -2294,13 +3543,67 @@ def api_talk(req: TalkRequest):
         role = m.role if m.role in ("system","user","assistant") else "user"
         content = (m.content or "").strip()
         if content: msgs.append({"role": role, "content": content})
+    return msgs
+
+def _talk_demo_reply(last_user: str) -> str:
+    return f"(데모 응답) '{last_user}' 질문을 이해했어요. 모델 연결 후 자세히 도와드릴게요."
+
+@app.post("/api/talk", response_model=TalkResponse)
+def api_talk(req: TalkRequest):
+    """
+    자유 대화: 지역별 관광지/맛집 추천 특화.
+    - intent/지역/키워드 추출 후 search_and_rank_places로 실제 상호 추천
+    - 그 외 일반 대화는 LLM로 답변
+    """
+    # 대화 텍스트 합치기(최근 사용자 발화 위주)
+    user_texts = [m.content for m in (req.messages or []) if m.role == "user" and (m.content or "").strip()]
+    last_user  = (user_texts[-1] if user_texts else "").strip()
+
+    # ---- 여행 추천 루트 ----
+    travel = _talk_travel_reply(req, user_texts)
+    if travel is not None:
+        return TalkResponse(reply=travel)
+
+    # ---- 일반 대화 루트(LLM) ----
+    msgs = _talk_messages(req)
 
     if client is None:
-        return TalkResponse(reply=f"(데모 응답) '{last_user}' 질문을 이해했어요. 모델 연결 후 자세히 도와드릴게요.")
+        return TalkResponse(reply=_talk_demo_reply(last_user))
 
     try:
-        out = client.chat.completions.create(model="gpt-4o-mini", messages=msgs, temperature=0.3)
+        out = chat_completion(client, stage="talk", model="gpt-4o-mini", messages=msgs, temperature=0.3)
         reply = (out.choices[0].message.content or "").strip()
         return TalkResponse(reply=reply or "(응답 없음)")
     except Exception as e:
         return TalkResponse(reply=f"(서버 오류) {e}")
+
+@app.post("/api/talk/stream")
+def api_talk_stream(req: TalkRequest):
+    """
+    /api/talk 의 SSE 버전. 일반 대화는 토큰이 도착하는 대로 보낸다.
+    - event: token {"delta": "..."} / event: done {"reply": "<전체 답변>"}
+    """
+    user_texts = [m.content for m in (req.messages or []) if m.role == "user" and (m.content or "").strip()]
+    last_user  = (user_texts[-1] if user_texts else "").strip()
+
+    def _events():
+        reply = _talk_travel_reply(req, user_texts)
+        if reply is None and client is None:
+            reply = _talk_demo_reply(last_user)
+        if reply is not None:
+            yield _sse("token", {"delta": reply})
+            yield _sse("done", {"reply": reply})
+            return
+        parts: list[str] = []
+        try:
+            for piece in stream_chat_completion(client, stage="talk", endpoint="/api/talk/stream",
+                                                model="gpt-4o-mini", messages=_talk_messages(req),
+                                                temperature=0.3):
+                parts.append(piece)
+                yield _sse("token", {"delta": piece})
+            reply = "".join(parts).strip() or "(응답 없음)"
+        except Exception as e:
+            reply = "".join(parts).strip() or f"(서버 오류) {e}"
+        yield _sse("done", {"reply": reply})
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers=_SSE_HEADERS)
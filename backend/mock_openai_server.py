@@ -0,0 +1,279 @@
+# backend/mock_openai_server.py
+"""
+로컬 OpenAI 호환 chat-completions 스탠드인(부하/지연 테스트용).
+
+    python mock_openai_server.py --port 8100 --ttft-ms 400 --tps 60 \\
+        --error-rate 0.02 --rate-limit-rate 0.05 [--replay recorded.jsonl]
+
+게이트웨이는 .env 에서 아래처럼 가리키면 된다(키는 아무 값이나 OK).
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    OPENAI_API_KEY=sk-local
+
+응답 선택 순서
+1) --replay JSONL: {"match": "<마지막 user 메시지에 포함될 문자열>", "content": "..."}
+   match가 없는 줄은 순서대로 돌려 쓴다.
+2) 템플릿: 프롬프트 모양을 보고 SYSTEM_STRICT 형식 일정 / 누락 날짜 블록 /
+   채팅 편집 JSON / 추천 목록 / 일반 대화 중 하나를 만든다.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    from token_meter import count_messages, count_tokens
+except Exception:
+    def count_tokens(text: str) -> int:  # type: ignore
+        return max(1, len(text or "") // 2)
+    def count_messages(messages) -> int:  # type: ignore
+        return sum(count_tokens(str(m.get("content") or "")) for m in messages or [])
+
+
+# ========= 설정 =========
+class MockConfig:
+    def __init__(self) -> None:
+        self.ttft_ms = float(os.getenv("MOCK_TTFT_MS") or 300)
+        self.tps = float(os.getenv("MOCK_TPS") or 80)            # 초당 생성 토큰
+        self.error_rate = float(os.getenv("MOCK_ERROR_RATE") or 0)
+        self.rate_limit_rate = float(os.getenv("MOCK_429_RATE") or 0)
+        self.replay_path = os.getenv("MOCK_REPLAY") or None
+        self.seed: Optional[int] = None
+
+CONFIG = MockConfig()
+_RNG = random.Random()
+_REPLAY_MATCH: List[Dict[str, str]] = []
+_REPLAY_CYCLE: Optional[itertools.cycle] = None
+
+def load_replay(path: Optional[str]) -> None:
+    global _REPLAY_CYCLE
+    _REPLAY_MATCH.clear()
+    _REPLAY_CYCLE = None
+    if not path:
+        return
+    plain: List[str] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if row.get("match"):
+                _REPLAY_MATCH.append({"match": row["match"], "content": row.get("content") or ""})
+            else:
+                plain.append(row.get("content") or "")
+    if plain:
+        _REPLAY_CYCLE = itertools.cycle(plain)
+
+
+# ========= 템플릿 응답 =========
+_SAMPLE_ATTR = ["해동용궁사", "감천문화마을", "국립해양박물관", "태종대", "광안리해수욕장",
+                "흰여울문화마을", "부산시립미술관", "용두산공원", "송도해상케이블카", "이기대수변공원"]
+_SAMPLE_REST = ["할매국밥", "바다횟집", "온천칼국수", "해운대 브런치카페", "돼지국밥 본점",
+                "밀면집", "씨앗호떡", "조개구이촌", "어묵베이커리", "동래파전",
+                "기장멸치쌈밥", "꼼장어골목", "수제버거 하우스", "초량 불백", "남포 비빔당면"]
+
+def _last_user(messages: List[Dict[str, Any]]) -> str:
+    for m in reversed(messages or []):
+        if m.get("role") == "user":
+            return str(m.get("content") or "")
+    return ""
+
+def _find(rx: str, text: str, default: str = "") -> str:
+    m = re.search(rx, text, re.S)
+    return m.group(1).strip() if m else default
+
+def _day_lines(date_hdr: str, city: str, n: int) -> List[str]:
+    a = _SAMPLE_ATTR[(2 * n) % len(_SAMPLE_ATTR)], _SAMPLE_ATTR[(2 * n + 1) % len(_SAMPLE_ATTR)]
+    r = [_SAMPLE_REST[(3 * n + k) % len(_SAMPLE_REST)] for k in range(3)]
+    road = f"{city}광역시 중구 중앙대로 {100 + n}"
+    return [
+        date_hdr,
+        f"08:00 ~ 09:30 아침: {r[0]} ({road}) (약 9,000원)",
+        f"09:30 ~ 12:00 {a[0]} ({road}) (약 0원)",
+        f"12:00 ~ 13:30 점심: {r[1]} ({road}) (약 13,000원)",
+        f"14:00 ~ 18:00 {a[1]} ({road}) (약 5,000원)",
+        f"19:00 ~ 20:30 저녁: {r[2]} ({road}) (약 20,000원)",
+    ]
+
+def _dates_from_prompt(text: str) -> List[str]:
+    hdrs = re.findall(r"(\d{4}-\d{2}-\d{2})\s*\(", text)
+    hdrs = list(dict.fromkeys(hdrs))
+    if hdrs:
+        return hdrs
+    days = int(_find(r"여행일수:\s*(\d+)", text, "3") or 3)
+    start = datetime.today()
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+def _itinerary(text: str) -> str:
+    city = _find(r"여행지:\s*([^\n]+)", text, "부산")
+    count = int(_find(r"일정안 개수:\s*(\d+)", text, "") or _find(r"(\d+)개의 서로 다른 일정안", text, "1") or 1)
+    dates = _dates_from_prompt(text)
+    out: List[str] = []
+    for k in range(max(1, count)):
+        if k:
+            out.append("---")
+        out.append(f"일정추천 {k + 1}: {city} {len(dates)}일 코스")
+        out.append("")
+        for i, d in enumerate(dates):
+            out += _day_lines(f"{d} (Day{i + 1})", city, k * len(dates) + i)
+            out.append("")
+        out.append(f"총 예상 비용: {47000 * len(dates):,}원")
+    return "\n".join(out).strip()
+
+def _missing_days(text: str) -> str:
+    city = _find(r"\[여행지\]\s*([^\n]+)", text, "부산")
+    block = text.split("[작성할 날짜 헤더]", 1)[-1].split("[이미 사용한", 1)[0]
+    out: List[str] = []
+    for i, hdr in enumerate(re.findall(r"^\s*(\d{4}-\d{2}-\d{2}\s*\([^)]*\))", block, re.M)):
+        out += _day_lines(hdr, city, 7 + i) + [""]
+    return "\n".join(out).strip()
+
+def _chat_edit_json(text: str) -> str:
+    req = _find(r"\[사용자 요청\]\n([^\n]+)", text, "")
+    reply = f"요청('{req}')을 반영했어요."
+    if "[현재 날짜 블록]" in text:
+        block = _find(r"\[현재 날짜 블록\][^\n]*\n(.*?)\n\n\[", text, "")
+        return json.dumps({"reply": reply, "updated_block": block}, ensure_ascii=False)
+    cur = _find(r"\[현재 일정\]\n(.*?)\n\n\[사용자 요청\]", text, "")
+    return json.dumps({"reply": reply, "updated_itinerary": cur}, ensure_ascii=False)
+
+def _recommend_list(text: str) -> str:
+    city = _find(r"여행지:\s*([^\n]+)", text, "여행지")
+    a = "\n".join(f"{i + 1}. {n} - 대표 명소" for i, n in enumerate(_SAMPLE_ATTR[:5]))
+    r = "\n".join(f"{i + 1}. {n} - 현지 맛집" for i, n in enumerate(_SAMPLE_REST[:5]))
+    return f"[{city} 관광지 추천]\n{a}\n\n[{city} 맛집 추천]\n{r}"
+
+def render_response(body: Dict[str, Any]) -> str:
+    messages = body.get("messages") or []
+    text = _last_user(messages)
+    for row in _REPLAY_MATCH:
+        if row["match"] in text:
+            return row["content"]
+    if _REPLAY_CYCLE is not None:
+        return next(_REPLAY_CYCLE)
+    system = " ".join(str(m.get("content") or "") for m in messages if m.get("role") == "system")
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return _chat_edit_json(text)
+    if "[작성할 날짜 헤더]" in text:
+        return _missing_days(text)
+    if "일정추천" in text or "하드 규칙" in text:
+        if "추천 전문가" in system:
+            return _recommend_list(text)
+        return _itinerary(text)
+    return "좋아요! 여행지와 일정, 취향을 알려주시면 동선과 맛집까지 맞춰서 추천해 드릴게요."
+
+
+# ========= 서버 =========
+load_replay(CONFIG.replay_path)   # uvicorn mock_openai_server:app 로 띄울 때도 MOCK_REPLAY 반영
+app = FastAPI(title="JustGo mock OpenAI")
+
+def _pieces(text: str) -> List[str]:
+    # 대략 토큰 단위로 자르기(공백 포함 1~3글자)
+    return re.findall(r"\s*\S{1,3}|\s+", text) or [text]
+
+def _error(status: int, kind: str, msg: str) -> JSONResponse:
+    headers = {"retry-after": "1"} if status == 429 else None
+    return JSONResponse(status_code=status, headers=headers,
+                        content={"error": {"message": msg, "type": kind, "code": kind}})
+
+def _usage(prompt_tok: int, compl_tok: int) -> Dict[str, Any]:
+    return {"prompt_tokens": prompt_tok, "completion_tokens": compl_tok,
+            "total_tokens": prompt_tok + compl_tok,
+            "prompt_tokens_details": {"cached_tokens": 0}}
+
+@app.get("/v1/models")
+def list_models():
+    return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model", "owned_by": "mock"}]}
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    roll = _RNG.random()
+    if roll < CONFIG.rate_limit_rate:
+        return _error(429, "rate_limit_exceeded", "mock: rate limit")
+    if roll < CONFIG.rate_limit_rate + CONFIG.error_rate:
+        return _error(500, "server_error", "mock: injected error")
+
+    model = body.get("model") or "gpt-4o-mini"
+    content = render_response(body)
+    prompt_tok = count_messages(body.get("messages") or [])
+    pieces = _pieces(content)
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+    finish = "stop"
+    if max_tokens and len(pieces) > int(max_tokens):
+        pieces, finish = pieces[: int(max_tokens)], "length"
+        content = "".join(pieces)
+    compl_tok = count_tokens(content)
+    cid = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+    per_piece = 1.0 / CONFIG.tps if CONFIG.tps > 0 else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(CONFIG.ttft_ms / 1000 + len(pieces) * per_piece)
+        return {
+            "id": cid, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "finish_reason": finish,
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": _usage(prompt_tok, compl_tok),
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    def _chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None) -> str:
+        obj = {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+               "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        if usage:
+            obj["usage"] = usage
+        return f"data: {json.dumps(obj, ensure_ascii=False)}\n\n"
+
+    async def _gen():
+        await asyncio.sleep(CONFIG.ttft_ms / 1000)
+        yield _chunk({"role": "assistant", "content": ""})
+        for p in pieces:
+            yield _chunk({"content": p})
+            if per_piece:
+                await asyncio.sleep(per_piece)
+        yield _chunk({}, finish)
+        if include_usage:
+            yield _chunk({}, usage=_usage(prompt_tok, compl_tok))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(_gen(), media_type="text/event-stream")
+
+
+def main() -> None:
+    import uvicorn
+    ap = argparse.ArgumentParser(description="OpenAI 호환 로컬 스탠드인")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--ttft-ms", type=float, default=CONFIG.ttft_ms, help="첫 토큰까지 지연(ms)")
+    ap.add_argument("--tps", type=float, default=CONFIG.tps, help="초당 생성 토큰 수(0이면 지연 없음)")
+    ap.add_argument("--error-rate", type=float, default=CONFIG.error_rate, help="500 응답 비율(0~1)")
+    ap.add_argument("--rate-limit-rate", type=float, default=CONFIG.rate_limit_rate, help="429 응답 비율(0~1)")
+    ap.add_argument("--replay", default=CONFIG.replay_path, help="녹화 응답 JSONL")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    CONFIG.ttft_ms, CONFIG.tps = args.ttft_ms, args.tps
+    CONFIG.error_rate, CONFIG.rate_limit_rate = args.error_rate, args.rate_limit_rate
+    CONFIG.replay_path, CONFIG.seed = args.replay, args.seed
+    if args.seed is not None:
+        _RNG.seed(args.seed)
+    load_replay(args.replay)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# backend/mock_redis_server.py
+"""
+로컬 Redis 프로토콜(RESP2) 스탠드인 — STATE_BACKEND=redis://... 를 진짜 Redis 없이 시험할 때.
+
+    python mock_redis_server.py --port 6390
+    STATE_BACKEND=redis://127.0.0.1:6390/0 uvicorn main:app --workers 2
+
+지원 명령: PING, AUTH, SELECT, GET, SET [EX s|PX ms] [NX], DEL, INCRBY, INCR, EXISTS, FLUSHDB, DBSIZE,
+WATCH, UNWATCH, MULTI, EXEC, DISCARD (shared_state.RedisBackend 가 쓰는 만큼만). 모든 DB 번호는 같은 공간을 쓴다.
+"""
+from __future__ import annotations
+
+import argparse
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_DATA: Dict[bytes, Tuple[bytes, float]] = {}
+_VERSIONS: Dict[bytes, int] = {}          # WATCH 용: 키마다 쓰기 횟수
+_LOCK = threading.RLock()
+_NIL_ARRAY = object()                      # EXEC 실패 응답(*-1)
+
+
+def _touch(*keys: bytes) -> None:
+    for k in keys:
+        _VERSIONS[k] = _VERSIONS.get(k, 0) + 1
+
+
+def _alive(key: bytes) -> Optional[bytes]:
+    hit = _DATA.get(key)
+    if hit is None:
+        return None
+    value, expires = hit
+    if expires and expires <= time.time():
+        del _DATA[key]
+        return None
+    return value
+
+
+def _enc(x: Any) -> bytes:
+    if x is None:
+        return b"$-1\r\n"
+    if x is _NIL_ARRAY:
+        return b"*-1\r\n"
+    if isinstance(x, int):
+        return b":%d\r\n" % x
+    if isinstance(x, Exception):
+        return b"-ERR %s\r\n" % str(x).encode("utf-8")
+    if isinstance(x, str):
+        return b"+%s\r\n" % x.encode("utf-8")
+    if isinstance(x, list):
+        return b"*%d\r\n" % len(x) + b"".join(_enc(v) for v in x)
+    return b"$%d\r\n%s\r\n" % (len(x), x)
+
+
+def execute(args: List[bytes]) -> Any:
+    cmd = args[0].upper().decode("ascii", "replace")
+    with _LOCK:
+        if cmd == "PING":
+            return "PONG"
+        if cmd in ("AUTH", "SELECT"):
+            return "OK"
+        if cmd == "GET":
+            return _alive(args[1])
+        if cmd == "SET":
+            key, value, expires, nx = args[1], args[2], 0.0, False
+            i = 3
+            while i < len(args):
+                opt = args[i].upper()
+                if opt == b"EX":
+                    expires = time.time() + float(args[i + 1]); i += 2
+                elif opt == b"PX":
+                    expires = time.time() + float(args[i + 1]) / 1000.0; i += 2
+                elif opt == b"NX":
+                    nx = True; i += 1
+                else:
+                    return ValueError("syntax error")
+            if nx and _alive(key) is not None:
+                return None
+            _DATA[key] = (value, expires)
+            _touch(key)
+            return "OK"
+        if cmd == "DEL":
+            _touch(*args[1:])
+            return sum(1 for k in args[1:] if _alive(k) is not None and _DATA.pop(k, None) is not None)
+        if cmd == "EXISTS":
+            return sum(1 for k in args[1:] if _alive(k) is not None)
+        if cmd in ("INCR", "INCRBY"):
+            key = args[1]
+            step = int(args[2]) if cmd == "INCRBY" else 1
+            cur = _alive(key)
+            try:
+                n = int(cur or b"0") + step
+            except ValueError:
+                return ValueError("value is not an integer or out of range")
+            _DATA[key] = (str(n).encode("ascii"), _DATA.get(key, (b"", 0.0))[1])
+            _touch(key)
+            return n
+        if cmd == "FLUSHDB":
+            _touch(*_DATA)
+            _DATA.clear()
+            return "OK"
+        if cmd == "DBSIZE":
+            return sum(1 for k in list(_DATA) if _alive(k) is not None)
+    return ValueError(f"unknown command '{cmd}'")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """연결마다 WATCH 한 키의 버전과 MULTI 대기열을 따로 둔다."""
+
+    def _transaction(self, args: List[bytes]) -> Any:
+        cmd = args[0].upper().decode("ascii", "replace")
+        if cmd == "WATCH":
+            with _LOCK:
+                for k in args[1:]:
+                    self.watched.setdefault(k, _VERSIONS.get(k, 0))
+            return "OK"
+        if cmd == "UNWATCH":
+            self.watched = {}
+            return "OK"
+        if cmd == "MULTI":
+            self.queue = []
+            return "OK"
+        if cmd == "DISCARD":
+            self.queue, self.watched = None, {}
+            return "OK"
+        if cmd == "EXEC":
+            if self.queue is None:
+                return ValueError("EXEC without MULTI")
+            queue, watched = self.queue, self.watched
+            self.queue, self.watched = None, {}
+            with _LOCK:
+                if any(_VERSIONS.get(k, 0) != v for k, v in watched.items()):
+                    return _NIL_ARRAY              # 누가 먼저 썼다
+                return [execute(a) for a in queue]
+        if self.queue is not None:
+            self.queue.append(args)
+            return "QUEUED"
+        return execute(args)
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):            # 인라인 명령(telnet 등)
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        self.watched: Dict[bytes, int] = {}
+        self.queue: Optional[List[List[bytes]]] = None
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            if not args:
+                continue
+            self.wfile.write(_enc(self._transaction(args)))
+
+
+class Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(host: str = "127.0.0.1", port: int = 6390) -> Server:
+    """백그라운드 스레드로 띄우고 서버 객체를 돌려준다(스크립트/테스트용)."""
+    srv = Server((host, port), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="RESP2 stand-in for STATE_BACKEND=redis://")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6390)
+    a = ap.parse_args()
+    print(f"[mock_redis] listening on {a.host}:{a.port}")
+    with Server((a.host, a.port), _Handler) as srv:
+        srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# backend/multi_search.py
+"""
+여러 질의를 한 번에 돌려 상위 k개만 뽑는 검색 실행기.
+
+    rows = search_topk(["부산 관광지", "부산 야경", "부산 산책"], k=10, sort="review_desc")
+
+- 질의는 모자란 후보 수만큼(최대 max_workers 개씩) 묶어 동시에 실행하고, 정규화 장소 키(place_key)로 중복 제거한다.
+- 고유 후보가 pool 개(기본 k*2) 모이면 남은 질의는 보내지 않고, 그 이상은 보강하지 않는다.
+- 정렬 키에 리뷰 수가 필요하면(review/rating 정렬) 후보 전체에 블로그 total만 채우고,
+  크기 k의 힙으로 상위 k개를 유지한다.
+- 이미지 보강은 최종 상위 k개에만 한다(순위 밖 후보에는 호출하지 않음).
+"""
+from __future__ import annotations
+
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .naver_api import search_candidates, enrich_place
+    from .geo_index import with_distance
+    from .place_key import row_key as _row_key
+    from .token_meter import with_context
+except Exception:
+    from naver_api import search_candidates, enrich_place  # type: ignore
+    from geo_index import with_distance  # type: ignore
+    from place_key import row_key as _row_key  # type: ignore
+    from token_meter import with_context  # type: ignore
+
+MAX_WORKERS = 4
+_NEEDS_REVIEWS = ("review_desc", "rating_desc")
+
+
+def sort_key(sort: str) -> Callable[[Dict], Tuple]:
+    """naver_api.sort_places 와 같은 순서를 '클수록 앞' 튜플로 표현."""
+    s = (sort or "review_desc").strip()
+    if s == "rating_desc":
+        return lambda x: (x.get("rating") or 0.0, x.get("review_count") or 0, x.get("score") or 0.0)
+    if s == "distance_asc":
+        return lambda x: (-(9e9 if x.get("distance_km") is None else x["distance_km"]), x.get("score") or 0.0)
+    return lambda x: (x.get("review_count") or 0, x.get("score") or 0.0)
+
+
+class TopK:
+    """크기 k로 제한된 힙. 같은 키면 먼저 들어온 항목을 남긴다."""
+
+    def __init__(self, k: int, key: Callable[[Dict], Tuple]):
+        self.k = max(1, int(k))
+        self.key = key
+        self._heap: List[Tuple[Tuple, int, Dict]] = []
+        self._seq = 0
+
+    def push(self, item: Dict) -> bool:
+        self._seq += 1
+        entry = (self.key(item), -self._seq, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def items(self) -> List[Dict]:
+        return [e[2] for e in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+def _safe_candidates(query: str, per_query: int) -> List[Dict]:
+    try:
+        return search_candidates(query, limit=per_query) or []
+    except Exception as e:
+        print("[multi_search] query error:", query, e)
+        return []
+
+
+def _safe_enrich(it: Dict, reviews: bool, image: bool) -> Dict:
+    try:
+        return enrich_place(it, reviews=reviews, image=image)
+    except Exception as e:
+        print("[multi_search] enrich error:", e)
+        return it
+
+
+def search_topk(queries: Iterable[str], k: int, sort: str = "review_desc",
+                pool: Optional[int] = None, per_query: int = 20,
+                images: bool = True, max_workers: int = MAX_WORKERS,
+                center: Optional[Tuple[float, float]] = None,
+                radius_km: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    queries(우선순위 순) → 정렬 기준 상위 k개. 결과 행 형식은 search_and_rank_places 와 같다.
+    center=(lat, lng)면 distance_km 를 채우고, radius_km 가 있으면 반경 밖 후보는 버린다.
+    """
+    qlist = [q for q in dict.fromkeys(" ".join((q or "").split()) for q in queries) if q]
+    k = max(1, int(k or 1))
+    pool = max(k, int(pool or k * 2))
+    workers = max(1, min(max_workers, len(qlist) or 1))
+
+    cands: Dict[str, Dict] = {}
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        # 1) 후보 수집: 모자란 만큼만 질의를 묶어 동시에, 후보가 pool 개 모이면 중단
+        i = 0
+        while i < len(qlist) and len(cands) < pool:
+            need = -(-(pool - len(cands)) // max(1, per_query))
+            wave = qlist[i:i + max(1, min(workers, need))]
+            i += len(wave)
+            for rows in ex.map(with_context(lambda q: _safe_candidates(q, per_query)), wave):
+                for it in rows:
+                    rk = _row_key(it)
+                    if rk and rk not in cands:
+                        cands[rk] = it
+
+        # 2) 정렬 키 채우기(리뷰 정렬일 때만 블로그 total) + 상위 k 힙
+        rows = list(cands.values())
+        if center is not None:
+            rows = with_distance(rows, center[0], center[1], radius_km)
+        rows = rows[:pool]   # 질의 우선순위 순으로 pool 개까지만
+        if (sort or "review_desc").strip() in _NEEDS_REVIEWS:
+            rows = list(ex.map(with_context(lambda it: _safe_enrich(it, True, False)), rows))
+        top = TopK(k, sort_key(sort))
+        for it in rows:
+            top.push(it)
+        best = top.items()
+
+        # 3) 이미지: 최종 상위 k개에만
+        if images:
+            best = list(ex.map(with_context(lambda it: _safe_enrich(it, True, True)), best))
+    return best
@@ -11,6 +11,30 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.parse import quote
 
+# 로컬 카탈로그(있으면 먼저 조회, place_catalog.py crawl 로 채움)
+try:
+    from .place_catalog import lookup as _catalog_lookup
+except Exception:
+    try:
+        from place_catalog import lookup as _catalog_lookup  # type: ignore
+    except Exception:
+        _catalog_lookup = None
+
+try:
+    from .place_key import dedupe as _dedupe_keys, intern_place, row_key
+except Exception:
+    from place_key import dedupe as _dedupe_keys, intern_place, row_key  # type: ignore
+
+try:
+    from .geo_index import remember as _geo_remember, nearby as _geo_nearby, with_distance
+except Exception:
+    from geo_index import remember as _geo_remember, nearby as _geo_nearby, with_distance  # type: ignore
+
+try:
+    from .shared_state import get_backend, shared_map
+except Exception:
+    from shared_state import get_backend, shared_map  # type: ignore
+
 # .env 로드
 try:
     from dotenv import load_dotenv
@@ -29,8 +53,9 @@ DEFAULT_TIMEOUT = 8
 USER_AGENT = "JustGo/1.0 (+https://example.com)"
 
 # --- 간단 캐시 & 폴라이트 딜레이(429 예방) ---
-_CACHE: dict[str, dict] = {}
-_LAST_CALL_TS = 0.0
+# STATE_BACKEND(shared_state.py)가 공유 백엔드면 워커끼리 캐시/호출 간격을 같이 쓴다.
+CACHE_TTL_SEC = 6 * 3600
+_CACHE = shared_map("naver", ttl=CACHE_TTL_SEC)
 _COOLDOWN_SEC = 0.10  # API 사이 100ms 정도 텀
 
 def _headers() -> Dict[str, str]:
@@ -43,11 +68,15 @@ def _headers() -> Dict[str, str]:
     }
 
 def _wait_politely():
-    global _LAST_CALL_TS
-    now = time.time()
-    if now - _LAST_CALL_TS < _COOLDOWN_SEC:
-        time.sleep(_COOLDOWN_SEC - (now - _LAST_CALL_TS))
-    _LAST_CALL_TS = time.time()
+    """
+    호출 시각 슬롯을 상태 백엔드에서 원자적으로 예약하고, 그 시각까지 기다린다.
+    여러 스레드(공유 백엔드면 여러 워커)가 동시에 불러도 호출 간격은 _COOLDOWN_SEC 이상 유지되고,
+    기다리는 동안 다른 스레드의 HTTP 왕복은 겹쳐서 진행된다.
+    """
+    slot = get_backend().reserve_slot("naver", _COOLDOWN_SEC)
+    delay = slot - time.time()
+    if delay > 0:
+        time.sleep(delay)
 
 # ============== 공통 유틸 ==============
 _TAG_RE = re.compile(r"</?b>")
@@ -65,15 +94,9 @@ def _safe_get(d: dict, *keys, default=None):
             return d[k]
     return default
 
-def _dedupe_by_name(items: List[Dict]) -> List[Dict]:
-    seen = set()
-    out = []
-    for it in items:
-        key = re.sub(r"\s+", " ", (it.get("name") or "").lower()).strip()
-        if key and key not in seen:
-            seen.add(key)
-            out.append(it)
-    return out
+def _dedupe_rows(items: List[Dict]) -> List[Dict]:
+    # 이름+주소 키 기준 — 같은 체인의 다른 지점(스타벅스 해운대점/센텀점)은 따로 남긴다
+    return _dedupe_keys(items)
 
 def naver_map_link(name: str) -> str:
     return f"https://map.naver.com/v5/search/{quote(name)}"
@@ -99,26 +122,102 @@ def _search_local_raw(query: str, display: int = 10, start: int = 1) -> Dict:
     except Exception:
         raise
 
+# ============== 좌표(mapx/mapy → WGS84) ==============
+# 현재 로컬 API: mapx/mapy = 경도/위도 × 1e7 (예: 1269779345 → 126.9779345)
+# 구버전 로컬 API: KATEC(TM128, Bessel) 좌표(예: 309947, 552092) → TM 역변환 + 데이텀 이동
+_BESSEL_A = 6377397.155
+_BESSEL_F = 1 / 299.1528128
+_WGS_A = 6378137.0
+_WGS_F = 1 / 298.257223563
+_KATEC = dict(lat0=math.radians(38.0), lon0=math.radians(128.0), k0=0.9999, fe=400000.0, fn=600000.0)
+_BESSEL_TO_WGS = (-146.43, 507.89, 681.46)   # 한국 측지계(Bessel) → WGS84 3-파라미터
+
+def _meridian_arc(phi: float, e2: float, a: float) -> float:
+    return a * ((1 - e2 / 4 - 3 * e2**2 / 64 - 5 * e2**3 / 256) * phi
+                - (3 * e2 / 8 + 3 * e2**2 / 32 + 45 * e2**3 / 1024) * math.sin(2 * phi)
+                + (15 * e2**2 / 256 + 45 * e2**3 / 1024) * math.sin(4 * phi)
+                - (35 * e2**3 / 3072) * math.sin(6 * phi))
+
+def _katec_to_bessel(x: float, y: float) -> tuple[float, float]:
+    """KATEC(TM) → Bessel 위경도(라디안). Snyder 역변환."""
+    a, f, p = _BESSEL_A, _BESSEL_F, _KATEC
+    e2 = 2 * f - f * f
+    ep2 = e2 / (1 - e2)
+    m = _meridian_arc(p["lat0"], e2, a) + (y - p["fn"]) / p["k0"]
+    mu = m / (a * (1 - e2 / 4 - 3 * e2**2 / 64 - 5 * e2**3 / 256))
+    e1 = (1 - math.sqrt(1 - e2)) / (1 + math.sqrt(1 - e2))
+    phi1 = (mu + (3 * e1 / 2 - 27 * e1**3 / 32) * math.sin(2 * mu)
+            + (21 * e1**2 / 16 - 55 * e1**4 / 32) * math.sin(4 * mu)
+            + (151 * e1**3 / 96) * math.sin(6 * mu)
+            + (1097 * e1**4 / 512) * math.sin(8 * mu))
+    s, c, t = math.sin(phi1), math.cos(phi1), math.tan(phi1)
+    c1, t1 = ep2 * c * c, t * t
+    n1 = a / math.sqrt(1 - e2 * s * s)
+    r1 = a * (1 - e2) / (1 - e2 * s * s) ** 1.5
+    d = (x - p["fe"]) / (n1 * p["k0"])
+    lat = phi1 - (n1 * t / r1) * (d**2 / 2
+                                  - (5 + 3 * t1 + 10 * c1 - 4 * c1**2 - 9 * ep2) * d**4 / 24
+                                  + (61 + 90 * t1 + 298 * c1 + 45 * t1**2 - 252 * ep2 - 3 * c1**2) * d**6 / 720)
+    lon = p["lon0"] + (d - (1 + 2 * t1 + c1) * d**3 / 6
+                       + (5 - 2 * c1 + 28 * t1 - 3 * c1**2 + 8 * ep2 + 24 * t1**2) * d**5 / 120) / c
+    return lat, lon
+
+def _bessel_to_wgs84(lat: float, lon: float) -> tuple[float, float]:
+    """Bessel 위경도(라디안) → ECEF → 평행이동 → WGS84 위경도(도)."""
+    e2b = 2 * _BESSEL_F - _BESSEL_F**2
+    n = _BESSEL_A / math.sqrt(1 - e2b * math.sin(lat) ** 2)
+    x = n * math.cos(lat) * math.cos(lon) + _BESSEL_TO_WGS[0]
+    y = n * math.cos(lat) * math.sin(lon) + _BESSEL_TO_WGS[1]
+    z = n * (1 - e2b) * math.sin(lat) + _BESSEL_TO_WGS[2]
+    e2w = 2 * _WGS_F - _WGS_F**2
+    lon_w = math.atan2(y, x)
+    pxy = math.hypot(x, y)
+    lat_w = math.atan2(z, pxy * (1 - e2w))
+    for _ in range(5):
+        nw = _WGS_A / math.sqrt(1 - e2w * math.sin(lat_w) ** 2)
+        h = pxy / math.cos(lat_w) - nw
+        lat_w = math.atan2(z, pxy * (1 - e2w * nw / (nw + h)))
+    return math.degrees(lat_w), math.degrees(lon_w)
+
+def mapxy_to_wgs84(mapx, mapy) -> Optional[tuple[float, float]]:
+    """네이버 로컬 mapx/mapy → (lat, lng). 해석 불가면 None."""
+    try:
+        x, y = float(mapx), float(mapy)
+    except (TypeError, ValueError):
+        return None
+    if x <= 0 or y <= 0:
+        return None
+    if x > 1e8:                       # WGS84 × 1e7
+        lat, lng = y / 1e7, x / 1e7
+    elif x < 1e7 and y < 1e7:         # KATEC
+        lat, lng = _bessel_to_wgs84(*_katec_to_bessel(x, y))
+    else:
+        return None
+    if not (32.0 <= lat <= 39.5 and 124.0 <= lng <= 132.5):   # 한반도 밖이면 버림
+        return None
+    return round(lat, 7), round(lng, 7)
+
 def _map_local_item(it: Dict) -> Dict:
     # 네이버 로컬 응답 -> 표준 필드 매핑
     title = _strip_tags(_safe_get(it, "title", default="")).strip()
     addr = _safe_get(it, "roadAddress", "address", default="").strip()
     cat = (it.get("category") or "").strip()
     tel = (it.get("telephone") or "").strip()
-    # v1 로컬은 위경도 직접 제공 안함(별도 좌표계 케이스는 생략)
+    ll = mapxy_to_wgs84(it.get("mapx"), it.get("mapy"))
     return {
         "name": title,
         "title": title,          # 호환
         "address": addr,
         "category": cat,
         "telephone": tel,
-        "lat": None,
-        "lng": None,
+        "lat": ll[0] if ll else None,
+        "lng": ll[1] if ll else None,
         "rating": None,          # 오픈 API에 없음
         "review_count": None,    # 오픈 API에 없음
         "map_link": naver_map_link(title) if title else None,
         "image_url": None,       # 이미지 URL 보강용
-        "raw": it,
+        "mapx": it.get("mapx"),  # 카탈로그 저장용 원 좌표(원본 응답 dict 는 캐시에 싣지 않는다)
+        "mapy": it.get("mapy"),
     }
 
 def search_place(query: str) -> Dict:
@@ -129,7 +228,9 @@ def search_place(query: str) -> Dict:
     items = data.get("items", [])
     if not items:
         return {}
-    return _map_local_item(items[0])
+    place = _map_local_item(items[0])
+    _geo_remember([place])
+    return place
 
 # ============== 블로그 수(= 리뷰수 프록시) ==============
 def _blog_total(query: str) -> int:
@@ -138,8 +239,9 @@ def _blog_total(query: str) -> int:
     캐시 / 폴라이트 콜 적용.
     """
     key = f"blog_total::{query}"
-    if key in _CACHE:
-        return int(_CACHE[key]["total"])
+    hit = _CACHE.get(key)
+    if hit is not None:
+        return int(hit["total"])
     _wait_politely()
     try:
         r = requests.get(
@@ -207,7 +309,7 @@ def search_image(query: str, prefer_food: bool = False, strict: bool = True) ->
         return None
 
 # ====== 이미지 보강용 미니 캐시 & 헬퍼 ======
-_IMG_CACHE: dict[str, str] = {}
+_IMG_CACHE = shared_map("naver_img", ttl=CACHE_TTL_SEC)
 
 def _image_for_place(name: str, address: Optional[str], category: Optional[str], prefer_food: bool=False) -> Optional[str]:
     """
@@ -230,8 +332,9 @@ def _image_for_place(name: str, address: Optional[str], category: Optional[str],
         if not q:
             continue
         key = f"img::{q}::food={prefer_food}"
-        if key in _IMG_CACHE:
-            return _IMG_CACHE[key]
+        hit = _IMG_CACHE.get(key)
+        if hit:
+            return hit
         url = search_image(q, prefer_food=prefer_food, strict=True)
         if url:
             _IMG_CACHE[key] = url
@@ -241,8 +344,9 @@ def _image_for_place(name: str, address: Optional[str], category: Optional[str],
         if not q:
             continue
         key = f"img_soft::{q}::food={prefer_food}"
-        if key in _IMG_CACHE:
-            return _IMG_CACHE[key]
+        hit = _IMG_CACHE.get(key)
+        if hit:
+            return hit
         url = search_image(q, prefer_food=prefer_food, strict=False)
         if url:
             _IMG_CACHE[key] = url
@@ -259,18 +363,28 @@ def _score_token_match(name: str, category: str, toks: List[str]) -> float:
             score += 0.7
     return score
 
-def search_and_rank_places(query: str, limit: int = 20, sort: str = "review_desc") -> List[Dict]:
+def search_candidates(query: str, limit: int = 20) -> List[Dict]:
     """
-    다건 검색 + 정렬.
-    - 리뷰 많은 순: 네이버 블로그 total을 리뷰 수 프록시로 사용
-    - 별점 높은 순: Local API가 별점을 주지 않으므로 리뷰 수/키워드 점수로 보조 정렬
-    - 이미지: search_image()로 연관 이미지 보강 (신뢰 호스트 우선)
+    로컬 검색 + 키워드 적합도(score)까지만 계산한 후보 목록(블로그/이미지 보강 없음).
+    같은 질의는 캐시에서 돌려준다(페이지 넘길 때 재호출 방지).
+    카탈로그에 있는 질의면 라이브 호출 없이 저장본(리뷰 수/이미지 포함)을 쓴다.
     """
     limit = max(1, min(int(limit or 20), 50))
+    if _catalog_lookup is not None:
+        try:
+            hit = _catalog_lookup(query, limit=limit)
+        except Exception:
+            hit = None
+        if hit:
+            return hit
+    key = f"local::{query}::{min(30, limit)}"
+    hit = _CACHE.get(key)
+    if hit is not None:
+        return [dict(it) for it in hit["items"]][:limit]
     data = _search_local_raw(query, display=min(30, limit), start=1)
-    items = [_map_local_item(it) for it in data.get("items", [])]
+    items = [intern_place(_map_local_item(it)) for it in data.get("items", [])]
 
-    items = _dedupe_by_name(items)
+    items = _dedupe_rows(items)
 
     toks = [t for t in query.split() if len(t) >= 2]
     for it in items:
@@ -283,26 +397,42 @@ def search_and_rank_places(query: str, limit: int = 20, sort: str = "review_desc
             score += 0.3
         it["score"] = score
 
-        # 블로그 total을 "review_count" 프록시로 채움
+        # 네이버 지도 링크 보강(없으면 생성)
+        if not it.get("map_link") and name:
+            it["map_link"] = naver_map_link(name)
+
+    _CACHE[key] = {"items": [dict(it) for it in items], "ts": time.time()}
+    _geo_remember(items)
+    return items[:limit]
+
+def enrich_place(it: Dict, reviews: bool = True, image: bool = True) -> Dict:
+    """
+    후보 1건에 리뷰 수(블로그 total)와 이미지를 채운다. it를 직접 고쳐서 돌려준다.
+    reviews/image 로 단계별로 나눠 부를 수 있다(이미 채운 값은 다시 조회하지 않음).
+    """
+    name = (it.get("name") or "")
+    addr = (it.get("address") or "")
+    cat  = (it.get("category") or "")
+
+    # 블로그 total을 "review_count" 프록시로 채움
+    if reviews and it.get("review_count") is None:
         blog_q = f"{name} {addr.split()[0] if addr else ''}".strip() or name
         try:
             it["review_count"] = _blog_total(blog_q)
         except Exception:
             it["review_count"] = it.get("review_count") or 0
 
-        # rating은 Local API에 없어 None 유지(후순위 키로 score 사용)
-        it["rating"] = it.get("rating") or None
+    # rating은 Local API에 없어 None 유지(후순위 키로 score 사용)
+    it["rating"] = it.get("rating") or None
 
-        # 네이버 지도 링크 보강(없으면 생성)
-        if not it.get("map_link") and name:
-            it["map_link"] = naver_map_link(name)
-
-        # ✅ 이미지 보강
-        if not it.get("image_url"):
-            # 음식/카페류는 음식 사진 우선 탐색
-            is_food = bool(re.search(r"(맛집|음식|식당|카페|디저트|베이커리|coffee|bakery)", cat, re.I))
-            it["image_url"] = _image_for_place(name, addr, cat, prefer_food=is_food) or None
+    # ✅ 이미지 보강
+    if image and not it.get("image_url"):
+        # 음식/카페류는 음식 사진 우선 탐색
+        is_food = bool(re.search(r"(맛집|음식|식당|카페|디저트|베이커리|coffee|bakery)", cat, re.I))
+        it["image_url"] = _image_for_place(name, addr, cat, prefer_food=is_food) or None
+    return it
 
+def sort_places(items: List[Dict], sort: str = "review_desc") -> List[Dict]:
     s = (sort or "review_desc").strip()
     if s == "rating_desc":
         # rating 없음 → 리뷰/스코어 보조
@@ -311,11 +441,46 @@ def search_and_rank_places(query: str, limit: int = 20, sort: str = "review_desc
                                   x.get("score") or 0.0),
                    reverse=True)
     elif s == "distance_asc":
-        items.sort(key=lambda x: (x.get("distance_km") or 9e9, -(x.get("score") or 0.0)))
+        items.sort(key=lambda x: (9e9 if x.get("distance_km") is None else x["distance_km"],
+                                  -(x.get("score") or 0.0)))
     else:
         # 기본: 리뷰 많은 순 (블로그 total 기반)
         items.sort(key=lambda x: (x.get("review_count") or 0,
                                   x.get("score") or 0.0),
                    reverse=True)
+    return items
 
-    return items[:limit]
+def _nearby_matches(query: str, lat: float, lng: float, radius_km: float, have: List[Dict]) -> List[Dict]:
+    """반경 안의 알려진 장소 중 질의 토큰이 이름/카테고리에 걸리는 것(이미 있는 건 제외)."""
+    toks = [t for t in query.split() if len(t) >= 2]
+    keys = {row_key(it) for it in have}
+    out = []
+    for _, it in _geo_nearby(lat, lng, radius_km):
+        if row_key(it) in keys:
+            continue
+        score = _score_token_match(it.get("name") or "", it.get("category") or "", toks)
+        if score > 0:
+            out.append(dict(it, score=score))
+    return out
+
+def search_and_rank_places(query: str, limit: int = 20, sort: str = "review_desc",
+                           center_lat: Optional[float] = None, center_lng: Optional[float] = None,
+                           radius_km: Optional[float] = None, **_: object) -> List[Dict]:
+    """
+    다건 검색 + 정렬.
+    - 리뷰 많은 순: 네이버 블로그 total을 리뷰 수 프록시로 사용
+    - 별점 높은 순: Local API가 별점을 주지 않으므로 리뷰 수/키워드 점수로 보조 정렬
+    - 거리 순: center_lat/center_lng 기준 distance_km, radius_km 가 있으면 반경 밖 제거
+      (반경 안의 알려진 장소 중 질의에 맞는 것도 후보에 보충)
+    - 이미지: search_image()로 연관 이미지 보강 (신뢰 호스트 우선)
+    """
+    items = search_candidates(query, limit=limit)
+    if center_lat is not None and center_lng is not None:
+        if radius_km:
+            items += _nearby_matches(query, center_lat, center_lng, radius_km, items)
+        items = with_distance(items, center_lat, center_lng, radius_km)
+        if sort == "distance_asc":
+            items = sort_places(items, sort)[:limit]   # 가까운 것만 보강
+    for it in items:
+        enrich_place(it)
+    return sort_places(items, sort)[:limit]
@@ -0,0 +1,319 @@
+# backend/place_catalog.py
+"""
+도시별 장소 카탈로그(로컬 SQLite)와 배치 크롤러.
+
+추천/후보 풀 코드가 쓰는 질의 공간(도시 × 스타일/동반자 힌트 × 음식 종류)은 작고 반복적이라,
+미리 긁어 두고 naver_api.search_candidates 가 먼저 여기서 찾게 한다(없으면 라이브 호출).
+
+    # 부산/경주 질의 공간 크롤링(7일 지난 질의만 다시)
+    python place_catalog.py crawl --cities 부산,경주 --max-age-days 7
+
+    # 현황
+    python place_catalog.py stats
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .place_key import row_key, intern_place
+    from .query_hints import COMP_HINTS_G, STYLE_HINTS_G, cuisine_query
+except Exception:
+    from place_key import row_key, intern_place  # type: ignore
+    from query_hints import COMP_HINTS_G, STYLE_HINTS_G, cuisine_query  # type: ignore
+
+CATALOG_DB = os.getenv("PLACE_CATALOG_DB") or str(Path(__file__).resolve().parent / "data" / "place_catalog.sqlite3")
+CATALOG_MAX_AGE_DAYS = float(os.getenv("PLACE_CATALOG_MAX_AGE_DAYS") or 30)
+CRAWL_PER_QUERY = 30          # 로컬 검색 display 최대치
+_RETRY_429_SEC = 60           # 429 맞으면 쉬었다가 재시도
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    id          INTEGER PRIMARY KEY,
+    key         TEXT UNIQUE NOT NULL,      -- place_key.row_key (정규화 이름|주소)
+    name        TEXT NOT NULL,
+    address     TEXT,
+    category    TEXT,
+    telephone   TEXT,
+    blog_count  INTEGER,
+    image_url   TEXT,
+    map_link    TEXT,
+    mapx        TEXT,
+    mapy        TEXT,
+    lat         REAL,
+    lng         REAL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query       TEXT PRIMARY KEY,
+    city        TEXT,
+    crawled_at  REAL NOT NULL,
+    n           INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_places (
+    query       TEXT NOT NULL,
+    place_id    INTEGER NOT NULL,
+    rank        INTEGER NOT NULL,
+    score       REAL,
+    PRIMARY KEY (query, rank)
+);
+CREATE INDEX IF NOT EXISTS idx_places_name ON places(name);
+CREATE INDEX IF NOT EXISTS idx_queries_city ON queries(city);
+"""
+
+_CONN: Optional[sqlite3.Connection] = None
+_CONN_LOCK = Lock()
+
+
+def _norm_query(q: str) -> str:
+    return " ".join((q or "").split())
+
+
+def _connect(create: bool = False) -> Optional[sqlite3.Connection]:
+    """DB 파일이 없으면(create=False) None → 조회는 곧바로 라이브로 넘어간다."""
+    global _CONN
+    if _CONN is not None:
+        return _CONN
+    if not create and not os.path.exists(CATALOG_DB):
+        return None
+    Path(CATALOG_DB).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CATALOG_DB, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    _CONN = conn
+    return conn
+
+
+def _latlng(r: sqlite3.Row) -> tuple:
+    if r["lat"] is not None or not r["mapx"]:
+        return r["lat"], r["lng"]
+    try:
+        from naver_api import mapxy_to_wgs84  # 좌표 변환 이전에 크롤링된 행
+        ll = mapxy_to_wgs84(r["mapx"], r["mapy"])
+    except Exception:
+        ll = None
+    return ll if ll else (None, None)
+
+
+def _row_to_place(r: sqlite3.Row) -> Dict:
+    """search_candidates/search_and_rank_places 와 같은 행 형식."""
+    lat, lng = _latlng(r)
+    return intern_place({
+        "name": r["name"],
+        "title": r["name"],
+        "address": r["address"] or "",
+        "category": r["category"] or "",
+        "telephone": r["telephone"] or "",
+        "lat": lat,
+        "lng": lng,
+        "mapx": r["mapx"],
+        "mapy": r["mapy"],
+        "rating": None,
+        "review_count": r["blog_count"],
+        "map_link": r["map_link"],
+        "image_url": r["image_url"],
+        "score": r["score"] or 0.0,
+        "source": "catalog",
+    })
+
+
+# ========= 조회 =========
+def lookup(query: str, limit: int = 20, max_age_days: Optional[float] = None) -> Optional[List[Dict]]:
+    """
+    크롤링된 질의면 저장된 순서대로 행을 돌려준다. 없거나 오래됐으면 None(→ 라이브 호출).
+    """
+    q = _norm_query(query)
+    if not q:
+        return None
+    with _CONN_LOCK:
+        conn = _connect()
+        if conn is None:
+            return None
+        meta = conn.execute("SELECT crawled_at FROM queries WHERE query = ?", (q,)).fetchone()
+        if meta is None:
+            return None
+        age_days = (time.time() - meta["crawled_at"]) / 86400
+        if age_days > (CATALOG_MAX_AGE_DAYS if max_age_days is None else max_age_days):
+            return None
+        rows = conn.execute(
+            "SELECT p.*, qp.score FROM query_places qp JOIN places p ON p.id = qp.place_id "
+            "WHERE qp.query = ? ORDER BY qp.rank LIMIT ?",
+            (q, max(1, int(limit or 20))),
+        ).fetchall()
+    return [_row_to_place(r) for r in rows]
+
+
+def iter_places() -> List[Dict]:
+    """색인용: 장소마다 한 행(+ 처음 수집된 도시)."""
+    with _CONN_LOCK:
+        conn = _connect()
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT p.*, MIN(q.city) AS city, MAX(qp.score) AS score FROM places p "
+            "JOIN query_places qp ON qp.place_id = p.id JOIN queries q ON q.query = qp.query "
+            "GROUP BY p.id ORDER BY p.id"
+        ).fetchall()
+    return [dict(_row_to_place(r), city=r["city"] or "") for r in rows]
+
+
+def stats() -> Dict:
+    with _CONN_LOCK:
+        conn = _connect()
+        if conn is None:
+            return {"db": CATALOG_DB, "places": 0, "queries": 0, "cities": {}}
+        places = conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        queries = conn.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+        cities = {r[0]: r[1] for r in conn.execute("SELECT city, COUNT(*) FROM queries GROUP BY city")}
+    return {"db": CATALOG_DB, "places": places, "queries": queries, "cities": cities}
+
+
+# ========= 저장 =========
+def _place_key(it: Dict) -> str:
+    return row_key(it)
+
+
+def _stale_place(conn: sqlite3.Connection, key: str, max_age_sec: float) -> bool:
+    r = conn.execute("SELECT updated_at, blog_count FROM places WHERE key = ?", (key,)).fetchone()
+    return r is None or r["blog_count"] is None or time.time() - r["updated_at"] > max_age_sec
+
+
+def _upsert_place(conn: sqlite3.Connection, it: Dict) -> int:
+    raw = it.get("raw") or {}               # 예전 캐시/카탈로그 행에는 원본이 남아 있을 수 있다
+    conn.execute(
+        """
+        INSERT INTO places (key, name, address, category, telephone, blog_count, image_url, map_link,
+                            mapx, mapy, lat, lng, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            category = excluded.category, telephone = excluded.telephone,
+            blog_count = COALESCE(excluded.blog_count, places.blog_count),
+            image_url = COALESCE(excluded.image_url, places.image_url),
+            map_link = excluded.map_link, mapx = excluded.mapx, mapy = excluded.mapy,
+            lat = COALESCE(excluded.lat, places.lat), lng = COALESCE(excluded.lng, places.lng),
+            updated_at = CASE WHEN excluded.blog_count IS NULL THEN places.updated_at ELSE excluded.updated_at END
+        """,
+        (
+            _place_key(it), it.get("name") or "", it.get("address") or "", it.get("category") or "",
+            it.get("telephone") or "", it.get("review_count"), it.get("image_url"), it.get("map_link"),
+            str(raw.get("mapx") or it.get("mapx") or "") or None, str(raw.get("mapy") or it.get("mapy") or "") or None,
+            it.get("lat"), it.get("lng"), time.time(),
+        ),
+    )
+    return conn.execute("SELECT id FROM places WHERE key = ?", (_place_key(it),)).fetchone()[0]
+
+
+def store(query: str, city: str, rows: Iterable[Dict]) -> int:
+    """질의 결과를 순서대로 저장(이전 결과는 교체)."""
+    q = _norm_query(query)
+    rows = list(rows)
+    with _CONN_LOCK:
+        conn = _connect(create=True)
+        with conn:
+            conn.execute("DELETE FROM query_places WHERE query = ?", (q,))
+            for rank, it in enumerate(rows):
+                pid = _upsert_place(conn, it)
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_places (query, place_id, rank, score) VALUES (?, ?, ?, ?)",
+                    (q, pid, rank, it.get("score")),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO queries (query, city, crawled_at, n) VALUES (?, ?, ?, ?)",
+                (q, city, time.time(), len(rows)),
+            )
+    return len(rows)
+
+
+# ========= 크롤러 =========
+def query_space(city: str) -> List[str]:
+    """추천/후보 풀/음식 추천이 실제로 만드는 질의들."""
+    qs = [f"{city} 관광지", f"{city} 맛집", f"{city} 명소"]
+    for hints in list(STYLE_HINTS_G.values()) + list(COMP_HINTS_G.values()):
+        qs += [f"{city} {h}" for h in hints]
+    qs += [f"{city} {kw}" for kw in ("무료", "저렴", "산책", "분식", "가성비 맛집", "애견동반")]
+    for cuisine in ("한식", "양식", "중식", "일식", "카페", "패스트푸드"):
+        qs += [f"{city} {t} 맛집" for t in cuisine_query(cuisine).split()]
+    return list(dict.fromkeys(_norm_query(q) for q in qs))
+
+
+def _due(query: str, max_age_days: float) -> bool:
+    with _CONN_LOCK:
+        conn = _connect(create=True)
+        meta = conn.execute("SELECT crawled_at FROM queries WHERE query = ?", (query,)).fetchone()
+    return meta is None or time.time() - meta["crawled_at"] > max_age_days * 86400
+
+
+def _with_retry(fn, *a, retries: int = 2, **kw):
+    for attempt in range(retries + 1):
+        try:
+            return fn(*a, **kw)
+        except RuntimeError as e:
+            if "429" not in str(e) or attempt == retries:
+                raise
+            print(f"[crawl] 429 → {_RETRY_429_SEC}s 대기")
+            time.sleep(_RETRY_429_SEC)
+
+
+def crawl(cities: List[str], max_age_days: float = 7.0, force: bool = False, images: bool = True) -> Dict:
+    """
+    도시별 질의 공간을 순서대로 크롤링.
+    - 호출 간격은 naver_api._wait_politely 가 지킨다(직렬 실행)
+    - 증분: crawled_at 이 max_age_days 보다 최근인 질의, updated_at 이 최근인 장소는 건너뜀
+    """
+    import naver_api
+
+    done = {"queries": 0, "skipped": 0, "places": 0, "enriched": 0, "errors": 0}
+    max_age_sec = max_age_days * 86400
+    for city in [c.strip() for c in cities if c.strip()]:
+        for q in query_space(city):
+            if not force and not _due(q, max_age_days):
+                done["skipped"] += 1
+                continue
+            try:
+                data = _with_retry(naver_api._search_local_raw, q, display=CRAWL_PER_QUERY, start=1)
+                items = naver_api._dedupe_rows([naver_api._map_local_item(it) for it in data.get("items", [])])
+                toks = [t for t in q.split() if len(t) >= 2]
+                for it in items:
+                    it["score"] = naver_api._score_token_match(it["name"], it["category"], toks) + (0.3 if it["address"] else 0.0)
+                    with _CONN_LOCK:
+                        stale = force or _stale_place(_connect(create=True), _place_key(it), max_age_sec)
+                    if stale:
+                        _with_retry(naver_api.enrich_place, it, reviews=True, image=images)
+                        done["enriched"] += 1
+                done["places"] += store(q, city, items)
+                done["queries"] += 1
+                print(f"[crawl] {q}: {len(items)}곳")
+            except Exception as e:
+                done["errors"] += 1
+                print(f"[crawl] {q} 실패:", e)
+    return done
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="도시별 장소 카탈로그 크롤러")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("crawl", help="질의 공간 크롤링(증분)")
+    c.add_argument("--cities", required=True, help="쉼표 구분 도시 목록 (예: 부산,경주)")
+    c.add_argument("--max-age-days", type=float, default=7.0, help="이보다 오래된 질의/장소만 다시 수집")
+    c.add_argument("--force", action="store_true", help="나이와 상관없이 전부 다시 수집")
+    c.add_argument("--no-images", action="store_true", help="이미지 보강 생략")
+    sub.add_parser("stats", help="카탈로그 현황")
+    args = ap.parse_args()
+
+    if args.cmd == "crawl":
+        res = crawl(args.cities.split(","), max_age_days=args.max_age_days,
+                    force=args.force, images=not args.no_images)
+        print(json.dumps(res, ensure_ascii=False))
+    else:
+        print(json.dumps(stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
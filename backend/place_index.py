@@ -0,0 +1,318 @@
+# backend/place_index.py
+"""
+장소 카탈로그 위 역색인(이름/카테고리 n-gram) + 도시별 파티션.
+
+    idx = get_index()
+    idx.search("부산", "바다 보이는 카페", k=10, kind="restaurant")
+
+- 이름: 한글/영숫자 토큰 + 2-gram (예: "해운대해수욕장" → 해운, 운대, 대해, …)
+- 카테고리: "음식점>한식" → 경로 접두어(음식점, 음식점>한식) + 각 마디의 n-gram
+- 점수: Σ idf(term) × 필드 가중치(이름 1.2 / 카테고리 0.7) + 0.15·log(1+블로그 수)
+- 영속화(선택): PLACE_INDEX_FILE 에 저장하면 다음 기동 때 postings 를 mmap 으로 연다.
+- 카탈로그가 바뀌면 요청은 기존 인덱스로 답하고, 재색인은 백그라운드에서(PLACE_INDEX_REBUILD_SEC 간격 이상).
+
+    python place_index.py build      # 카탈로그 → 인덱스 파일
+    python place_index.py query 부산 "한식 맛집"
+"""
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    from . import place_catalog
+except Exception:
+    import place_catalog  # type: ignore
+
+INDEX_FILE = os.getenv("PLACE_INDEX_FILE") or ""
+_MAGIC = b"PIDX1\n"
+
+_W_NAME = 1.2
+_W_CAT = 0.7
+_W_POP = 0.15
+
+_TOKEN_RE = re.compile(r"[0-9A-Za-z가-힣]+")
+# 질의에서 의미가 약한 말 / 카테고리로 바꿔 읽을 말
+_STOP = {"추천", "근처", "주변", "곳", "개", "좀", "해줘", "알려줘", "어디", "있어", "여행", "가볼만한"}
+_ALIASES = {
+    "맛집": "음식점", "식당": "음식점", "먹을": "음식점", "음식": "음식점",
+    "관광지": "관광", "명소": "관광", "볼거리": "관광", "여행지": "관광",
+}
+_FOOD_CATS = ("음식점", "카페", "디저트", "베이커리", "술집")
+
+
+def _grams(tok: str) -> List[str]:
+    tok = tok.lower()
+    if len(tok) <= 2:
+        return [tok]
+    return [tok] + [tok[i:i + 2] for i in range(len(tok) - 1)]
+
+
+def _name_terms(name: str) -> List[str]:
+    out: List[str] = []
+    for t in _TOKEN_RE.findall(name or ""):
+        out += _grams(t)
+    joined = "".join(_TOKEN_RE.findall(name or ""))
+    if joined and " " in (name or ""):
+        out += _grams(joined)   # "해운대 해수욕장" ↔ "해운대해수욕장"
+    return list(dict.fromkeys(out))
+
+
+def _cat_terms(category: str) -> List[str]:
+    out: List[str] = []
+    for path in re.split(r"[,/]", category or ""):
+        parts = [p.strip() for p in path.split(">") if p.strip()]
+        for i in range(len(parts)):
+            out.append("@" + ">".join(parts[:i + 1]))     # 경로 접두어
+            for t in _TOKEN_RE.findall(parts[i]):
+                out += _grams(t)
+    return list(dict.fromkeys(out))
+
+
+def query_terms(text: str, city: str = "") -> List[str]:
+    city_toks = set(_TOKEN_RE.findall(city or ""))
+    out: List[str] = []
+    for t in _TOKEN_RE.findall(text or ""):
+        if t in city_toks or t in _STOP:
+            continue
+        out += _grams(_ALIASES.get(t, t))
+    return list(dict.fromkeys(out))
+
+
+def _is_food(category: str) -> bool:
+    return any(c in (category or "") for c in _FOOD_CATS)
+
+
+class PlaceIndex:
+    """
+    docs: 장소 행 목록(doc id = 리스트 위치)
+    postings[city][term] → doc id 시퀀스(정렬됨). term 앞 'n:' 이름, 'c:' 카테고리.
+    """
+
+    def __init__(self, docs: List[Dict], postings: Dict[str, Dict[str, Sequence[int]]]):
+        self.docs = docs
+        self.postings = postings
+        self._n = {city: max(1, len({d for seq in terms.values() for d in seq}))
+                   for city, terms in postings.items()}
+        self._mm: Optional[mmap.mmap] = None
+
+    # ---- 생성 ----
+    @classmethod
+    def build(cls, rows: Iterable[Dict]) -> "PlaceIndex":
+        docs: List[Dict] = []
+        post: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        for r in rows:
+            doc_id = len(docs)
+            docs.append(r)
+            part = post[r.get("city") or ""]
+            for t in _name_terms(r.get("name") or ""):
+                part["n:" + t].append(doc_id)
+            for t in _cat_terms(r.get("category") or ""):
+                part["c:" + t].append(doc_id)
+        return cls(docs, {c: dict(t) for c, t in post.items()})
+
+    @classmethod
+    def from_catalog(cls) -> "PlaceIndex":
+        return cls.build(place_catalog.iter_places())
+
+    # ---- 영속화(mmap) ----
+    def save(self, path: str) -> None:
+        """[magic][헤더 길이 8B][헤더 JSON][uint32 postings] 형식."""
+        flat = array("I")
+        parts: Dict[str, Dict[str, List[int]]] = {}
+        for city, terms in self.postings.items():
+            ref = parts.setdefault(city, {})
+            for term, seq in terms.items():
+                ref[term] = [len(flat), len(seq)]
+                flat.extend(seq)
+        header = json.dumps({"docs": self.docs, "parts": parts}, ensure_ascii=False).encode("utf-8")
+        tmp = f"{path}.tmp"
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            pad = (-f.tell()) % 4
+            f.write(b"\0" * pad)
+            flat.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PlaceIndex":
+        f = open(path, "rb")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        if mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"not a place index: {path}")
+        hlen = int.from_bytes(mm[len(_MAGIC):len(_MAGIC) + 8], "little")
+        start = len(_MAGIC) + 8
+        header = json.loads(mm[start:start + hlen].decode("utf-8"))
+        data_off = start + hlen + ((-(start + hlen)) % 4)
+        flat = memoryview(mm)[data_off:].cast("I")
+        postings = {city: {term: flat[o:o + n] for term, (o, n) in terms.items()}
+                    for city, terms in header["parts"].items()}
+        idx = cls(header["docs"], postings)
+        idx._mm = mm
+        return idx
+
+    # ---- 조회 ----
+    def cities(self) -> List[str]:
+        return sorted(self.postings)
+
+    def has_city(self, city: str) -> bool:
+        return bool(self.postings.get((city or "").strip()))
+
+    def search(self, city: str, text: str, k: int = 10, kind: Optional[str] = None,
+               offset: int = 0) -> List[Dict]:
+        """
+        kind: "restaurant"(음식점/카페류만) | "attraction"(그 외) | None
+        질의어가 비면 인기(블로그 수) 순.
+        """
+        city = (city or "").strip()
+        part = self.postings.get(city)
+        if not part:
+            return []
+        n = self._n[city]
+        scores: Dict[int, float] = defaultdict(float)
+        terms = query_terms(text, city)
+        for t in terms:
+            for field, w in (("n:", _W_NAME), ("c:", _W_CAT)):
+                seq = part.get(field + t)
+                if seq is None and field == "c:":
+                    seq = part.get("c:@" + t)
+                if not seq:
+                    continue
+                idf = math.log(1 + n / len(seq))
+                for d in seq:
+                    scores[d] += w * idf
+        if not terms:
+            scores = {d: 0.0 for seq in part.values() for d in seq}
+
+        out = []
+        for d, s in scores.items():
+            doc = self.docs[d]
+            cat = doc.get("category") or ""
+            if kind == "restaurant" and not _is_food(cat):
+                continue
+            if kind == "attraction" and _is_food(cat):
+                continue
+            out.append((s + _W_POP * math.log1p(doc.get("review_count") or 0), d))
+        out.sort(key=lambda x: (-x[0], x[1]))
+        return [dict(self.docs[d], score=round(s, 3), source="index")
+                for s, d in out[offset:offset + max(1, int(k or 10))]]
+
+
+# ========= 전역 인덱스(지연 로드) =========
+INDEX_REBUILD_MIN_SEC = float(os.getenv("PLACE_INDEX_REBUILD_SEC", "60"))   # 백그라운드 재색인 최소 간격
+
+_INDEX: Optional[PlaceIndex] = None
+_INDEX_TS = 0.0                    # 지금 인덱스가 반영한 카탈로그 mtime
+_INDEX_LOCK = Lock()
+_REBUILDING = False
+_LAST_REBUILD = 0.0
+
+
+def _catalog_ts() -> float:
+    return os.path.getmtime(place_catalog.CATALOG_DB) if os.path.exists(place_catalog.CATALOG_DB) else 0.0
+
+
+def _save(idx: PlaceIndex) -> None:
+    try:
+        idx.save(INDEX_FILE)
+    except Exception as e:
+        print("[place_index] save error:", e)
+
+
+def _open_or_build(cat_ts: float, save_in_background: bool = False) -> PlaceIndex:
+    """INDEX_FILE 이 카탈로그보다 새로우면 mmap 으로 열고, 아니면 카탈로그에서 만들어 저장한다."""
+    if INDEX_FILE and os.path.exists(INDEX_FILE) and os.path.getmtime(INDEX_FILE) >= cat_ts:
+        return PlaceIndex.load(INDEX_FILE)
+    idx = PlaceIndex.from_catalog()
+    if INDEX_FILE and save_in_background:
+        threading.Thread(target=_save, args=(idx,), name="place-index-save", daemon=True).start()
+    elif INDEX_FILE:
+        _save(idx)
+    return idx
+
+
+def _rebuild(cat_ts: float) -> None:
+    global _INDEX, _INDEX_TS, _REBUILDING
+    try:
+        idx = _open_or_build(cat_ts)
+        with _INDEX_LOCK:
+            _INDEX, _INDEX_TS = idx, cat_ts
+    except Exception as e:
+        print("[place_index] rebuild error:", e)
+    finally:
+        with _INDEX_LOCK:
+            _REBUILDING = False
+
+
+def get_index(reload: bool = False) -> Optional[PlaceIndex]:
+    """
+    처음에는 INDEX_FILE(카탈로그보다 새로우면 mmap) 또는 카탈로그에서 만든다.
+    그 뒤 카탈로그가 바뀌면(또는 reload) 지금 인덱스를 그대로 돌려주고, 재색인·저장은 백그라운드 스레드에서
+    INDEX_REBUILD_MIN_SEC 에 한 번까지만 한다. 카탈로그가 없으면 None(호출부는 라이브 검색으로 폴백).
+    """
+    global _INDEX, _INDEX_TS, _REBUILDING, _LAST_REBUILD
+    cat_ts = _catalog_ts()
+    with _INDEX_LOCK:
+        if _INDEX is not None:
+            stale = reload or cat_ts > _INDEX_TS
+            if stale and not _REBUILDING and time.time() - _LAST_REBUILD >= INDEX_REBUILD_MIN_SEC:
+                _REBUILDING, _LAST_REBUILD = True, time.time()
+                threading.Thread(target=_rebuild, args=(cat_ts,), name="place-index-rebuild", daemon=True).start()
+            return _INDEX
+        if not cat_ts and not (INDEX_FILE and os.path.exists(INDEX_FILE)):
+            return None
+        _INDEX, _INDEX_TS = _open_or_build(cat_ts, save_in_background=True), cat_ts   # 줄 인덱스가 없으니 만들기만 기다린다
+        _LAST_REBUILD = time.time()
+        return _INDEX
+
+
+def search_local(city: str, text: str, k: int = 10, kind: Optional[str] = None,
+                 offset: int = 0) -> List[Dict]:
+    """인덱스가 없거나 도시가 없으면 []."""
+    try:
+        idx = get_index()
+    except Exception as e:
+        print("[place_index] load error:", e)
+        return []
+    if idx is None:
+        return []
+    return idx.search(city, text, k=k, kind=kind, offset=offset)
+
+
+def main() -> None:
+    if len(sys.argv) >= 2 and sys.argv[1] == "build":
+        idx = PlaceIndex.from_catalog()
+        path = INDEX_FILE or str(Path(place_catalog.CATALOG_DB).with_suffix(".idx"))
+        idx.save(path)
+        print(json.dumps({"file": path, "docs": len(idx.docs), "cities": idx.cities()}, ensure_ascii=False))
+    elif len(sys.argv) >= 4 and sys.argv[1] == "query":
+        idx = get_index()
+        if idx is None:
+            raise SystemExit("카탈로그가 없습니다. python place_catalog.py crawl --cities ... 먼저 실행")
+        t0 = time.perf_counter()
+        rows = idx.search(sys.argv[2], " ".join(sys.argv[3:]), k=10)
+        ms = (time.perf_counter() - t0) * 1000
+        for r in rows:
+            print(f"{r['score']:>7.2f}  {r['name']}  [{r.get('category')}]  {r.get('address')}")
+        print(f"({ms:.2f} ms)")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# backend/place_key.py
+"""
+장소 식별 키(정규화) — 중복 제거/캐시가 모두 이 키를 쓴다.
+
+    name_key("스타벅스 해운대점")      → "스타벅스"
+    name_key("점심: 밀면 (본점)")      → "밀면"
+    addr_key("부산광역시 해운대구 해운대로 570") → "해운대로570"
+    place_key("스타벅스 해운대점", "부산 해운대구 해운대로 570") → "스타벅스|해운대로570"
+
+- 이름: NFKC, <b>태그/괄호 내용/식사 라벨/지점 접미사(○○점, 본점) 제거 → 소문자, 공백·구두점 제거
+- 주소: 도로명+건물번호(없으면 동+번지) 토막만 사용 → '부산광역시'/'부산' 같은 표기 차이 무시
+- 결과 문자열은 sys.intern 으로 공유(같은 키가 여러 캐시/색인에 들어가도 한 벌)
+"""
+from __future__ import annotations
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional
+
+_TAG_RE = re.compile(r"</?b>", re.I)
+_PAREN_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]|（[^）]*）")
+_MEAL_RE = re.compile(r"^(?:아침|브런치|점심|런치|저녁|디너)\s*(?:[:：]\s*|\s+)", re.I)
+# 지점 접미사. '백화점/면세점/서점…' 처럼 업종명이 '점'으로 끝나는 경우는 건드리지 않는다.
+_BRANCH_RE = re.compile(
+    r"\s+(?!(?:백화|면세|서|상|매|음식|편의|할인|아울렛|가맹)점$)"
+    r"(?:[0-9A-Za-z가-힣]{1,12}\s?(?:직영점|지점|점)|본점|본관|별관|\d+호점)$"
+)
+_PUNCT_RE = re.compile(r"[\s\-_·•.,'’\"/&+!~:：|]+")
+_ROAD_RE = re.compile(r"([0-9가-힣]+(?:대로|로|길))\s*(\d+(?:-\d+)?)")
+_LOT_RE = re.compile(r"([0-9가-힣]+(?:동|리|가))\s*(\d+(?:-\d+)?)")
+_PROVINCE_RE = re.compile(r"(특별자치시|특별자치도|특별시|광역시)")
+
+_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def name_key(name: str) -> str:
+    s = unicodedata.normalize("NFKC", name or "")
+    s = _TAG_RE.sub("", s)
+    s = _MEAL_RE.sub("", s.strip())
+    s = _PAREN_RE.sub(" ", s).strip()
+    base = s
+    s = _BRANCH_RE.sub("", s)
+    key = _PUNCT_RE.sub("", s).lower()
+    if not key:                       # "본점" 처럼 접미사만 남는 이름
+        key = _PUNCT_RE.sub("", base).lower()
+    return sys.intern(key)
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def addr_key(address: str) -> str:
+    s = unicodedata.normalize("NFKC", address or "")
+    if not s.strip():
+        return ""
+    m = _ROAD_RE.search(s) or _LOT_RE.search(s)
+    if m:
+        return sys.intern(f"{m.group(1)}{m.group(2)}")
+    s = _PROVINCE_RE.sub("", s)
+    return sys.intern(_PUNCT_RE.sub("", s).lower())
+
+
+def place_key(name: str, address: Optional[str] = None) -> str:
+    """이름+주소 키. 주소가 없으면 'name|' (이름만으로 비교)."""
+    n = name_key(name)
+    if not n:
+        return ""
+    return sys.intern(f"{n}|{addr_key(address or '')}")
+
+
+def row_name(it: Dict) -> str:
+    return it.get("name") or it.get("title") or it.get("place_name") or ""
+
+
+def row_address(it: Dict) -> str:
+    return it.get("address") or it.get("road_address") or it.get("roadAddress") or it.get("addr") or ""
+
+
+def row_key(it: Dict) -> str:
+    return place_key(row_name(it), row_address(it))
+
+
+class PlaceKeyIndex:
+    """
+    정규화 키 → 값(해시 색인). 중복 제거용 집합으로도 쓴다.
+
+        idx = PlaceKeyIndex()
+        fresh = [it for it in rows if idx.add(it)]
+    """
+
+    __slots__ = ("_d", "_by_name")
+
+    def __init__(self, by_name: bool = False):
+        self._d: Dict[str, object] = {}
+        self._by_name = by_name
+
+    def key_of(self, x) -> str:
+        if isinstance(x, dict):
+            return name_key(row_name(x)) if self._by_name else row_key(x)
+        return name_key(x) if self._by_name else place_key(x)
+
+    def add(self, x, value=None) -> bool:
+        """새 키면 등록하고 True, 이미 있으면 False."""
+        k = self.key_of(x)
+        if not k or k in self._d:
+            return False
+        self._d[k] = x if value is None else value
+        return True
+
+    def get(self, x, default=None):
+        return self._d.get(self.key_of(x), default)
+
+    def __contains__(self, x) -> bool:
+        return self.key_of(x) in self._d
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._d)
+
+
+def dedupe(rows: Iterable[Dict], by_name: bool = False) -> list:
+    idx = PlaceKeyIndex(by_name=by_name)
+    return [it for it in rows or [] if idx.add(it)]
+
+
+_INTERN_FIELDS = ("name", "title", "address", "category")
+
+
+def intern_place(it: Dict) -> Dict:
+    """반복해서 나오는 장소 문자열을 intern 해 메모리를 줄인다(제자리 수정)."""
+    for f in _INTERN_FIELDS:
+        v = it.get(f)
+        if isinstance(v, str) and v:
+            it[f] = sys.intern(v)
+    return it
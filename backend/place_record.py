@@ -0,0 +1,110 @@
+# backend/place_record.py
+"""
+응답용 장소 레코드 — 고정 필드(__slots__), 원본(raw)/중복 필드(title 등) 없음.
+
+    recs = to_records(rows)                       # 네이버/카탈로그/구글 행 dict → PlaceRecord
+    fields = parse_fields("name,lat,lng")         # 모르는 필드면 ValueError
+    [r.to_dict(fields) for r in recs]             # 값이 None 인 필드는 뺀다
+
+- 행마다 제각각인 키 이름(title/place_name, roadAddress, map_link/naver_url, telephone …)을
+  여기서 한 번만 정리한다.
+- 문자열(이름/분류/주소)은 sys.intern → 같은 장소가 여러 응답/캐시에 나와도 한 벌.
+- 인스턴스에 __dict__ 가 없어 행 dict(키 15개) 보다 훨씬 작다.
+- 응답 경계(/v2)에서만 쓴다. 검색/보강/캐시 단계는 여전히 행 dict 를 주고받는다(단계마다 키를 더하고
+  고치므로). 네이버 원본 응답(raw)은 _map_local_item 에서 이미 떼어 내 캐시 행에 싣지 않는다.
+"""
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FIELDS: Tuple[str, ...] = (
+    "name", "category", "address", "lat", "lng", "rating", "review_count",
+    "image_url", "thumb_url", "map_url", "phone", "distance_km", "score",
+)
+
+_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "name": ("name", "title", "place_name"),
+    "category": ("category", "category_name"),
+    "address": ("address", "road_address", "roadAddress", "addr"),
+    "rating": ("rating", "star_score"),
+    "review_count": ("review_count", "reviews", "userRatingTotal", "blog_review_count"),
+    "image_url": ("image_url", "image"),
+    "map_url": ("map_url", "map_link", "naver_url", "url", "link"),
+    "phone": ("phone", "telephone", "tel"),
+}
+_INTERNED = ("name", "category", "address")
+
+
+def _first(row: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+    for k in keys:
+        v = row.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def _num(v: Any, cast=float) -> Any:
+    if v is None or isinstance(v, bool):
+        return None
+    try:
+        return cast(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class PlaceRecord:
+    __slots__ = FIELDS
+
+    def __init__(self, **kw: Any):
+        for f in FIELDS:
+            setattr(self, f, kw.get(f))
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "PlaceRecord":
+        rec = cls.__new__(cls)
+        for f in FIELDS:
+            keys = _ALIASES.get(f)
+            v = _first(row, keys) if keys else row.get(f)
+            if f in _INTERNED and isinstance(v, str):
+                v = sys.intern(v.strip())
+            setattr(rec, f, v)
+        rec.lat, rec.lng = _num(rec.lat), _num(rec.lng)
+        rec.rating, rec.distance_km, rec.score = _num(rec.rating), _num(rec.distance_km), _num(rec.score)
+        rc = rec.review_count
+        rec.review_count = (len(rc) or None) if isinstance(rc, list) else _num(rc, int)   # Place.reviews 는 목록
+        return rec
+
+    def to_dict(self, fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        out = {}
+        for f in fields or FIELDS:
+            v = getattr(self, f)
+            if v is not None:
+                out[f] = v
+        return out
+
+    def __repr__(self) -> str:
+        return f"PlaceRecord({self.name!r})"
+
+
+def to_records(rows: Iterable[Any]) -> List[PlaceRecord]:
+    """행 dict(또는 pydantic 모델) 목록 → 레코드. 이름이 없는 행은 버린다."""
+    out = []
+    for r in rows or []:
+        if not isinstance(r, dict):
+            r = r.model_dump() if hasattr(r, "model_dump") else dict(r)
+        rec = PlaceRecord.from_row(r)
+        if rec.name:
+            out.append(rec)
+    return out
+
+
+def parse_fields(spec: Optional[str], allowed: Tuple[str, ...] = FIELDS) -> Optional[Tuple[str, ...]]:
+    """'name, lat,lng' → ('name', 'lat', 'lng'). 비었으면 None(전체). 모르는 이름이면 ValueError."""
+    names = tuple(dict.fromkeys(s.strip() for s in (spec or "").split(",") if s.strip()))
+    if not names:
+        return None
+    bad = [n for n in names if n not in allowed]
+    if bad:
+        raise ValueError(f"unknown fields: {', '.join(bad)} (allowed: {', '.join(allowed)})")
+    return names
@@ -1,10 +1,25 @@
 # backend/services/places.py
 import math
 import os
+import time
 import requests
+from threading import Lock
 from typing import List, Dict, Optional
 from urllib.parse import quote
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from .place_key import name_key as _norm_name
+except Exception:
+    from place_key import name_key as _norm_name  # type: ignore
+
+try:
+    import numpy as np  # 대량 후보 랭킹용(선택)
+except Exception:
+    np = None
+
 GOOGLE_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -19,57 +34,199 @@ def naver_search_url(name: str) -> str:
     # 순수 장소명으로 네이버 지도 검색
     return f"https://map.naver.com/v5/search/{quote(name)}"
 
+# ============== Google Places(Nearby Search) ==============
+GOOGLE_NEARBY_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+GOOGLE_CACHE_TTL = 6 * 3600       # 같은 위치/반경/키워드는 6시간 재사용
+GOOGLE_MIN_INTERVAL = 0.1         # 호출 간 최소 간격(초)
+GOOGLE_PAGE_DELAY = 2.0           # next_page_token 이 유효해지기까지 기다리는 시간
+GOOGLE_MAX_PAGES = 3              # 20 × 3 = 최대 60곳
+GOOGLE_PAGE_SIZE = 20
+GOOGLE_MAX_RADIUS_M = 50000       # Nearby Search 가 받는 반경 상한
+GOOGLE_CACHE_MAX = 512            # 결과 캐시 항목 수 상한(넘으면 오래된 것부터 버림)
+
+_G_SESSION: Optional[requests.Session] = None
+_G_CACHE: Dict[tuple, tuple] = {}
+_G_LOCK = Lock()
+_G_RATE_LOCK = Lock()
+_G_LAST_CALL = 0.0
+
+def _google_key() -> Optional[str]:
+    # .env 가 places 임포트 뒤에 로드될 수 있어 호출 시점에 읽는다
+    return os.getenv("GOOGLE_MAPS_API_KEY") or GOOGLE_KEY
+
+def google_enabled() -> bool:
+    return bool(_google_key())
+
+def _google_session() -> requests.Session:
+    """커넥션 풀 + 5xx/429 재시도가 걸린 공유 세션."""
+    global _G_SESSION
+    with _G_LOCK:
+        if _G_SESSION is None:
+            s = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=("GET",))
+            s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+            _G_SESSION = s
+        return _G_SESSION
+
+def _google_wait() -> None:
+    """호출 슬롯을 잠금 안에서 예약하고 밖에서 기다린다(naver_api._wait_politely 와 같은 방식)."""
+    global _G_LAST_CALL
+    with _G_RATE_LOCK:
+        slot = max(time.time(), _G_LAST_CALL + GOOGLE_MIN_INTERVAL)
+        _G_LAST_CALL = slot
+    delay = slot - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+def _google_get(params: Dict) -> Dict:
+    _google_wait()
+    r = _google_session().get(GOOGLE_NEARBY_URL, params=params, timeout=10)
+    r.raise_for_status()
+    return r.json() or {}
+
+def _google_item(p: Dict) -> Optional[Dict]:
+    name = p.get("name")
+    loc = (p.get("geometry") or {}).get("location") or {}
+    plat, plng = loc.get("lat"), loc.get("lng")
+    if not (name and plat and plng):
+        return None
+    return {
+        "name": name,
+        "rating": float(p.get("rating", 0) or 0),
+        "reviews": int(p.get("user_ratings_total", 0) or 0),
+        "lat": float(plat),
+        "lng": float(plng),
+        "address": p.get("vicinity", ""),
+        "naver_url": naver_search_url(name),
+        "google_place_id": p.get("place_id"),
+    }
+
 def google_nearby_restaurants(
     lat: float,
     lng: float,
     radius_m: int = 2500,
     keyword: Optional[str] = None,
     cuisine: Optional[str] = None,
+    max_pages: int = GOOGLE_MAX_PAGES,
+    limit: Optional[int] = None,
 ) -> List[Dict]:
     """
     Google Places Nearby Search: 평점/후기수/좌표 포함
+    - next_page_token 을 따라 최대 max_pages 페이지(페이지당 20곳). limit 을 주면 그만큼 모일 때까지만
+      (다음 페이지마다 GOOGLE_PAGE_DELAY 를 기다리므로 요청 경로에서는 limit 을 준다)
+    - (위경도 소수 3자리 ≈ 100m, 반경, 키워드, 페이지 수) 기준 결과 캐시. 오류로 끊긴 결과는 캐시하지 않음
+      (넣을 때 만료 항목을 지우고 GOOGLE_CACHE_MAX 를 넘으면 가장 오래된 것부터 버림)
+    - 반경은 1m..GOOGLE_MAX_RADIUS_M 로 자른다
     """
-    if not GOOGLE_KEY:
+    key = _google_key()
+    if not key:
         raise RuntimeError("GOOGLE_MAPS_API_KEY not set in environment")
 
+    kw = " ".join(x for x in [(keyword or "").strip(), (cuisine or "").strip()] if x)
+    radius_m = max(1, min(int(radius_m), GOOGLE_MAX_RADIUS_M))
+    pages = max(1, max_pages)
+    if limit:
+        pages = min(pages, -(-int(limit) // GOOGLE_PAGE_SIZE))
+    ckey = (round(lat, 3), round(lng, 3), int(radius_m), kw, pages)
+    with _G_LOCK:
+        hit = _G_CACHE.get(ckey)
+    if hit and time.time() - hit[0] < GOOGLE_CACHE_TTL:
+        return [dict(it) for it in hit[1]]
+
     params = {
-        "key": GOOGLE_KEY,
+        "key": key,
         "location": f"{lat},{lng}",
         "radius": radius_m,
         "type": "restaurant",
         "language": "ko",
     }
-    if keyword:
-        params["keyword"] = keyword
-    if cuisine:
-        params["keyword"] = (params.get("keyword", "") + f" {cuisine}").strip()
-
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json()
+    if kw:
+        params["keyword"] = kw
 
     items: List[Dict] = []
-    for p in data.get("results", []):
-        name = p.get("name")
-        rating = float(p.get("rating", 0) or 0)
-        reviews = int(p.get("user_ratings_total", 0) or 0)
-        loc = (p.get("geometry") or {}).get("location") or {}
-        plat, plng = loc.get("lat"), loc.get("lng")
-        if not (name and plat and plng):
-            continue
-        items.append({
-            "name": name,
-            "rating": rating,
-            "reviews": reviews,
-            "lat": float(plat),
-            "lng": float(plng),
-            "address": p.get("vicinity", ""),
-            "naver_url": naver_search_url(name),
-            "google_place_id": p.get("place_id"),
-        })
+    seen = set()
+    token = None
+    complete = True
+    for page in range(pages):
+        if token:
+            time.sleep(GOOGLE_PAGE_DELAY)
+            data = _google_get({"key": key, "pagetoken": token})
+            if data.get("status") == "INVALID_REQUEST":      # 토큰이 아직 준비 안 됨 → 한 번 더
+                time.sleep(GOOGLE_PAGE_DELAY)
+                data = _google_get({"key": key, "pagetoken": token})
+        else:
+            data = _google_get(params)
+        status = data.get("status")
+        if status == "OVER_QUERY_LIMIT":
+            raise RuntimeError("GOOGLE 429 Rate limit")
+        if status not in (None, "OK", "ZERO_RESULTS"):
+            complete = False
+            break
+        for p in data.get("results", []):
+            it = _google_item(p)
+            if it and (it["google_place_id"] or it["name"]) not in seen:
+                seen.add(it["google_place_id"] or it["name"])
+                items.append(it)
+        token = data.get("next_page_token")
+        if not token:
+            break
+
+    if complete:
+        now = time.time()
+        with _G_LOCK:
+            for k in [k for k, (ts, _) in _G_CACHE.items() if now - ts >= GOOGLE_CACHE_TTL]:
+                del _G_CACHE[k]
+            _G_CACHE.pop(ckey, None)                     # 다시 넣어 삽입 순서 = 저장 시각 순서
+            while len(_G_CACHE) >= GOOGLE_CACHE_MAX:
+                del _G_CACHE[next(iter(_G_CACHE))]
+            _G_CACHE[ckey] = (now, [dict(it) for it in items])
     return items
 
+def merge_google_rows(rows: List[Dict], google_items: List[Dict], match_km: float = 0.3) -> List[Dict]:
+    """
+    search_and_rank_places 결과(rows)에 Google 결과를 합친다.
+    - 같은 가게(이름 정규화 일치 + match_km 이내, 좌표 없으면 이름만)면 rating/좌표/후기수를 채움
+    - 못 맞춘 Google 항목은 같은 행 형식으로 뒤에 붙임
+    - rows 는 캐시와 공유될 수 있어 고치지 않고 복사본에 채운다
+    """
+    out = [dict(r) for r in rows or []]
+    by_name: Dict[str, List[Dict]] = {}
+    for r in out:
+        by_name.setdefault(_norm_name(r.get("name") or r.get("title") or ""), []).append(r)
+
+    for g in google_items or []:
+        match = None
+        for r in by_name.get(_norm_name(g["name"]), []):
+            if r.get("lat") is None or r.get("lng") is None or \
+                    haversine_km(g["lat"], g["lng"], float(r["lat"]), float(r["lng"])) <= match_km:
+                match = r
+                break
+        if match is not None:
+            if not match.get("rating"):
+                match["rating"] = g["rating"]
+            if match.get("lat") is None:
+                match["lat"], match["lng"] = g["lat"], g["lng"]
+            match["google_reviews"] = g["reviews"]
+            match["google_place_id"] = g.get("google_place_id")
+            continue
+        row = {
+            "name": g["name"], "title": g["name"],
+            "address": g.get("address") or "",
+            "category": "음식점",
+            "lat": g["lat"], "lng": g["lng"],
+            "rating": g["rating"],
+            "review_count": g["reviews"],
+            "google_reviews": g["reviews"],
+            "map_link": g.get("naver_url"),
+            "image_url": None,
+            "google_place_id": g.get("google_place_id"),
+            "source": "google",
+        }
+        out.append(row)
+        by_name.setdefault(_norm_name(g["name"]), []).append(row)
+    return out
+
 def rank_places(
     items: List[Dict],
     origin_lat: float,
@@ -102,3 +259,74 @@ def rank_places(
 
     ranked.sort(key=lambda x: x["score"], reverse=True)
     return ranked
+
+
+# ============== 대량 후보용 벡터화 랭킹(NumPy) ==============
+_R_EARTH = 6371.0
+
+class PlaceArrays:
+    """
+    좌표/평점/후기수를 배열로 들고 있는 후보 묶음.
+    한 번 만들어 두고 사용자 위치만 바꿔 rank()를 여러 번 부를 수 있다.
+    점수 공식은 rank_places와 동일.
+    """
+
+    def __init__(self, items: List[Dict]):
+        if np is None:
+            raise RuntimeError("numpy is required for PlaceArrays")
+        self.items = items
+        self.lat = np.radians(np.fromiter((it["lat"] for it in items), dtype=np.float64, count=len(items)))
+        self.lng = np.radians(np.fromiter((it["lng"] for it in items), dtype=np.float64, count=len(items)))
+        self.rating = np.fromiter((it["rating"] for it in items), dtype=np.float64, count=len(items))
+        self.reviews = np.fromiter((it["reviews"] for it in items), dtype=np.float64, count=len(items))
+        self.cos_lat = np.cos(self.lat)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def distances(self, origin_lat: float, origin_lng: float):
+        """haversine_km 과 같은 식(km)."""
+        lat0, lng0 = math.radians(origin_lat), math.radians(origin_lng)
+        a = np.sin((self.lat - lat0) / 2) ** 2 + math.cos(lat0) * self.cos_lat * np.sin((self.lng - lng0) / 2) ** 2
+        return 2 * _R_EARTH * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    def rank(self, origin_lat: float, origin_lng: float,
+             max_distance_km: float = 5.0, k: Optional[int] = None) -> List[Dict]:
+        if not len(self):
+            return []
+        dist = np.round(self.distances(origin_lat, origin_lng), 2)
+        idx = np.nonzero(dist <= max_distance_km)[0]
+        if idx.size == 0:
+            return []
+        d, rating, reviews = dist[idx], self.rating[idx], self.reviews[idx]
+
+        max_reviews = reviews.max() or 1
+        rev_norm = np.log1p(reviews) / math.log1p(max_reviews)
+        score = np.round((rating / 5) * 0.6 + rev_norm * 0.35 - (d / max_distance_km) * 0.25, 4)
+
+        # 상위 k만 부분 선택 → 정렬(동점은 원래 순서 유지 = rank_places의 안정 정렬과 같음)
+        if k is not None and k < idx.size:
+            part = np.argpartition(-score, k - 1)[:k]
+            cut = score[part].min()
+            part = np.nonzero(score >= cut)[0]        # 경계 동점 포함
+        else:
+            part = np.arange(idx.size)
+        order = part[np.lexsort((part, -score[part]))]
+        if k is not None:
+            order = order[:k]
+        return [dict(self.items[idx[j]], distance_km=float(d[j]), score=float(score[j])) for j in order]
+
+
+def rank_places_batch(items: List[Dict], origin_lat: float, origin_lng: float,
+                      max_distance_km: float = 5.0, k: Optional[int] = None) -> List[Dict]:
+    """
+    rank_places 의 벡터화 버전(상위 k개만 dict로 만든다). 입력 items는 건드리지 않는다.
+    numpy가 없으면 rank_places로 처리.
+    """
+    if not items:
+        return []
+    if np is None:
+        ranked = rank_places([dict(it) for it in items], origin_lat, origin_lng, max_distance_km)
+        return ranked[:k] if k is not None else ranked
+    return PlaceArrays(items).rank(origin_lat, origin_lng, max_distance_km, k)
+
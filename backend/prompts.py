@@ -34,16 +34,7 @@ def build_prompt(location, days, budget, companions, style, selected_places, tra
 """
     return prompt
 
-def build_prompt(
-    location: str,
-    days: Union[int, str],
-    budget: Union[int, str],
-    companions: Union[List[str], str, None],
-    style: Union[List[str], str, None],
-    selected_places: Union[List[str], None],
-    travel_date: Union[str, date, datetime],
-    count: int = 1,
-) -> str:
+def _normalize_inputs(location, days, budget, companions, style, selected_places, travel_date) -> dict:
     # ---- 입력 정리 ----
     days = int(days)
     budget = int(str(budget).replace(",", "").strip())
@@ -77,6 +68,33 @@ def build_prompt(
     date_only = [d.split(" ")[0] for d in date_list]  # YYYY-MM-DD
     date_lines = "\n".join(f"- {d}" for d in date_list)
 
+    return {
+        "location": location, "days": days, "budget": budget,
+        "comp_str": comp_str, "style_str": style_str, "sel_str": sel_str,
+        "date_list": date_list, "date_only": date_only, "date_lines": date_lines,
+    }
+
+
+def build_prompt(
+    location: str,
+    days: Union[int, str],
+    budget: Union[int, str],
+    companions: Union[List[str], str, None],
+    style: Union[List[str], str, None],
+    selected_places: Union[List[str], None],
+    travel_date: Union[str, date, datetime],
+    count: int = 1,
+) -> str:
+    inp = _normalize_inputs(location, days, budget, companions, style, selected_places, travel_date)
+    days = inp["days"]
+    budget = inp["budget"]
+    comp_str = inp["comp_str"]
+    style_str = inp["style_str"]
+    sel_str = inp["sel_str"]
+    date_list = inp["date_list"]
+    date_only = inp["date_only"]
+    date_lines = inp["date_lines"]
+
     # ---- 프롬프트 ----
     return dedent(f"""
     너는 여행 일정 전문가다. 아래의 **하드 규칙**을 100% 준수하며 **{count}개의 서로 다른 일정안**을 한 번에 작성하라.
@@ -154,3 +172,59 @@ def build_prompt(
     - '핵심명'이 그 일정안 전체에서 단 한 번씩만 등장하는가? (중복이면 다른 실제 장소로 교체)
     - 총비용 문구가 맨 끝에 1회만 있고, 활동비 합과 일치하는가?
     """).strip()
+
+
+# ========= 컴팩트 변형(프리픽스 캐시용) =========
+# 규칙 블록에는 입력값을 하나도 넣지 않는다 → 호출마다 바이트 단위로 동일해야
+# 공급자 측 프롬프트 프리픽스 캐시가 적용된다. 가변 입력은 항상 맨 뒤에 붙인다.
+PROMPT_RULES_COMPACT = dedent("""
+너는 여행 일정 전문가다. 아래 하드 규칙을 100% 준수하며, 맨 끝 [입력]의 '일정안 개수'만큼 서로 다른 일정안을 한 번에 작성하라.
+출력은 순수 텍스트만 사용한다(마크다운/코드블록/표/불릿 금지).
+
+[하드 규칙]
+1) 제목/구분: 각 일정안은 "일정추천 N: <여행지> <여행일수>일 코스"로 시작(N은 1부터), 일정안 사이는 한 줄에 '---'만 넣는다.
+2) 날짜 헤더: [입력]의 '날짜 전체'를 빠짐없이 "YYYY-MM-DD (DayN)" 헤더로 쓰고, 헤더 바로 아래에 시간 라인을 둔다.
+3) 하루 슬롯(정확히 5줄, 시간 오름차순 고정, 모든 날짜 동일):
+   08:00 ~ 09:30 아침: <상호명> (<도로명 주소>) (약 <원>)
+   09:30 ~ 12:00 <관광/명소 상호명> (<도로명 주소>) (약 <원>)
+   12:00 ~ 13:30 점심: <상호명> (<도로명 주소>) (약 <원>)
+   14:00 ~ 18:00 <관광/명소 상호명> (<도로명 주소>) (약 <원>)
+   19:00 ~ 20:30 저녁: <상호명> (<도로명 주소>) (약 <원>)
+4) 플레이스홀더 금지: "주요명소/관광지/체험/카페/휴식" 같은 추상어 대신 실제 상호명 + 도로명 주소를 괄호로 적는다.
+5) 장소 중복 금지: 식사 라벨을 뗀 '핵심명'은 한 일정안 전체에서 1회만(체인점은 지점까지 구분). 사용자 선택 장소는 각각 정확히 1회 배치.
+6) 비용: 모든 시간 라인 끝에 " (약 xx,xxx원)"(무료는 0원). 총 예상 비용은 일정안 맨 끝에 1회만, 활동비 합과 일치, 총 예산의 ±15% 이내.
+7) 동선은 합리적으로(과도한 왕복 금지), 실내·실외 균형.
+
+[자체 점검] 날짜 헤더 누락/순서, 하루 5줄, 실제 상호+주소, 핵심명 중복, 총비용 1회·합계 일치를 확인하고 위반 시 고쳐서 출력한다.
+""").strip()
+
+
+def build_prompt_compact(
+    location: str,
+    days: Union[int, str],
+    budget: Union[int, str],
+    companions: Union[List[str], str, None],
+    style: Union[List[str], str, None],
+    selected_places: Union[List[str], None],
+    travel_date: Union[str, date, datetime],
+    count: int = 1,
+) -> str:
+    """
+    build_prompt와 같은 규칙을 짧게 쓴 변형.
+    - 앞부분(PROMPT_RULES_COMPACT)은 호출마다 동일 → 프리픽스 캐시 대상
+    - 여행지/날짜/예산 등 가변 입력은 마지막 [입력] 블록에만 등장
+    """
+    inp = _normalize_inputs(location, days, budget, companions, style, selected_places, travel_date)
+    return PROMPT_RULES_COMPACT + "\n\n" + "\n".join([
+        "[입력]",
+        f"- 일정안 개수: {int(count)}",
+        f"- 여행지: {inp['location']}",
+        f"- 여행일수: {inp['days']}일",
+        f"- 동반자: {inp['comp_str']}",
+        f"- 여행 스타일: {inp['style_str']}",
+        f"- 총 예산: {inp['budget']:,}원",
+        "- 사용자 선택 장소(각각 1회만):",
+        inp["sel_str"],
+        "- 날짜 전체:",
+        inp["date_lines"],
+    ])
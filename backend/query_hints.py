@@ -0,0 +1,43 @@
+# backend/query_hints.py
+"""
+검색 질의 힌트 — 추천/후보 풀(main)과 카탈로그 크롤(place_catalog)이 같은 질의를 만들도록 한곳에 둔다.
+
+    STYLE_HINTS_G["자연"]      → ["자연", "호수", "숲길", "해변", "산책"]
+    cuisine_query("일식")      → "일식 스시 라멘 우동 돈카츠"
+"""
+from __future__ import annotations
+
+from typing import Dict, List
+
+# 전역 힌트(랜덤 후보 풀 생성 시 사용)
+STYLE_HINTS_G: Dict[str, List[str]] = {
+    "SNS": ["핫플", "포토스팟", "인스타", "뷰맛집", "전망대"],
+    "핫플": ["핫플", "포토스팟", "인스타"],
+    "자연": ["자연", "호수", "숲길", "해변", "산책"],
+    "힐링": ["힐링", "온천", "스파", "정원", "산책"],
+    "역사": ["유적지", "박물관", "고궁", "전시"],
+    "체험": ["체험", "공방", "액티비티"],
+    "맛집": ["맛집", "현지 맛집"],
+}
+COMP_HINTS_G: Dict[str, List[str]] = {
+    "가족": ["아이와", "키즈", "체험", "박물관"],
+    "아이": ["아이와", "키즈"],
+    "친구": ["포토스팟", "핫플"],
+    "연인": ["야경", "전망대", "산책"],
+    "부모님": ["사찰", "정원", "유적지", "한옥"],
+}
+
+_CUISINE_TERMS: Dict[str, str] = {
+    "한식": "한식",
+    "양식": "양식 서양식 이탈리안 스테이크 파스타",
+    "중식": "중식 중국집 마라탕 마라샹궈 딤섬",
+    "일식": "일식 스시 라멘 우동 돈카츠",
+    "카페": "카페 디저트 베이커리 커피",
+    "패스트푸드": "패스트푸드 분식 치킨 피자 버거 샌드위치",
+}
+
+
+def cuisine_query(cuisine: str) -> str:
+    """음식 분류 → 검색어 묶음(모르는 분류면 그대로)."""
+    key = (cuisine or "").strip()
+    return _CUISINE_TERMS.get(key, key)
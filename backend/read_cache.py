@@ -0,0 +1,179 @@
+# backend/read_cache.py
+"""
+추천 조회(GET) 응답 캐시 — 정규화된 질의 → 완성된 JSON 본문 + 강한 ETag.
+
+    params = canonical_params(request.query_params, {"destination": ("str", ""), "limit": ("int", 12)})
+    return cached_json(request, "food", params, lambda p: {...})
+
+- 질의 정규화: 알려진 파라미터만, 값 앞뒤 공백 제거, 목록 값(styles=a,b 또는 styles=a&styles=b)은
+  중복 제거 + 정렬, 기본값과 같은 값은 생략, 키 정렬. 모르는 파라미터(_=timestamp 등)는 키에 안 들어감.
+- ETag 는 본문 바이트의 해시 → 같은 결과면 워커/재계산과 무관하게 같은 태그. If-None-Match 가 맞으면 304.
+- Cache-Control: public, max-age=READ_CACHE_MAX_AGE, stale-while-revalidate=READ_CACHE_SWR.
+  서버 쪽도 같은 규칙: max-age 가 지난 항목은 그대로 주고 백그라운드에서 다시 계산한다.
+- 같은 키의 동시 계산은 한 번만(프로세스 안). 저장소는 shared_state("read") → 워커 간 공유.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    from .response_codec import dumps, encoded_etag, etag_matches, response_coding
+    from .shared_state import shared_map
+    from .struct_log import log
+    from .token_meter import with_context
+except Exception:
+    from response_codec import dumps, encoded_etag, etag_matches, response_coding  # type: ignore
+    from shared_state import shared_map  # type: ignore
+    from struct_log import log  # type: ignore
+    from token_meter import with_context  # type: ignore
+
+READ_CACHE_MAX_AGE = int(os.getenv("READ_CACHE_MAX_AGE", "300"))
+READ_CACHE_SWR = int(os.getenv("READ_CACHE_SWR", "3600"))
+
+_STORE = shared_map("read", READ_CACHE_MAX_AGE + READ_CACHE_SWR)
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2)
+_INFLIGHT: Dict[str, Lock] = {}
+_INFLIGHT_LOCK = Lock()
+_REFRESHING: set = set()
+
+# 파라미터 규칙: 이름 → (종류, 기본값). 종류: str | list | int | float | bool
+ParamSpec = Dict[str, Tuple[str, Any]]
+
+
+def _coerce(kind: str, raw: Iterable[str], default: Any) -> Any:
+    vals = [v.strip() for v in raw if v is not None and v.strip()]
+    if kind == "list":
+        items = sorted({p.strip() for v in vals for p in v.split(",") if p.strip()})
+        return items or None
+    if not vals:
+        return None
+    v = vals[-1]
+    try:
+        if kind == "int":
+            v = int(float(v.replace(",", "")))
+        elif kind == "float":
+            v = round(float(v), 5)
+        elif kind == "bool":
+            v = v.lower() in ("1", "true", "yes", "on")
+    except ValueError:
+        return None
+    return None if v == default else v
+
+
+def canonical_params(query, spec: ParamSpec, aliases: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """QueryParams(또는 dict) → 정규화된 값 dict(기본값/빈 값 제외)."""
+    aliases = aliases or {}
+    grouped: Dict[str, list] = {}
+    items = query.multi_items() if hasattr(query, "multi_items") else \
+        [(k, x) for k, v in dict(query).items() for x in (v if isinstance(v, list) else [v])]
+    for k, v in items:
+        name = aliases.get(k, k)
+        if name in spec:
+            grouped.setdefault(name, []).append(str(v))
+    out = {}
+    for name in sorted(spec):
+        kind, default = spec[name]
+        v = _coerce(kind, grouped.get(name, []), default)
+        if v is not None:
+            out[name] = v
+    return out
+
+
+def canonical_query(params: Dict[str, Any]) -> str:
+    """정규화된 값 → 키 문자열(목록은 콤마로)."""
+    return urlencode([(k, ",".join(v) if isinstance(v, list) else
+                       ("1" if v is True else "0" if v is False else v)) for k, v in sorted(params.items())])
+
+
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def _always(_: Any) -> bool:
+    return True
+
+
+def _compute(store_key: str, compute: Callable[[], Any],
+             keep: Callable[[Any], bool] = _always) -> Tuple[Dict[str, Any], bool]:
+    value = compute()
+    body = dumps(value)
+    entry = {"body": body.decode("utf-8"), "etag": etag_of(body), "ts": time.time()}
+    kept = keep(value)
+    if kept:
+        _STORE[store_key] = entry
+    return entry, kept
+
+
+def _key_lock(store_key: str) -> Lock:
+    with _INFLIGHT_LOCK:
+        lk = _INFLIGHT.get(store_key)
+        if lk is None:
+            if len(_INFLIGHT) > 4096:
+                _INFLIGHT.clear()
+            lk = _INFLIGHT[store_key] = Lock()
+        return lk
+
+
+def _refresh(store_key: str, compute: Callable[[], Any], keep: Callable[[Any], bool]) -> None:
+    try:
+        _compute(store_key, compute, keep)
+    except Exception as e:
+        log.warning("read_cache.refresh_error", key=store_key, error=str(e))
+    finally:
+        with _INFLIGHT_LOCK:
+            _REFRESHING.discard(store_key)
+
+
+def lookup(ns: str, key: str, compute: Callable[[], Any], max_age: int = READ_CACHE_MAX_AGE,
+           keep: Callable[[Any], bool] = _always) -> Tuple[Dict[str, Any], str]:
+    """
+    (항목, 상태) — 상태: hit | stale(백그라운드 갱신 시작) | miss | nostore(keep 이 False 라 저장 안 함).
+    """
+    store_key = f"{ns}?{key}"
+    entry = _STORE.get(store_key)
+    if entry is not None:
+        if time.time() - entry["ts"] <= max_age:
+            return entry, "hit"
+        with _INFLIGHT_LOCK:
+            start = store_key not in _REFRESHING
+            _REFRESHING.add(store_key)
+        if start:
+            _REFRESH_POOL.submit(with_context(_refresh), store_key, compute, keep)   # 갱신 토큰도 이 엔드포인트로
+        return entry, "stale"
+    with _key_lock(store_key):
+        entry = _STORE.get(store_key)          # 기다리는 동안 다른 요청이 채웠으면 그것
+        if entry is not None:
+            return entry, "hit"
+        entry, kept = _compute(store_key, compute, keep)
+        return entry, "miss" if kept else "nostore"
+
+
+def cached_json(request: Request, ns: str, params: Dict[str, Any], compute: Callable[[Dict[str, Any]], Any],
+                max_age: int = READ_CACHE_MAX_AGE, swr: int = READ_CACHE_SWR,
+                keep: Callable[[Any], bool] = _always) -> Response:
+    """GET 응답: 캐시 본문 + ETag + Cache-Control, If-None-Match 가 맞으면 304."""
+    entry, state = lookup(ns, canonical_query(params), lambda: compute(params), max_age, keep)
+    body = entry["body"].encode("utf-8")
+    headers = {
+        "ETag": entry["etag"],
+        "Cache-Control": "no-store" if state == "nostore" else
+                         f"public, max-age={max_age}, stale-while-revalidate={swr}",
+        "Age": str(max(0, int(time.time() - entry["ts"]))),
+        "Vary": "Accept-Encoding",
+        "X-Cache": state,
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        # 304 는 압축 미들웨어를 그냥 지나가므로, 200 이었다면 붙었을 인코딩 표시를 여기서 맞춘다
+        coding = response_coding(request.headers.get("accept-encoding") or "", len(body))
+        headers["ETag"] = encoded_etag(entry["etag"], coding)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
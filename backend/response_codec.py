@@ -0,0 +1,243 @@
+# backend/response_codec.py
+"""
+큰 JSON 응답용 — 빠른 직렬화(FastJSONResponse) + 협상 압축(CompressionMiddleware).
+
+    app.add_middleware(CompressionMiddleware)                 # Accept-Encoding: br > gzip
+    @app.post("/api/x", response_class=FastJSONResponse)      # response_model 이 있어도 렌더만 빨라짐
+    def x(): return FastJSONResponse({"places": rows})       # 직접 돌려주면 jsonable_encoder 도 건너뜀
+
+- orjson 이 있으면 그것으로, 없으면 표준 json(같은 출력 규칙: UTF-8 그대로, 공백 없음).
+- brotli 패키지(pip install brotli)가 있을 때만 br 을 제안한다. 없으면 gzip.
+- 압축 대상: application/json · text/* 이면서 COMPRESS_MIN_BYTES 이상. SSE(text/event-stream)는
+  토큰이 바로 나가야 하므로 건드리지 않는다. 이미 Content-Encoding 이 있으면 그대로.
+- 압축하면 강한 ETag 에 인코딩 표시를 붙인다(encoded_etag). 304 를 직접 만드는 쪽은 response_coding 으로 맞춘다.
+- 큰 본문(_OFFLOAD_BYTES 이상)은 스레드에서 압축해 이벤트 루프를 막지 않는다.
+"""
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from typing import Any, List, Optional, Tuple
+
+import anyio
+from starlette.responses import JSONResponse
+
+try:
+    import orjson  # pip install orjson (선택)
+except Exception:
+    orjson = None
+
+try:
+    import brotli  # pip install brotli (선택)
+except Exception:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))     # 동적 응답용(11 은 너무 느림)
+_OFFLOAD_BYTES = 256 * 1024
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+_SKIP_TYPES = ("text/event-stream",)
+
+
+# ========= JSON =========
+def _default(o: Any) -> Any:
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    if hasattr(o, "model_dump"):
+        return o.model_dump()
+    if hasattr(o, "dict"):
+        return o.dict()
+    return str(o)
+
+
+def dumps(content: Any) -> bytes:
+    """응답용 JSON 바이트. orjson 이 못 다루는 값(큰 정수 등)이면 표준 json 으로."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ========= 압축 =========
+def negotiate(accept_encoding: str, available: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+    """Accept-Encoding(q 값 포함) → 'br' | 'gzip' | None. q 가 같으면 br 우선."""
+    avail = available if available is not None else (("br", "gzip") if brotli is not None else ("gzip",))
+    best, best_q = None, 0.0
+    star_q: Optional[float] = None
+    seen = set()
+    for part in (accept_encoding or "").split(","):
+        bits = [b.strip() for b in part.split(";")]
+        coding = bits[0].lower()
+        if not coding:
+            continue
+        q = 1.0
+        for b in bits[1:]:
+            if b.startswith("q="):
+                try:
+                    q = float(b[2:])
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            star_q = q
+            continue
+        seen.add(coding)
+        if coding in avail and q > 0 and (q > best_q or (q == best_q and best != "br" and coding == "br")):
+            best, best_q = coding, q
+    if best is None and star_q:
+        best = next((c for c in avail if c not in seen), None)
+    return best
+
+
+def encoded_etag(etag: str, coding: Optional[str]) -> str:
+    """강한 ETag 는 바이트 단위라 압축본엔 표시를 붙인다("abc" → "abc-gzip"). 약한 태그는 그대로."""
+    if not coding or not etag.startswith('"') or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 비교(약한 비교). etag 의 압축본 표시("-gzip"/"-br")가 붙은 태그도 같은 것으로 본다."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.strip('"')
+    variants = {bare, f"{bare}-gzip", f"{bare}-br"}
+    for tag in if_none_match.split(","):
+        t = tag.strip()
+        if t.startswith("W/"):
+            t = t[2:]
+        if t.strip('"') in variants:
+            return True
+    return False
+
+
+def response_coding(accept_encoding: str, size: int, minimum_size: int = COMPRESS_MIN_BYTES) -> Optional[str]:
+    """이 크기의 JSON 응답을 미들웨어가 어떤 인코딩으로 보낼지(304 의 ETag 를 맞출 때)."""
+    return negotiate(accept_encoding) if size >= minimum_size else None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)      # wbits 31 = gzip 헤더
+    return c.compress(body) + c.flush()
+
+
+class _StreamCompressor:
+    """여러 조각으로 나가는 응답용(조각마다 flush 하지 않고 끝에서 마무리)."""
+
+    def __init__(self, coding: str):
+        self.coding = coding
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY) if coding == "br" else \
+            zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def feed(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._c.process(data)
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.finish() if self.coding == "br" else self._c.flush()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+class CompressionMiddleware:
+    """
+    순수 ASGI 압축. 응답 시작 메시지를 잠깐 붙잡고 첫 본문 조각을 보고 결정한다.
+    - 한 조각짜리(보통의 JSON 응답): 크기 기준을 넘으면 통째로 압축, Content-Length 갱신.
+    - 여러 조각(StreamingResponse): 스트림 압축기로 흘려보내고 Content-Length 는 뺀다.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, paths: Optional[Tuple[str, ...]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http" or (self.paths and not scope.get("path", "").startswith(self.paths)):
+            await self.app(scope, receive, send)
+            return
+        req_headers = dict(scope.get("headers") or [])
+        coding = negotiate((req_headers.get(b"accept-encoding") or b"").decode("latin-1"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[dict] = None
+        stream: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def _send(msg):
+            nonlocal start, stream, passthrough
+            if msg["type"] == "http.response.start":
+                headers = list(msg.get("headers") or [])
+                ctype = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+                if (_header(headers, b"content-encoding") is not None
+                        or not ctype.startswith(_COMPRESSIBLE) or ctype.startswith(_SKIP_TYPES)):
+                    passthrough = True
+                    await send(msg)
+                else:
+                    start = msg
+                return
+            if msg["type"] != "http.response.body" or passthrough:
+                await send(msg)
+                return
+
+            body = msg.get("body") or b""
+            more = msg.get("more_body", False)
+            if start is not None:                     # 첫 본문 조각 → 압축할지 결정
+                headers = [(k, v) for k, v in (start.get("headers") or []) if k.lower() != b"content-length"]
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(msg)
+                    return
+                headers.append((b"content-encoding", coding.encode("ascii")))
+                headers = [(k, encoded_etag(v.decode("latin-1"), coding).encode("latin-1") if k.lower() == b"etag" else v)
+                           for k, v in headers]
+                vary = _header(headers, b"vary")
+                if vary is None:
+                    headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary.lower():
+                    headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+                if not more:
+                    if len(body) >= _OFFLOAD_BYTES:
+                        out = await anyio.to_thread.run_sync(compress, body, coding)
+                    else:
+                        out = compress(body, coding)
+                    headers.append((b"content-length", str(len(out)).encode("ascii")))
+                    await send(dict(start, headers=headers))
+                    start = None
+                    await send({"type": "http.response.body", "body": out, "more_body": False})
+                    return
+                stream = _StreamCompressor(coding)
+                await send(dict(start, headers=headers))
+                start = None
+            out = stream.feed(body) if body else b""
+            if not more:
+                out += stream.finish()
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, _send)
+        if start is not None:                          # 본문 없이 끝난 응답(HEAD 등)
+            await send(start)
@@ -0,0 +1,227 @@
+# backend/selection_store.py
+"""
+설문에서 고른 장소 저장소 — 세션별 칸, TTL 만료, 샤드 잠금.
+
+    store = SelectionStore()
+    store.remember(sid, "부산광역시", ["해운대해수욕장"], "attraction")
+    store.get(sid, "부산", ["attraction", "mixed"])     # → ["해운대해수욕장"]
+
+- 키: (세션, 정규화 목적지). 세션이 없으면 익명 공용 칸 ANON 에 담는다(예전 동작).
+- 목적지 퍼지 매칭: '부산' ↔ '부산해운대' 처럼 한쪽이 다른 쪽의 접두어면 같은 곳으로 본다.
+  세션마다 정렬된 목적지 키 목록을 두고 bisect 로 찾는다(전체 스캔 없음).
+- 조회 결과는 (목적지, 분류) 별로 합쳐 두고 쓰기 때 비운다 → 반복 조회는 dict 한 번.
+- 세션은 마지막 쓰기/읽기부터 ttl 초가 지나면 사라진다. 잠금은 세션 해시로 나눈 샤드별.
+- STATE_BACKEND 가 공유 백엔드면 make_selection_store() 가 SharedSelectionStore 를 준다(워커 간 공유).
+"""
+from __future__ import annotations
+
+import os
+import re
+import time
+import zlib
+from bisect import bisect_left, insort
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .shared_state import MemoryBackend, StateBackend, get_backend
+except Exception:
+    from shared_state import MemoryBackend, StateBackend, get_backend  # type: ignore
+
+ANON = "_"
+CATEGORIES = ("attraction", "restaurant", "mixed")
+SELECTION_TTL_SEC = float(os.getenv("SELECTION_TTL_SEC", str(6 * 3600)))
+SHARDS = 16
+_SWEEP_EVERY = 60.0          # 샤드별 만료 세션 정리 주기(초, 쓰기 때 수행)
+_MIN_PREFIX = 2              # 이보다 짧은 접두어('부')로는 묶지 않음
+
+_SID_RE = re.compile(r"[^0-9A-Za-z_\-]")
+
+
+def norm_dest_key(s: str) -> str:
+    s = (s or "").strip().lower()
+    s = re.sub(r"\s+", "", s)
+    s = re.sub(r"(특별자치도|특별자치시|광역시|특별시|자치구|도|시|군|구)$", "", s)
+    return s or "_"
+
+
+def norm_session(sid: Optional[str]) -> str:
+    """헤더/본문에서 온 세션 id 정리. 비었으면 ANON."""
+    s = _SID_RE.sub("", (sid or "").strip())[:64]
+    return s or ANON
+
+
+def _clean(p: str) -> str:
+    return re.sub(r"\s+", " ", (p or "").strip())
+
+
+class _Session:
+    __slots__ = ("buckets", "keys", "views", "expires")
+
+    def __init__(self):
+        self.buckets: Dict[str, Dict[str, List[str]]] = {}     # 목적지 키 → 분류 → 이름들
+        self.keys: List[str] = []                              # 정렬된 목적지 키(접두어 검색용)
+        self.views: Dict[Tuple[str, Tuple[str, ...]], Tuple[str, ...]] = {}
+        self.expires = 0.0
+
+    def related(self, dest_key: str) -> List[str]:
+        return related_keys(self.buckets, self.keys, dest_key)
+
+
+def related_keys(buckets: Dict, keys: List[str], dest_key: str) -> List[str]:
+    """정확히 같은 키 → dest_key 의 접두어인 키(긴 것부터) → dest_key 로 시작하는 키(사전순). keys 는 정렬돼 있어야 함."""
+    out = [dest_key] if dest_key in buckets else []
+    for i in range(len(dest_key) - 1, _MIN_PREFIX - 1, -1):
+        if dest_key[:i] in buckets:
+            out.append(dest_key[:i])
+    if len(dest_key) >= _MIN_PREFIX:
+        j = bisect_left(keys, dest_key)
+        while j < len(keys) and keys[j].startswith(dest_key):
+            if keys[j] != dest_key:
+                out.append(keys[j])
+            j += 1
+    return out
+
+
+def _merge(buckets: Dict, keys: List[str], cats: Tuple[str, ...]) -> List[str]:
+    out: List[str] = []
+    seen: set = set()
+    for k in keys:
+        b = buckets[k]
+        for c in cats:
+            for p in b.get(c, []):
+                if p.lower() not in seen:
+                    out.append(p)
+                    seen.add(p.lower())
+    return out
+
+
+def _extend(dst: List[str], places: List[str]) -> None:
+    seen = {x.lower() for x in dst}
+    for p in places or []:
+        pn = _clean(p)
+        if pn and pn.lower() not in seen:
+            dst.append(pn)
+            seen.add(pn.lower())
+
+
+class SelectionStore:
+    def __init__(self, ttl: float = SELECTION_TTL_SEC, shards: int = SHARDS):
+        self.ttl = ttl
+        self._locks = [Lock() for _ in range(max(1, shards))]
+        self._maps: List[Dict[str, _Session]] = [{} for _ in self._locks]
+        self._swept = [0.0] * len(self._locks)
+
+    def _shard(self, sid: str) -> int:
+        return zlib.crc32(sid.encode("utf-8")) % len(self._locks)
+
+    def _sweep(self, i: int, now: float) -> None:
+        if now - self._swept[i] < _SWEEP_EVERY:
+            return
+        self._swept[i] = now
+        m = self._maps[i]
+        for sid in [s for s, sess in m.items() if sess.expires <= now]:
+            del m[sid]
+
+    def remember(self, session: Optional[str], destination: str, places: List[str],
+                 category: Optional[str] = None) -> None:
+        sid = norm_session(session)
+        dest_key = norm_dest_key(destination)
+        cat = (category or "mixed").lower()
+        if cat not in CATEGORIES:
+            cat = "mixed"
+        i = self._shard(sid)
+        now = time.time()
+        with self._locks[i]:
+            self._sweep(i, now)
+            m = self._maps[i]
+            sess = m.get(sid)
+            if sess is None or sess.expires <= now:
+                sess = m[sid] = _Session()
+            bucket = sess.buckets.get(dest_key)
+            if bucket is None:
+                bucket = sess.buckets[dest_key] = {c: [] for c in CATEGORIES}
+                insort(sess.keys, dest_key)
+            _extend(bucket[cat], places)
+            sess.views.clear()
+            sess.expires = now + self.ttl
+
+    def get(self, session: Optional[str], destination: str,
+            categories: Optional[List[str]] = None) -> List[str]:
+        sid = norm_session(session)
+        dest_key = norm_dest_key(destination)
+        cats = tuple(categories or CATEGORIES)
+        i = self._shard(sid)
+        now = time.time()
+        with self._locks[i]:
+            m = self._maps[i]
+            sess = m.get(sid)
+            if sess is None:
+                return []
+            if sess.expires <= now:
+                del m[sid]
+                return []
+            sess.expires = now + self.ttl
+            view = sess.views.get((dest_key, cats))
+            if view is None:
+                view = sess.views[(dest_key, cats)] = tuple(_merge(sess.buckets, sess.related(dest_key), cats))
+            return list(view)
+
+    def clear(self, session: Optional[str]) -> None:
+        sid = norm_session(session)
+        i = self._shard(sid)
+        with self._locks[i]:
+            self._maps[i].pop(sid, None)
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._maps)
+
+
+class SharedSelectionStore:
+    """
+    공유 백엔드(shared_state) 위의 같은 API — 워커가 여러 개여도 저장/조회가 같은 칸을 본다.
+    세션 하나 = 값 하나({목적지 키: {분류: [이름...]}}). TTL 은 마지막 저장 기준.
+    저장은 backend.update(원자적 읽기-수정-쓰기: sqlite BEGIN IMMEDIATE / redis WATCH·MULTI)라
+    같은 칸(특히 익명 공용 칸 ANON)에 여러 워커가 동시에 저장해도 서로 지우지 않는다.
+    """
+
+    NS = "selection"
+
+    def __init__(self, backend: StateBackend, ttl: float = SELECTION_TTL_SEC):
+        self.backend = backend
+        self.ttl = ttl
+
+    def remember(self, session: Optional[str], destination: str, places: List[str],
+                 category: Optional[str] = None) -> None:
+        sid = norm_session(session)
+        dest_key = norm_dest_key(destination)
+        cat = (category or "mixed").lower()
+        if cat not in CATEGORIES:
+            cat = "mixed"
+
+        def _add(data):
+            data = data or {}
+            bucket = data.setdefault(dest_key, {c: [] for c in CATEGORIES})
+            _extend(bucket.setdefault(cat, []), places)
+            return data
+
+        self.backend.update(self.NS, sid, _add, self.ttl)
+
+    def get(self, session: Optional[str], destination: str,
+            categories: Optional[List[str]] = None) -> List[str]:
+        data = self.backend.get(self.NS, norm_session(session)) or {}
+        if not data:
+            return []
+        dest_key = norm_dest_key(destination)
+        return _merge(data, related_keys(data, sorted(data), dest_key), tuple(categories or CATEGORIES))
+
+    def clear(self, session: Optional[str]) -> None:
+        self.backend.delete(self.NS, norm_session(session))
+
+
+def make_selection_store():
+    """STATE_BACKEND 가 memory 면 프로세스 안 샤드 저장소, 아니면 공유 백엔드 저장소."""
+    backend = get_backend()
+    if isinstance(backend, MemoryBackend):
+        return SelectionStore()
+    return SharedSelectionStore(backend)
@@ -0,0 +1,459 @@
+# backend/shared_state.py
+"""
+여러 uvicorn 워커가 캐시/선택 장소/레이트리밋을 함께 쓰기 위한 공유 상태 백엔드.
+
+    STATE_BACKEND=memory                              # 기본: 프로세스 안(워커마다 따로)
+    STATE_BACKEND=sqlite:///./data/state.sqlite3      # 한 호스트의 여러 워커(WAL 파일 공유)
+    STATE_BACKEND=redis://127.0.0.1:6379/0            # 여러 호스트. 로컬 스탠드인: python mock_redis_server.py
+
+    cache = shared_map("naver", ttl=6 * 3600)         # dict 처럼: in / [] / get / 대입
+    slot = get_backend().reserve_slot("naver", 0.10)  # 호출 시각 슬롯 예약(워커 간 간격 유지)
+    get_backend().update("selection", sid, lambda cur: {**(cur or {}), "k": 1}, ttl=3600)   # 원자적 읽기-수정-쓰기
+
+- 값은 JSON 으로 저장한다(memory 백엔드만 객체 그대로).
+- 키는 (네임스페이스, 키). ttl 이 지난 값은 없는 것으로 본다.
+- 공유 백엔드가 실패하면 캐시 미스처럼 동작한다(요청은 계속 진행).
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+_MISSING = object()
+MEMORY_MAX_ENTRIES = int(os.getenv("STATE_MEMORY_MAX_ENTRIES", "100000"))   # memory 백엔드 항목 수 상한
+
+
+class StateBackend:
+    """백엔드 인터페이스. 값이 없거나 만료면 get 은 None."""
+
+    name = "base"
+
+    def get(self, ns: str, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, ns: str, key: str) -> None:
+        raise NotImplementedError
+
+    def update(self, ns: str, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        """
+        fn(현재 값 또는 None) → 새 값을 저장하고 돌려준다. 다른 워커의 쓰기와 섞이지 않는다.
+        fn 이 예외를 내면 아무것도 쓰지 않고 그 예외를 그대로 올린다(백엔드 오류면 None).
+        """
+        raise NotImplementedError
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        """직전 슬롯 + interval 과 지금 중 늦은 시각을 예약해 돌려준다(epoch 초)."""
+        raise NotImplementedError
+
+
+# ========= 프로세스 안 =========
+class MemoryBackend(StateBackend):
+    """쓰기 _PURGE_EVERY 번마다 만료 항목을 지우고, max_entries 를 넘으면 가장 오래 전에 쓴 것부터 버린다."""
+
+    name = "memory"
+    _PURGE_EVERY = 500
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES):
+        self._d: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._slots: Dict[str, float] = {}
+        self._lock = Lock()
+        self._writes = 0
+        self.max_entries = max_entries
+
+    def _put(self, k: Tuple[str, str], value: Any, ttl: Optional[float]) -> None:
+        """잠금 안에서 부른다. 다시 넣어 삽입 순서 = 마지막 쓰기 순서."""
+        now = time.time()
+        self._d.pop(k, None)
+        self._d[k] = (value, now + ttl if ttl else 0.0)
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            for dk in [dk for dk, (_, exp) in self._d.items() if exp and exp <= now]:
+                del self._d[dk]
+        while len(self._d) > self.max_entries:
+            del self._d[next(iter(self._d))]
+
+    def get(self, ns: str, key: str) -> Any:
+        hit = self._d.get((ns, key))
+        if hit is None:
+            return None
+        value, expires = hit
+        if expires and expires <= time.time():
+            with self._lock:
+                self._d.pop((ns, key), None)
+            return None
+        return value
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._put((ns, key), value, ttl)
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            self._d.pop((ns, key), None)
+
+    def update(self, ns: str, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            hit = self._d.get((ns, key))
+            cur = hit[0] if hit is not None and not (hit[1] and hit[1] <= time.time()) else None
+            value = fn(cur)
+            self._put((ns, key), value, ttl)
+        return value
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        with self._lock:
+            slot = max(time.time(), self._slots.get(name, 0.0) + interval)
+            self._slots[name] = slot
+        return slot
+
+
+# ========= SQLite(한 호스트) =========
+class SQLiteBackend(StateBackend):
+    """WAL 모드 파일 하나를 워커들이 같이 연다. 연결은 스레드별."""
+
+    name = "sqlite"
+    _PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+        c = self._conn()
+        c.execute("CREATE TABLE IF NOT EXISTS kv (ns TEXT, key TEXT, value TEXT, expires REAL,"
+                  " PRIMARY KEY (ns, key))")
+        c.execute("CREATE TABLE IF NOT EXISTS slots (name TEXT PRIMARY KEY, ts REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = c
+        return c
+
+    def get(self, ns: str, key: str) -> Any:
+        try:
+            row = self._conn().execute("SELECT value, expires FROM kv WHERE ns=? AND key=?", (ns, key)).fetchone()
+        except sqlite3.Error as e:
+            print("[shared_state] sqlite get error:", e)
+            return None
+        if row is None or (row[1] and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        try:
+            c = self._conn()
+            c.execute("INSERT OR REPLACE INTO kv (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                      (ns, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else 0.0))
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                c.execute("DELETE FROM kv WHERE expires > 0 AND expires <= ?", (now,))
+        except sqlite3.Error as e:
+            print("[shared_state] sqlite set error:", e)
+
+    def delete(self, ns: str, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM kv WHERE ns=? AND key=?", (ns, key))
+        except sqlite3.Error as e:
+            print("[shared_state] sqlite delete error:", e)
+
+    def update(self, ns: str, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        c = self._conn()
+        try:
+            c.execute("BEGIN IMMEDIATE")      # 읽기~쓰기 사이에 다른 워커의 쓰기가 끼지 않게
+            now = time.time()
+            row = c.execute("SELECT value, expires FROM kv WHERE ns=? AND key=?", (ns, key)).fetchone()
+            cur = json.loads(row[0]) if row is not None and not (row[1] and row[1] <= now) else None
+            value = fn(cur)
+            c.execute("INSERT OR REPLACE INTO kv (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                      (ns, key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else 0.0))
+            c.execute("COMMIT")
+            return value
+        except sqlite3.Error as e:
+            self._rollback(c)
+            print("[shared_state] sqlite update error:", e)
+            return None
+        except BaseException:
+            self._rollback(c)             # fn 이 낸 예외: 트랜잭션을 닫고 그대로 올린다
+            raise
+
+    @staticmethod
+    def _rollback(c: sqlite3.Connection) -> None:
+        try:
+            c.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        c = self._conn()
+        try:
+            c.execute("BEGIN IMMEDIATE")      # 워커 간 직렬화
+            row = c.execute("SELECT ts FROM slots WHERE name=?", (name,)).fetchone()
+            slot = max(time.time(), (row[0] if row else 0.0) + interval)
+            c.execute("INSERT OR REPLACE INTO slots (name, ts) VALUES (?, ?)", (name, slot))
+            c.execute("COMMIT")
+            return slot
+        except sqlite3.Error as e:
+            try:
+                c.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            print("[shared_state] sqlite slot error:", e)
+            return time.time()
+
+
+# ========= Redis 프로토콜(RESP2) =========
+class RespError(RuntimeError):
+    pass
+
+
+class _RespConn:
+    """의존성 없는 최소 RESP2 클라이언트(요청 1개 → 응답 1개)."""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None,
+                 timeout: float = 2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.f = self.sock.makefile("rb")
+        if password:
+            self.call("AUTH", password)
+        if db:
+            self.call("SELECT", str(db))
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def call(self, *args: Any) -> Any:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        self.sock.sendall(b"".join(out))
+        return self._read()
+
+    def _read(self) -> Any:
+        line = self.f.readline()
+        if not line:
+            raise ConnectionError("redis connection closed")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            raise RespError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = self.f.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read() for _ in range(n)]
+        raise RespError(f"bad reply: {line!r}")
+
+
+class RedisBackend(StateBackend):
+    """redis://[:password@]host:port/db. 연결은 스레드별, 끊기면 한 번 다시 연결."""
+
+    name = "redis"
+    PREFIX = "justgo:"
+
+    def __init__(self, url: str):
+        u = urlparse(url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.db = int((u.path or "/0").strip("/") or 0)
+        self.password = unquote(u.password) if u.password else None
+        self._local = threading.local()
+
+    def _call(self, *args: Any) -> Any:
+        for attempt in (0, 1):
+            conn = getattr(self._local, "conn", None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = _RespConn(self.host, self.port, self.db, self.password)
+                return conn.call(*args)
+            except (OSError, ConnectionError) as e:
+                if conn is not None:
+                    conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise ConnectionError(f"redis {self.host}:{self.port}: {e}") from e
+
+    def _k(self, ns: str, key: str) -> str:
+        return f"{self.PREFIX}{ns}:{key}"
+
+    def get(self, ns: str, key: str) -> Any:
+        try:
+            raw = self._call("GET", self._k(ns, key))
+        except (ConnectionError, RespError) as e:
+            print("[shared_state] redis get error:", e)
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def set(self, ns: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        args: List[Any] = ["SET", self._k(ns, key), json.dumps(value, ensure_ascii=False)]
+        if ttl:
+            args += ["PX", str(max(1, int(ttl * 1000)))]
+        try:
+            self._call(*args)
+        except (ConnectionError, RespError) as e:
+            print("[shared_state] redis set error:", e)
+
+    def delete(self, ns: str, key: str) -> None:
+        try:
+            self._call("DEL", self._k(ns, key))
+        except (ConnectionError, RespError) as e:
+            print("[shared_state] redis delete error:", e)
+
+    _UPDATE_RETRIES = 20
+
+    def update(self, ns: str, key: str, fn: Callable[[Any], Any], ttl: Optional[float] = None) -> Any:
+        """WATCH → GET → MULTI/SET/EXEC. 그 사이 다른 쓰기가 있으면 EXEC 가 nil → 잠깐 쉬고 다시 읽어서 재시도."""
+        k = self._k(ns, key)
+        try:
+            for attempt in range(self._UPDATE_RETRIES):
+                if attempt:
+                    time.sleep(random.uniform(0, 0.002 * attempt))
+                self._call("WATCH", k)
+                raw = self._call("GET", k)
+                value = fn(None if raw is None else json.loads(raw))
+                args: List[Any] = ["SET", k, json.dumps(value, ensure_ascii=False)]
+                if ttl:
+                    args += ["PX", str(max(1, int(ttl * 1000)))]
+                self._call("MULTI")
+                self._call(*args)
+                if self._call("EXEC") is not None:
+                    return value
+            print("[shared_state] redis update gave up after retries:", k)
+        except (ConnectionError, RespError) as e:
+            self._unwatch()
+            print("[shared_state] redis update error:", e)
+        except BaseException:
+            self._unwatch()               # fn 이 낸 예외: WATCH 를 풀고 그대로 올린다
+            raise
+        return None
+
+    def _unwatch(self) -> None:
+        try:
+            self._call("UNWATCH")
+        except (ConnectionError, RespError):
+            pass
+
+    def reserve_slot(self, name: str, interval: float) -> float:
+        """
+        INCRBY 로 ms 카운터를 interval 만큼 밀어 슬롯을 잡는다(스크립트 없이 원자적).
+        카운터가 지금보다 뒤처졌으면(한동안 호출 없음) 지금으로 당긴다 —
+        그 순간 경쟁한 호출 몇 개는 간격이 겹칠 수 있다.
+        """
+        step = max(1, int(interval * 1000))
+        key = f"{self.PREFIX}slot:{name}"
+        try:
+            v = int(self._call("INCRBY", key, step))
+            now_ms = int(time.time() * 1000)
+            if v < now_ms:
+                self._call("SET", key, now_ms)
+                return now_ms / 1000.0
+            return v / 1000.0
+        except (ConnectionError, RespError, ValueError) as e:
+            print("[shared_state] redis slot error:", e)
+            return time.time()
+
+
+# ========= 선택/생성 =========
+_BACKEND: Optional[StateBackend] = None
+_BACKEND_LOCK = Lock()
+
+
+def make_backend(spec: Optional[str]) -> StateBackend:
+    spec = (spec or "memory").strip()
+    if spec in ("", "memory"):
+        return MemoryBackend()
+    if spec.startswith("sqlite:///"):
+        return SQLiteBackend(spec[len("sqlite:///"):])
+    if spec.startswith(("redis://", "rediss://")):
+        if spec.startswith("rediss://"):
+            raise ValueError("rediss(TLS) 는 지원하지 않습니다. 로컬 터널/프록시를 쓰세요.")
+        return RedisBackend(spec)
+    raise ValueError(f"unknown STATE_BACKEND: {spec}")
+
+
+def get_backend() -> StateBackend:
+    """STATE_BACKEND 환경변수로 한 번 만든다(잘못된 값이면 memory 로 폴백)."""
+    global _BACKEND
+    if _BACKEND is None:
+        with _BACKEND_LOCK:
+            if _BACKEND is None:
+                try:
+                    _BACKEND = make_backend(os.getenv("STATE_BACKEND"))
+                except Exception as e:
+                    print("[shared_state] backend error, using memory:", e)
+                    _BACKEND = MemoryBackend()
+    return _BACKEND
+
+
+def set_backend(backend: StateBackend) -> None:
+    """테스트/스크립트용: 전역 백엔드 교체."""
+    global _BACKEND
+    with _BACKEND_LOCK:
+        _BACKEND = backend
+
+
+class SharedMap:
+    """
+    네임스페이스 하나를 dict 처럼 쓰는 얇은 래퍼(기존 `if k in C: C[k]` 코드를 그대로 두기 위함).
+    백엔드는 처음 쓸 때 정한다(.env 로드 순서와 무관하게).
+    """
+
+    __slots__ = ("ns", "ttl")
+
+    def __init__(self, ns: str, ttl: Optional[float] = None):
+        self.ns = ns
+        self.ttl = ttl
+
+    def get(self, key: str, default: Any = None) -> Any:
+        v = get_backend().get(self.ns, key)
+        return default if v is None else v
+
+    def __contains__(self, key: str) -> bool:
+        return get_backend().get(self.ns, key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        v = get_backend().get(self.ns, key)
+        if v is None:
+            raise KeyError(key)
+        return v
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        get_backend().set(self.ns, key, value, self.ttl)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        v = self.get(key, default)
+        get_backend().delete(self.ns, key)
+        return v
+
+    def __iter__(self) -> Iterator[str]:
+        raise TypeError("SharedMap 은 키 순회를 지원하지 않습니다")
+
+
+def shared_map(ns: str, ttl: Optional[float] = None) -> SharedMap:
+    return SharedMap(ns, ttl)
@@ -0,0 +1,307 @@
+# backend/struct_log.py
+"""
+구조화(JSON 한 줄) 로그 — 요청 경로에서는 큐에 넣기만 하고, 쓰기는 백그라운드 스레드 하나가 한다.
+
+    from struct_log import log, RequestLogMiddleware
+    app.add_middleware(RequestLogMiddleware)          # 요청마다 req_id + access 레코드
+    log.info("plan.done", schedules=3)
+    log.error("plan.gpt_error", exc=e, city="부산")   # 트레이스백은 쓰기 스레드에서 만든다
+
+레코드: {"ts", "level", "event", "req_id", ...필드}. 요청 안에서 남긴 로그는 같은 req_id 를 갖는다
+(응답 헤더 X-Request-Id 로도 돌려줌. 들어온 X-Request-Id 가 있으면 그대로 쓴다).
+
+- 큐가 가득 차면 버리고 개수만 센다(log.dropped 레코드로 보고) → 로그 때문에 요청이 기다리는 일 없음.
+- 같은 event 는 초당 LOG_RATE_PER_SEC 개까지(토큰 버킷). 넘친 개수는 다음 레코드의 suppressed 로.
+- access 레코드는 LOG_SAMPLE 비율만 남긴다. 단, 4xx/5xx 와 LOG_SLOW_MS 넘는 요청은 항상 남김.
+- 요청 본문은 LOG_BODY=1 일 때만, 들어오는 조각을 그대로 흘려보내며 앞 LOG_BODY_MAX 바이트만 복사.
+- 출력: LOG_SINK = stdout(기본) | stderr | 파일 경로. 여러 레코드를 모아 한 번에 쓴다.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "warn": 30, "error": 40}
+
+LOG_LEVEL = LEVELS.get(os.getenv("LOG_LEVEL", "info").strip().lower(), 20)
+LOG_SINK = os.getenv("LOG_SINK", "stdout").strip() or "stdout"
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_RATE_PER_SEC = float(os.getenv("LOG_RATE_PER_SEC", "50"))
+LOG_SAMPLE = float(os.getenv("LOG_SAMPLE", "1.0"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "2000"))
+LOG_BODY = os.getenv("LOG_BODY", "0").strip().lower() in ("1", "true", "yes")
+LOG_BODY_MAX = int(os.getenv("LOG_BODY_MAX", "1024"))
+
+_BATCH = 256                 # 한 번에 쓰는 최대 레코드 수
+_FLUSH_SEC = 0.2             # 모자라도 이만큼 기다렸으면 쓴다
+_BODY_TYPES = ("application/json", "text/", "application/x-www-form-urlencoded")
+
+_req_id: ContextVar[str] = ContextVar("struct_log_req_id", default="-")
+
+
+def current_request_id() -> str:
+    return _req_id.get()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# ========= 속도 제한(이벤트별 토큰 버킷) =========
+class _RateLimiter:
+    def __init__(self, per_sec: float, burst: Optional[float] = None):
+        self.per_sec = per_sec
+        self.burst = burst if burst is not None else max(1.0, per_sec * 2)
+        self._buckets: Dict[str, list] = {}      # event → [tokens, last, suppressed]
+        self._lock = threading.Lock()
+
+    def admit(self, key: str) -> Optional[int]:
+        """통과면 그동안 막힌 개수(0 이상), 막히면 None."""
+        if self.per_sec <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = [self.burst, now, 0]
+            b[0] = min(self.burst, b[0] + (now - b[1]) * self.per_sec)
+            b[1] = now
+            if b[0] < 1.0:
+                b[2] += 1
+                return None
+            b[0] -= 1.0
+            suppressed, b[2] = b[2], 0
+            return suppressed
+
+
+# ========= 쓰기 스레드 =========
+def _open_sink(spec: str):
+    if spec == "stdout":
+        return sys.stdout
+    if spec == "stderr":
+        return sys.stderr
+    d = os.path.dirname(os.path.abspath(spec))
+    os.makedirs(d, exist_ok=True)
+    return open(spec, "a", encoding="utf-8", buffering=1 << 16)
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, (set, tuple)):
+        return list(o)
+    if isinstance(o, bytes):
+        return o.decode("utf-8", "replace")
+    return str(o)
+
+
+def _render(rec: Dict[str, Any]) -> str:
+    exc = rec.pop("exc", None)
+    if isinstance(exc, BaseException):
+        rec["error"] = f"{type(exc).__name__}: {exc}"
+        if rec.get("level") == "error":
+            rec["traceback"] = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+    elif exc is not None:
+        rec["error"] = str(exc)
+    return json.dumps(rec, ensure_ascii=False, default=_default)
+
+
+class _Writer:
+    def __init__(self, sink: str = LOG_SINK, maxsize: int = LOG_QUEUE_MAX):
+        self.sink_spec = sink
+        self.q: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stream = None
+
+    def _ensure(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stream = _open_sink(self.sink_spec)
+                t = threading.Thread(target=self._run, name="struct-log-writer", daemon=True)
+                t.start()
+                self._thread = t
+
+    def put(self, rec: Dict[str, Any]) -> None:
+        self._ensure()
+        try:
+            self.q.put_nowait(rec)
+        except queue.Full:
+            self.dropped += 1            # 정확할 필요 없음(보고용)
+
+    def _write(self, batch: list) -> None:
+        if self.dropped:
+            n, self.dropped = self.dropped, 0
+            batch.append({"ts": round(time.time(), 3), "level": "warning", "event": "log.dropped", "count": n})
+        lines = []
+        for rec in batch:
+            try:
+                lines.append(_render(rec))
+            except Exception as e:
+                lines.append(json.dumps({"event": "log.render_error", "error": str(e)}))
+        try:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        while True:
+            rec = self.q.get()
+            if rec is None:
+                return
+            batch = [rec]
+            deadline = time.monotonic() + _FLUSH_SEC
+            while len(batch) < _BATCH:
+                left = deadline - time.monotonic()
+                try:
+                    nxt = self.q.get(timeout=left) if left > 0 else self.q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._write(batch)
+                    return
+                batch.append(nxt)
+            self._write(batch)
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """남은 레코드를 다 쓰고 쓰기 스레드를 멈춘다(종료 시)."""
+        t = self._thread
+        if t is None or not t.is_alive():
+            return
+        try:
+            self.q.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        t.join(timeout)
+        self._thread = None
+
+
+# ========= 로거 =========
+class StructLogger:
+    def __init__(self, writer: Optional[_Writer] = None, level: int = LOG_LEVEL,
+                 rate_per_sec: float = LOG_RATE_PER_SEC):
+        self.writer = writer or _Writer()
+        self.level = level
+        self.limiter = _RateLimiter(rate_per_sec)
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS.get(level, 20) >= self.level
+
+    def emit(self, level: str, event: str, fields: Dict[str, Any], limit: bool = True) -> None:
+        if not self.enabled(level):
+            return
+        suppressed = self.limiter.admit(event) if limit else 0
+        if suppressed is None:
+            return
+        rec: Dict[str, Any] = {"ts": round(time.time(), 3), "level": level, "event": event,
+                               "req_id": _req_id.get()}
+        rec.update(fields)
+        if suppressed:
+            rec["suppressed"] = suppressed
+        self.writer.put(rec)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.emit("debug", event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.emit("info", event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.emit("warning", event, fields)
+
+    def error(self, event: str, exc: Optional[BaseException] = None, **fields: Any) -> None:
+        """exc 를 주면 쓰기 스레드에서 error/traceback 필드로 풀어 쓴다."""
+        if exc is not None:
+            fields["exc"] = exc
+        self.emit("error", event, fields)
+
+    def flush(self, timeout: float = 2.0) -> None:
+        self.writer.flush(timeout)
+
+
+log = StructLogger()
+atexit.register(log.flush)
+
+
+# ========= 요청 로그 미들웨어(순수 ASGI) =========
+class RequestLogMiddleware:
+    """
+    요청마다 req_id 를 정하고 끝날 때 access 레코드 하나를 남긴다.
+    본문을 미리 다 읽지 않는다: receive 를 감싸 흘러가는 조각의 크기만 세고,
+    LOG_BODY 면 앞 body_max 바이트만 복사한다. 스트리밍 응답은 마지막 조각이 나간 뒤 기록.
+    """
+
+    def __init__(self, app, logger: Optional[StructLogger] = None, sample: float = LOG_SAMPLE,
+                 slow_ms: float = LOG_SLOW_MS, capture_body: bool = LOG_BODY,
+                 body_max: int = LOG_BODY_MAX):
+        self.app = app
+        self.logger = logger or log
+        self.sample = sample
+        self.slow_ms = slow_ms
+        self.capture_body = capture_body
+        self.body_max = body_max
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        rid = (headers.get(b"x-request-id") or b"").decode("latin-1").strip()[:64] or new_request_id()
+        token = _req_id.set(rid)
+        t0 = time.perf_counter()
+        ctype = (headers.get(b"content-type") or b"").decode("latin-1").lower()
+        want_body = self.capture_body and self.body_max > 0 and ctype.startswith(_BODY_TYPES)
+        st = {"status": 500, "req_bytes": 0, "res_bytes": 0}
+        body_head = bytearray()
+
+        async def _receive():
+            msg = await receive()
+            if msg.get("type") == "http.request":
+                chunk = msg.get("body") or b""
+                st["req_bytes"] += len(chunk)
+                if want_body and len(body_head) < self.body_max:
+                    body_head.extend(chunk[: self.body_max - len(body_head)])
+            return msg
+
+        async def _send(msg):
+            if msg["type"] == "http.response.start":
+                st["status"] = msg.get("status", 200)
+                msg.setdefault("headers", [])
+                msg["headers"] = list(msg["headers"]) + [(b"x-request-id", rid.encode("latin-1"))]
+            elif msg["type"] == "http.response.body":
+                st["res_bytes"] += len(msg.get("body") or b"")
+            await send(msg)
+
+        try:
+            await self.app(scope, _receive, _send)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            status = st["status"]
+            keep = status >= 400 or ms >= self.slow_ms or self.sample >= 1.0 or random.random() < self.sample
+            if keep:
+                fields: Dict[str, Any] = {
+                    "method": scope.get("method"), "path": scope.get("path"),
+                    "status": status, "ms": round(ms, 1),
+                    "req_bytes": st["req_bytes"], "res_bytes": st["res_bytes"],
+                }
+                if scope.get("query_string"):
+                    fields["query"] = scope["query_string"].decode("latin-1")[:256]
+                if body_head:
+                    fields["body"] = bytes(body_head).decode("utf-8", "replace")
+                    fields["body_truncated"] = st["req_bytes"] > len(body_head)
+                level = "error" if status >= 500 else ("warning" if status >= 400 else "info")
+                self.logger.emit(level, "http.access", fields, limit=False)
+            _req_id.reset(token)
@@ -0,0 +1,192 @@
+# backend/token_meter.py
+from __future__ import annotations
+
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# ========= 토큰 카운터 =========
+# tiktoken이 있으면 정확히 세고, 없으면 근사치(한글 1자≈1토큰, 그 외 4자≈1토큰)로 센다.
+try:
+    import tiktoken  # pip install tiktoken (선택)
+    try:
+        _ENC = tiktoken.get_encoding("o200k_base")   # gpt-4o 계열
+    except Exception:
+        _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
+
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+_MSG_OVERHEAD = 4   # 메시지당 role/구분자 오버헤드(대략)
+
+def count_tokens(text: str) -> int:
+    text = text or ""
+    if not text:
+        return 0
+    if _ENC is not None:
+        try:
+            return len(_ENC.encode(text))
+        except Exception:
+            pass
+    non_ascii = len(_NON_ASCII_RE.findall(text))
+    ascii_len = len(text) - non_ascii
+    return non_ascii + (ascii_len + 3) // 4
+
+def count_messages(messages: Iterable[Dict[str, Any]]) -> int:
+    total = 0
+    for m in messages or []:
+        total += _MSG_OVERHEAD + count_tokens(str(m.get("content") or ""))
+    return total + 2
+
+# ========= 엔드포인트/스테이지별 집계 =========
+_current_endpoint: ContextVar[str] = ContextVar("token_meter_endpoint", default="-")
+
+_STATS: dict[tuple[str, str], dict[str, float]] = {}
+_STATS_LOCK = Lock()
+
+def current_endpoint() -> str:
+    return _current_endpoint.get()
+
+@contextmanager
+def endpoint_scope(endpoint: str):
+    """이 블록 안에서 일어나는 LLM 호출은 endpoint 이름으로 집계된다."""
+    token = _current_endpoint.set(endpoint or "-")
+    try:
+        yield
+    finally:
+        _current_endpoint.reset(token)
+
+def with_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    스레드 풀로 넘길 함수를 지금 컨텍스트(엔드포인트/요청 id)에 묶는다.
+    ContextVar 는 ThreadPoolExecutor 워커로 복사되지 않아, 그냥 넘기면 집계가 "-" 로 빠진다.
+    호출마다 복사본에서 실행 → 같은 함수를 여러 스레드가 동시에 불러도 된다.
+    """
+    ctx = copy_context()
+
+    def _bound(*args: Any, **kwargs: Any) -> Any:
+        return ctx.copy().run(fn, *args, **kwargs)
+    return _bound
+
+def record(stage: str, prompt_tokens: int, completion_tokens: int,
+           latency_sec: float = 0.0, cached_tokens: int = 0,
+           endpoint: Optional[str] = None, estimated: bool = False) -> None:
+    key = (endpoint or current_endpoint(), stage or "-")
+    with _STATS_LOCK:
+        s = _STATS.setdefault(key, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cached_tokens": 0, "latency_sec": 0.0, "estimated_calls": 0,
+        })
+        s["calls"] += 1
+        s["prompt_tokens"] += int(prompt_tokens or 0)
+        s["completion_tokens"] += int(completion_tokens or 0)
+        s["cached_tokens"] += int(cached_tokens or 0)
+        s["latency_sec"] += float(latency_sec or 0.0)
+        if estimated:
+            s["estimated_calls"] += 1
+
+def snapshot(reset: bool = False) -> List[Dict[str, Any]]:
+    """[{endpoint, stage, calls, prompt_tokens, completion_tokens, ...}, ...]. reset=True 면 같은 잠금 안에서 비운다."""
+    with _STATS_LOCK:
+        rows = [(k, dict(v)) for k, v in _STATS.items()]
+        if reset:
+            _STATS.clear()
+    out: List[Dict[str, Any]] = []
+    for (ep, st), v in sorted(rows):
+        calls = int(v["calls"]) or 1
+        out.append({
+            "endpoint": ep,
+            "stage": st,
+            "calls": int(v["calls"]),
+            "prompt_tokens": int(v["prompt_tokens"]),
+            "completion_tokens": int(v["completion_tokens"]),
+            "cached_tokens": int(v["cached_tokens"]),
+            "estimated_calls": int(v["estimated_calls"]),
+            "avg_latency_ms": round(v["latency_sec"] * 1000 / calls, 1),
+        })
+    return out
+
+def reset() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+# ========= OpenAI 호출 래퍼 =========
+def _usage_of(resp: Any) -> tuple[Optional[int], Optional[int], int]:
+    return _usage_fields(getattr(resp, "usage", None))
+
+def _usage_fields(usage: Any) -> tuple[Optional[int], Optional[int], int]:
+    if usage is None:
+        return None, None, 0
+    cached = 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None:
+        cached = int(getattr(details, "cached_tokens", 0) or 0)
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None), cached
+
+def chat_completion(client: Any, *, stage: str, endpoint: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    client.chat.completions.create 를 호출하고 토큰/지연시간을 기록한다.
+    - 응답에 usage가 있으면 그 값을, 없으면 로컬 카운터 근사치를 쓴다.
+    """
+    t0 = time.perf_counter()
+    resp = client.chat.completions.create(**kwargs)
+    latency = time.perf_counter() - t0
+    try:
+        p_tok, c_tok, cached = _usage_of(resp)
+        estimated = p_tok is None or c_tok is None
+        if p_tok is None:
+            p_tok = count_messages(kwargs.get("messages") or [])
+        if c_tok is None:
+            content = ""
+            try:
+                content = resp.choices[0].message.content or ""
+            except Exception:
+                pass
+            c_tok = count_tokens(content)
+        record(stage, p_tok, c_tok, latency, cached, endpoint=endpoint, estimated=estimated)
+    except Exception:
+        pass
+    return resp
+
+def stream_chat_completion(client: Any, *, stage: str, endpoint: Optional[str] = None, **kwargs: Any):
+    """
+    stream=True 호출을 감싸 content 조각을 그대로 yield 하고, 끝나면 사용량을 기록한다.
+    - 지원 서버면 stream_options.include_usage 로 받은 usage를 쓰고, 아니면 로컬 근사치.
+    - 스레드풀에서 돌 수 있으므로 endpoint는 명시적으로 넘기는 편이 안전하다.
+    """
+    kwargs["stream"] = True
+    kwargs.setdefault("stream_options", {"include_usage": True})
+    endpoint = endpoint or current_endpoint()
+    t0 = time.perf_counter()
+    parts: List[str] = []
+    usage = None
+    try:
+        stream = client.chat.completions.create(**kwargs)
+    except TypeError:
+        # stream_options를 모르는 구버전 SDK
+        kwargs.pop("stream_options", None)
+        stream = client.chat.completions.create(**kwargs)
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            for ch in getattr(chunk, "choices", None) or []:
+                piece = getattr(ch.delta, "content", None) if getattr(ch, "delta", None) else None
+                if piece:
+                    parts.append(piece)
+                    yield piece
+    finally:
+        try:
+            latency = time.perf_counter() - t0
+            p_tok, c_tok, cached = _usage_fields(usage)
+            estimated = p_tok is None or c_tok is None
+            if p_tok is None:
+                p_tok = count_messages(kwargs.get("messages") or [])
+            if c_tok is None:
+                c_tok = count_tokens("".join(parts))
+            record(stage, p_tok, c_tok, latency, cached, endpoint=endpoint, estimated=estimated)
+        except Exception:
+            pass